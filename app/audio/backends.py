@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+
+import numpy as np
+
+# Mirrors the time structure handed to sounddevice callbacks
+StreamTime = namedtuple("StreamTime", ["currentTime", "outputBufferDacTime"])
+
+
+class CallbackStatus:
+    """Status flags handed to simulated callbacks (always clean, falsy like an empty sounddevice status)."""
+    output_underflow = False
+
+    def __bool__(self):
+        return False
+
+
+class SoundDeviceBackend:
+    """Plays through the sound card with sounddevice."""
+
+    def open_stream(self, samplerate, channels, callback, blocksize=0, dtype='float32'):
+        import sounddevice as sd
+        return sd.OutputStream(samplerate=samplerate, channels=channels, dtype=dtype, blocksize=blocksize,
+                               callback=callback)
+
+
+class SimulatedStream:
+    """
+    Output stream with a simulated clock: a thread calls the audio callback block after block, like a sound card
+    would, and hands every block to a sink.
+
+    Blocks are paced at realtime_factor times real time (1 for real time, 10 for ten times faster, 0 for as fast as
+    possible). Every callback is timed against its real-time deadline (blocksize / samplerate) so that playback
+    throughput and deadline misses can be measured on machines without a sound device.
+
+    """
+
+    def __init__(self, samplerate, channels, callback, blocksize, dtype, sink, realtime_factor=1.0, max_blocks=None,
+                 history=1024):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize or 512
+        self.dtype = dtype
+        self.sink = sink
+        self.realtime_factor = realtime_factor
+        self.max_blocks = max_blocks
+        self.active = False
+        self.closed = False
+        self._sink_closed = False
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Statistics, kept as running totals so that long headless runs use constant memory
+        self.blocks = 0
+        self.frames = 0
+        self.deadline = self.blocksize / samplerate
+        self.deadline_misses = 0
+        self.total_callback_time = 0.0
+        self.max_callback_time = 0.0
+        self.callback_times = deque(maxlen=history)  # Durations of the most recent callbacks
+
+    @property
+    def time(self):
+        """Simulated stream time in seconds."""
+        return self.frames / self.samplerate
+
+    def start(self):
+        if self.active:
+            return
+        self._stop_event.clear()
+        self.active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        # The callback may stop its own stream, the thread cannot join itself
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.active = False
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.closed = True
+        self.stop()
+        # When closed from its own callback, the thread closes the sink after writing its last block
+        if self._thread is None or not self._thread.is_alive():
+            self._close_sink()
+
+    def _close_sink(self):
+        if not self._sink_closed:
+            self._sink_closed = True
+            self.sink.close()
+
+    def wait(self, timeout=None):
+        """Block until the stream has been stopped (by the callback or after max_blocks)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        outdata = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        status = CallbackStatus()
+        started = time.perf_counter()
+        while not self._stop_event.is_set():
+            if self.max_blocks is not None and self.blocks >= self.max_blocks:
+                break
+
+            before = time.perf_counter()
+            self.callback(outdata, self.blocksize, StreamTime(self.time, self.time + self.deadline), status)
+            elapsed = time.perf_counter() - before
+            self.callback_times.append(elapsed)
+            self.total_callback_time += elapsed
+            self.max_callback_time = max(self.max_callback_time, elapsed)
+            if elapsed > self.deadline:
+                self.deadline_misses += 1
+
+            self.sink.write(outdata)
+            self.blocks += 1
+            self.frames += self.blocksize
+
+            # Pace the next block on the simulated clock
+            if self.realtime_factor:
+                wake_up = started + self.time / self.realtime_factor
+                self._stop_event.wait(max(0.0, wake_up - time.perf_counter()))
+        self.active = False
+        if self.closed:
+            self._close_sink()
+
+    def stats(self):
+        """Return throughput and deadline statistics of the blocks processed so far."""
+        mean = self.total_callback_time / self.blocks if self.blocks else 0.0
+        return {
+            "blocks": self.blocks,
+            "frames": self.frames,
+            "deadline": self.deadline,
+            "deadline_misses": self.deadline_misses,
+            "mean_callback_time": mean,
+            "max_callback_time": self.max_callback_time,
+            "realtime_ratio": self.deadline / mean if mean > 0 else float("inf"),
+        }
+
+
+class _DiscardSink:
+    def write(self, block):
+        pass
+
+    def close(self):
+        pass
+
+
+class _WavSink:
+    """Writes blocks to a 16-bit PCM WAV file as they are produced."""
+
+    def __init__(self, path, samplerate, channels):
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(int(samplerate))
+
+    def write(self, block):
+        pcm = (np.clip(block, -1, 1) * 32767).astype('<i2')
+        self.file.writeframes(pcm.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink:
+    """Headless backend: runs the callback on a simulated clock and discards the output."""
+
+    def __init__(self, realtime_factor=1.0, blocksize=512, max_blocks=None):
+        self.realtime_factor = realtime_factor
+        self.blocksize = blocksize
+        self.max_blocks = max_blocks
+        self.last_stream = None
+
+    def open_stream(self, samplerate, channels, callback, blocksize=0, dtype='float32'):
+        self.last_stream = SimulatedStream(samplerate, channels, callback, blocksize or self.blocksize, dtype,
+                                           self._sink(samplerate, channels), self.realtime_factor, self.max_blocks)
+        return self.last_stream
+
+    def _sink(self, samplerate, channels):
+        return _DiscardSink()
+
+
+class WavFileSink(NullSink):
+    """Headless backend: runs the callback on a simulated clock and records the output to a WAV file."""
+
+    def __init__(self, path, realtime_factor=1.0, blocksize=512, max_blocks=None):
+        super().__init__(realtime_factor, blocksize, max_blocks)
+        self.path = path
+
+    def _sink(self, samplerate, channels):
+        return _WavSink(self.path, samplerate, channels)
+
+
+def create_backend(spec=None):
+    """
+    Build an audio backend from a short description, by default the SIGNAL_EQUALIZER_AUDIO_BACKEND environment
+    variable: "sounddevice" (default), "null", "null:<realtime factor>" or "wav:<path>".
+    """
+    spec = spec or os.environ.get("SIGNAL_EQUALIZER_AUDIO_BACKEND", "sounddevice")
+    name, _, argument = spec.partition(":")
+    if name == "null":
+        return NullSink(float(argument) if argument else 1.0)
+    if name == "wav":
+        return WavFileSink(argument or "playback.wav")
+    return SoundDeviceBackend()
@@ -0,0 +1,191 @@
+import multiprocessing as mp
+import os
+import queue
+
+import numpy as np
+
+from app.audio.backends import SoundDeviceBackend
+from app.audio.processing import BlockEqualizer
+from app.audio.ring_buffer import SharedRingBuffer
+from app.utils.bands import as_layout
+from app.wiener_filter.StreamingWiener import StreamingWiener
+
+# Whether playback goes through the engine process rather than an in-process stream, can be overridden with the
+# SIGNAL_EQUALIZER_AUDIO_ENGINE environment variable ("1" / "on" to enable)
+DEFAULT_USE_ENGINE = os.environ.get("SIGNAL_EQUALIZER_AUDIO_ENGINE", "0").lower() in ("1", "on", "true", "yes")
+
+
+def run_engine(source_name, output_name, capacity, control_queue, blocksize, backend):
+    """
+    Entry point of the engine process: owns the output stream (opened with backend) and the equalizer chain.
+
+    The GUI writes source frames into the source ring; the stream callback reads them, equalizes them (unless they
+    were already rendered by the GUI), plays them and copies the processed frames into the output ring for display.
+    Parameters and transport commands arrive on control_queue as (command, payload) tuples.
+
+    """
+    source = SharedRingBuffer.attach(source_name, capacity)
+    output = SharedRingBuffer.attach(output_name, capacity)
+    equalizer = BlockEqualizer()
+    denoiser = None
+    stream = None
+    equalize = True  # False while the GUI feeds its rendered output
+
+    def callback(outdata, frames, time, status):
+        block = outdata[:, 0]
+        count = source.read_into(block)
+        block[count:] = 0  # Underrun: pad with silence
+        if equalize:
+            equalizer.process(block[:count])
+        if denoiser is not None:
+            denoiser.process(block[:count])
+        output.write(block[:count])
+
+    while True:
+        command, payload = control_queue.get()
+        if command == "configure":
+            equalizer.configure(*payload)
+        elif command == "gains":
+            equalizer.set_gains(payload)
+        elif command == "denoise":
+            denoiser = None
+            if payload is not None:
+                denoiser = StreamingWiener(*payload[:2], track_noise=payload[2], estimator=payload[3])
+        elif command == "play":
+            samplerate, origin, equalize = payload
+            if stream is not None:
+                stream.stop()
+                stream.close()
+            source.seek(origin)  # Skip whatever was left from the previous playback
+            stream = backend.open_stream(samplerate=samplerate, channels=1, callback=callback, blocksize=blocksize,
+                                         dtype='float32')
+            stream.start()
+        elif command == "stop":
+            if stream is not None:
+                stream.stop()
+                stream.close()
+                stream = None
+        elif command == "quit":
+            break
+
+    if stream is not None:
+        stream.stop()
+        stream.close()
+    source.close()
+    output.close()
+
+
+class AudioEngine:
+    """
+    GUI-side handle of the audio engine process.
+
+    Playback runs in a separate process so that the GIL held by Qt, pyqtgraph and Matplotlib work in the GUI process
+    cannot starve the audio callback. The GUI keeps the source ring filled ahead of the playhead with feed(), sends
+    parameters with configure() / set_gains(), and can read back the processed frames with read_output().
+
+    """
+
+    def __init__(self, capacity=2 ** 17, blocksize=1024, backend=None):
+        """
+        Input :
+            capacity : int, frames buffered ahead of the playhead (also the size of the output ring)
+            blocksize : int, frames per stream callback
+            backend : audio backend used by the engine process (defaults to sounddevice)
+
+        """
+        self.capacity = capacity
+        self.blocksize = blocksize
+        self.backend = backend or SoundDeviceBackend()
+        self.source = None
+        self.output = None
+        self.control_queue = None
+        self.process = None
+        self.feed_index = 0  # Next source sample to write into the ring
+        self.start_index = 0  # Source sample at which the current playback started
+        self.origin = 0  # Ring frame holding start_index
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Allocate the shared rings and spawn the engine process."""
+        if self.running:
+            return
+        self.source = SharedRingBuffer.create(self.capacity)
+        self.output = SharedRingBuffer.create(self.capacity)
+        self.capacity = self.source.capacity
+        self.control_queue = mp.Queue()
+        self.process = mp.Process(
+            target=run_engine,
+            args=(self.source.name, self.output.name, self.capacity, self.control_queue, self.blocksize,
+                  self.backend),
+            daemon=True,
+        )
+        self.process.start()
+
+    def configure(self, sampling_rate, bands, gains):
+        self.control_queue.put(("configure", (sampling_rate, as_layout(bands), list(map(float, gains)))))
+
+    def set_gains(self, gains):
+        self.control_queue.put(("gains", list(map(float, gains))))
+
+    def set_denoiser(self, sampling_rate, noise_psd, track_noise=False, estimator="posterior"):
+        """
+        Enable the live Wiener stage with the given noise PSD (tracked from there on if track_noise) and a priori SNR
+        estimator, or disable it when noise_psd is None.
+        """
+        payload = None
+        if noise_psd is not None:
+            payload = (sampling_rate, np.asarray(noise_psd, dtype=np.float32), track_noise, estimator)
+        self.control_queue.put(("denoise", payload))
+
+    def play(self, audio, start_index, samplerate, equalize=True):
+        """
+        Start playing audio from start_index at the given stream rate (rate changes give speed changes), through the
+        engine's equalizer unless equalize is False (audio already rendered with the current setting).
+        """
+        self.feed_index = self.start_index = start_index
+        self.origin = self.source.frames_written
+        self.feed(audio)
+        self.control_queue.put(("play", (samplerate, self.origin, equalize)))
+
+    def stop(self):
+        self.control_queue.put(("stop", None))
+        self.output.discard()
+
+    def feed(self, audio):
+        """
+        Top up the source ring with the next samples of audio. Called periodically by the GUI.
+
+            Output :
+                done : bool, True once the whole signal has been handed to the engine
+
+        """
+        if self.feed_index < len(audio):
+            self.feed_index += self.source.write(audio[self.feed_index:self.feed_index + self.source.available_write()])
+        return self.feed_index >= len(audio)
+
+    @property
+    def position(self):
+        """Index of the source sample currently being played."""
+        return self.start_index + max(0, self.source.frames_read - self.origin)
+
+    def read_output(self, out):
+        """Copy processed frames played by the engine into out, returns the number of frames copied."""
+        return self.output.read_into(out)
+
+    def close(self):
+        """Stop the engine process and free the shared memory."""
+        if self.process is None:
+            return
+        try:
+            self.control_queue.put(("quit", None))
+            self.process.join(timeout=1)
+        except (OSError, ValueError, queue.Full):
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+        self.source.close()
+        self.output.close()
+        self.process = None
@@ -0,0 +1,116 @@
+import os
+import threading
+
+import numpy as np
+
+from app.utils.resample import BlockResampler
+
+# File formats and the soundfile subtype they are written with
+EXPORT_FORMATS = {
+    ".wav": ("WAV", "FLOAT"),
+    ".flac": ("FLAC", "PCM_24"),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """
+    Streams the processed audio to a WAV or FLAC file block after block.
+
+    Each block is rendered by render_block (e.g. the overlap-add equalizer of Equalizer.render_window, which reads
+    the source around the block), optionally denoised by a StreamingWiener stage fed in order, optionally resampled
+    and encoded with soundfile. Only a few blocks are alive at any time, so memory does not grow with the length of
+    the file. run() is meant for a worker thread: progress can be read and cancel() called from the GUI thread.
+
+    """
+
+    def __init__(self, path, n_samples, samplerate, render_block, denoiser=None, target_rate=None, block_size=2 ** 16,
+                 on_progress=None):
+        """
+        Input :
+            path : str, output file (.wav or .flac)
+            n_samples : int, length of the processed signal
+            samplerate : int, rate of the processed signal
+            render_block : callable (start, stop) -> 1D np.array, processed samples [start, stop)
+            denoiser : StreamingWiener, fresh denoising stage applied after render_block (None to skip)
+            target_rate : int, rate of the file if different from samplerate (resampled on the fly)
+            block_size : int, samples rendered at once
+            on_progress : callable (progress), called from the worker thread after every block
+
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{extension}', expected one of {list(EXPORT_FORMATS)}")
+        self.path = path
+        self.format, self.subtype = EXPORT_FORMATS[extension]
+        self.n_samples = n_samples
+        self.samplerate = samplerate
+        self.render_block = render_block
+        self.denoiser = denoiser
+        self.target_rate = target_rate or samplerate
+        self.block_size = block_size
+        self.on_progress = on_progress
+        self.written = 0  # Processed samples handed to the encoder
+        self._cancel_event = threading.Event()
+
+    @property
+    def progress(self):
+        return self.written / self.n_samples if self.n_samples else 1.0
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def _blocks(self):
+        """Yield the processed blocks in order, with the latency of the denoiser compensated."""
+        latency = self.denoiser.latency if self.denoiser is not None else 0
+        skip = latency
+        for start in range(0, self.n_samples + latency, self.block_size):
+            if self.cancelled:
+                raise ExportCancelled()
+            stop = min(start + self.block_size, self.n_samples + latency)
+            block = np.zeros(stop - start, dtype=np.float32)
+            if start < self.n_samples:
+                rendered = self.render_block(start, min(stop, self.n_samples))
+                block[:len(rendered)] = rendered
+            if self.denoiser is not None:
+                # The denoiser is delayed by `latency` samples: flush it with zeros and drop its first output
+                self.denoiser.process(block)
+                block = block[skip:]
+                skip -= min(skip, stop - start)
+            self.written = min(stop, self.n_samples)
+            if self.on_progress is not None:
+                self.on_progress(self.progress)
+            yield block
+
+    def run(self):
+        """
+        Render and encode the whole file. On cancellation or error the partial file is removed.
+
+            Output :
+                path : str, written file
+
+        """
+        import soundfile as sf
+
+        resampler = BlockResampler(self.samplerate, self.target_rate) if self.target_rate != self.samplerate else None
+        try:
+            with sf.SoundFile(self.path, "w", samplerate=int(self.target_rate), channels=1, format=self.format,
+                              subtype=self.subtype) as file:
+                for block in self._blocks():
+                    if resampler is not None:
+                        block = resampler.process(block)
+                    file.write(np.clip(block, -1, 1))
+                if resampler is not None:
+                    file.write(np.clip(resampler.flush(), -1, 1))
+        except BaseException:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            raise
+        return self.path
@@ -0,0 +1,134 @@
+import numpy as np
+from scipy.fft import rfftfreq
+
+# Level reported for silent bands, in dB
+FLOOR_DB = -120.0
+FLOOR_POWER = 10 ** (FLOOR_DB / 10)
+
+
+class MeterRing:
+    """
+    Single-producer / single-consumer ring of fixed-width float32 records, used in-process between the audio
+    callback and the GUI.
+
+    The producer fills the next row and only then moves the write counter, the consumer copies the rows written
+    since its last read. Nothing is locked and the producer never waits: when the GUI falls behind, the oldest
+    records are overwritten.
+
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.width = width
+        self._data = np.zeros((capacity, width), dtype=np.float32)
+        self.written = 0
+
+    def next_record(self):
+        """Return the row the producer fills next (committed with commit())."""
+        return self._data[self.written % self.capacity]
+
+    def commit(self):
+        self.written += 1
+
+    def read_since(self, index, out):
+        """
+        Copy the records written since index into out (at most out.shape[0] of the most recent ones).
+
+            Output :
+                count : int, number of records copied
+                index : int, index to pass to the next call
+
+        """
+        written = self.written
+        count = min(written - index, self.capacity - 1, len(out))
+        for row in range(count):
+            out[row] = self._data[(written - count + row) % self.capacity]
+        return count, written
+
+
+class LevelMeter:
+    """
+    Per-band RMS / peak levels and a log-frequency spectrum of the played blocks, measured from the spectrum the
+    block equalizer has already computed (no extra transform in the audio callback).
+
+    Every measured block becomes one record of the ring: band RMS levels, band peak levels, then the spectrum at
+    spectrum_points log-spaced frequencies, all in dB. Bin layouts and work buffers are computed once per block
+    length, and a configuration is swapped in as a whole like BlockEqualizer's.
+
+    """
+
+    def __init__(self, spectrum_points=128, fmin=20.0, capacity=64):
+        self.spectrum_points = spectrum_points
+        self.fmin = fmin
+        self.capacity = capacity
+        self._config = (None, (), None, None, {})
+
+    def configure(self, sampling_rate, frequency_ranges):
+        """Measure the given (low, high) bands, in Hz, from now on."""
+        frequency_ranges = tuple(frequency_ranges)
+        ring = MeterRing(self.capacity, 2 * len(frequency_ranges) + self.spectrum_points)
+        points = np.geomspace(self.fmin, sampling_rate / 2, self.spectrum_points)
+        self._config = (sampling_rate, frequency_ranges, ring, points, {})
+
+    @property
+    def ring(self):
+        return self._config[2]
+
+    @property
+    def frequency_ranges(self):
+        return self._config[1]
+
+    @property
+    def spectrum_frequencies(self):
+        return self._config[3]
+
+    def _layout(self, n, sampling_rate, frequency_ranges, cache):
+        layout = cache.get(n)
+        if layout is None:
+            freqs = rfftfreq(n, 1 / sampling_rate)
+            starts = np.array([np.searchsorted(freqs, low, side='left') for low, _ in frequency_ranges], dtype=int)
+            stops = np.array([np.searchsorted(freqs, high, side='right') for _, high in frequency_ranges], dtype=int)
+            layout = cache[n] = {
+                "freqs": freqs,
+                "starts": starts,
+                "stops": np.maximum(stops, starts),
+                "power": np.zeros(freqs.size, dtype=np.float32),
+                "cumulative": np.zeros(freqs.size + 1),  # Double precision: band powers are differences
+            }
+        return layout
+
+    def measure(self, spectrum, n):
+        """
+        Record the levels of one block from its rfft.
+
+            Input :
+                spectrum : 1D np.array, rfft of the block (n // 2 + 1 bins)
+                n : int, block length
+
+        """
+        sampling_rate, frequency_ranges, ring, points, cache = self._config
+        if sampling_rate is None or spectrum is None or n < 2:
+            return
+        layout = self._layout(n, sampling_rate, frequency_ranges, cache)
+        power, cumulative = layout["power"], layout["cumulative"]
+
+        # One-sided mean-square contribution of each bin (Parseval): 2 |X|^2 / n^2
+        np.abs(spectrum, out=power)
+        np.square(power, out=power)
+        power *= 2 / (n * n)
+        np.cumsum(power, out=cumulative[1:])
+
+        record = ring.next_record()
+        bands = len(frequency_ranges)
+        if bands:
+            starts, stops = layout["starts"], layout["stops"]
+            band_power = cumulative[stops] - cumulative[starts]
+            np.log10(np.maximum(band_power, FLOOR_POWER), out=record[:bands])
+            record[:bands] *= 10
+            for band in range(bands):
+                start, stop = starts[band], stops[band]
+                # Amplitude of the strongest partial of the band
+                peak = power[start:stop].max() if stop > start else 0.0
+                record[bands + band] = 10 * np.log10(max(2 * peak, FLOOR_POWER))
+        record[2 * bands:] = 10 * np.log10(np.maximum(np.interp(points, layout["freqs"], power), FLOOR_POWER))
+        ring.commit()
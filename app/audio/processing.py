@@ -0,0 +1,51 @@
+import numpy as np
+from scipy.fft import rfft, irfft
+
+from app.utils.bands import as_layout
+
+
+class BlockEqualizer:
+    """
+    Per-block equalizer used by the real-time playback path: each block is transformed, multiplied by the gain
+    curve of the band layout and transformed back.
+
+    The gain curve is computed once per block length and set of gains (from the layout's cached weight matrix), and a
+    configuration is swapped in as a whole so that the audio thread never sees a half-updated set of parameters.
+
+    """
+
+    def __init__(self, sampling_rate=None, bands=(), gains=()):
+        self._config = (sampling_rate, as_layout(bands), np.asarray(gains, dtype=np.float32), {})
+        self.spectrum = None  # Equalized spectrum of the last processed block, reused by the level meters
+
+    def configure(self, sampling_rate, bands, gains):
+        """Replace the sampling rate, bands (BandLayout or (low, high) ranges in Hz) and gains (one per band)."""
+        self._config = (sampling_rate, as_layout(bands), np.asarray(gains, dtype=np.float32), {})
+
+    def set_gains(self, gains):
+        sampling_rate, layout, _, _ = self._config
+        self._config = (sampling_rate, layout, np.asarray(gains, dtype=np.float32), {})
+
+    def process(self, block):
+        """
+        Equalize one block in place.
+
+            Input :
+                block : 1D np.array (float32), samples of the block
+
+        """
+        sampling_rate, layout, gains, curves = self._config
+        if sampling_rate is None or not len(layout) or len(block) < 2:
+            self.spectrum = None
+            return block
+
+        # Gain curve of the current gains for this block length
+        curve = curves.get(len(block))
+        if curve is None:
+            curve = curves[len(block)] = layout.curve(gains, len(block), sampling_rate)
+
+        spectrum = rfft(block)
+        spectrum *= curve
+        block[:] = irfft(spectrum, len(block))
+        self.spectrum = spectrum
+        return block
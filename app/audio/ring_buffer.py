@@ -0,0 +1,115 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Bytes reserved in front of the samples for the write and read counters
+HEADER_BYTES = 64
+
+
+class SharedRingBuffer:
+    """
+    Single-producer / single-consumer ring buffer of float32 frames living in multiprocessing.shared_memory.
+
+    The header holds two monotonically increasing frame counters: the producer only moves the write counter and the
+    consumer only moves the read counter, each after copying its data, so no lock is needed between the two
+    processes. Reads and writes never block: they move as many frames as are available / free.
+
+    """
+
+    def __init__(self, shm, capacity, channels, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.channels = channels
+        self.owner = owner
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=shm.buf[:16])
+        self._data = np.ndarray((capacity, channels), dtype=np.float32, buffer=shm.buf[HEADER_BYTES:])
+
+    @classmethod
+    def create(cls, capacity, channels=1):
+        """
+        Allocate a new ring buffer.
+
+            Input :
+                capacity : int, number of frames, rounded up to a power of two
+                channels : int, samples per frame
+
+        """
+        capacity = 1 << int(np.ceil(np.log2(max(capacity, 2))))
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * channels * 4)
+        ring = cls(shm, capacity, channels, owner=True)
+        ring._counters[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity, channels=1):
+        """Attach to a ring buffer created by another process."""
+        return cls(shared_memory.SharedMemory(name=name), capacity, channels, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def frames_written(self):
+        return int(self._counters[0])
+
+    @property
+    def frames_read(self):
+        return int(self._counters[1])
+
+    def available_read(self):
+        return self.frames_written - self.frames_read
+
+    def available_write(self):
+        return self.capacity - self.available_read()
+
+    def write(self, frames):
+        """
+        Append frames (1D for mono, or frames x channels), as many as fit.
+
+            Output :
+                count : int, number of frames written
+
+        """
+        frames = np.asarray(frames, dtype=np.float32).reshape(-1, self.channels)
+        count = min(len(frames), self.available_write())
+        position = self.frames_written
+        start = position & (self.capacity - 1)
+        first = min(count, self.capacity - start)
+        self._data[start:start + first] = frames[:first]
+        self._data[:count - first] = frames[first:count]
+        self._counters[0] = position + count  # Publish only once the samples are in place
+        return count
+
+    def read_into(self, out):
+        """
+        Consume frames into out (1D for mono, or frames x channels), as many as are available.
+
+            Output :
+                count : int, number of frames copied (the rest of out is left untouched)
+
+        """
+        out = out.reshape(-1, self.channels)
+        count = min(len(out), self.available_read())
+        position = self.frames_read
+        start = position & (self.capacity - 1)
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        out[first:count] = self._data[:count - first]
+        self._counters[1] = position + count
+        return count
+
+    def discard(self):
+        """Drop every unread frame (consumer side)."""
+        self._counters[1] = self._counters[0]
+
+    def seek(self, position):
+        """Move the read counter to an absolute frame position already written (consumer side)."""
+        self._counters[1] = min(max(position, self.frames_read), self.frames_written)
+
+    def close(self):
+        """Release this process's mapping, and the shared block itself if this process created it."""
+        del self._counters, self._data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
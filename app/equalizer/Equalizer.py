@@ -0,0 +1,283 @@
+from functools import lru_cache
+
+import numpy as np
+
+from app.utils.bands import as_layout
+from app.utils.fft_backend import default_backend
+from app.utils.precision import real_dtype, complex_dtype
+
+# Narrowband delta updates: oversampling of the decimated band, taps per phase and Kaiser beta of the polyphase
+# interpolator (band component within about 1e-6 of the full inverse), and smallest decimation worth using
+DELTA_OVERSAMPLING = 2
+DELTA_TAPS = 16
+DELTA_BETA = 13.0
+MIN_DELTA_DECIMATION = 8
+
+
+@lru_cache(maxsize=8)
+def _divisors(n):
+    """Return the divisors of n, largest first."""
+    small = [d for d in range(1, int(n ** 0.5) + 1) if n % d == 0]
+    return tuple(sorted(set(small + [n // d for d in small]), reverse=True))
+
+
+@lru_cache(maxsize=32)
+def _interpolator(decimation, taps, beta):
+    """Kaiser-windowed sinc interpolator from a grid decimated by D, as a (D x taps) polyphase table."""
+    u = np.arange(decimation)[:, np.newaxis] / decimation - np.arange(-taps // 2 + 1, taps // 2 + 1)[np.newaxis, :]
+    window = np.i0(beta * np.sqrt(np.clip(1 - (u / (taps / 2)) ** 2, 0, None))) / np.i0(beta)
+    return np.sinc(u) * window
+
+
+class Equalizer:
+    """
+    Frequency-domain equalizer applying one gain per frequency band to a whole signal.
+
+    The forward transform of the signal is computed once and kept, so rendering a new set of gains only costs a
+    multiplication and an inverse transform. Several gain vectors can be rendered at once with render_batch, which
+    builds the gain curves one candidate at a time and runs the inverse transforms as one batched irfft across the
+    backend worker threads.
+
+    Bands are a BandLayout (or plain (low, high) ranges): a gain curve is one product with the layout's cached
+    (bands x bins) weight matrix, with smooth crossovers on the edges shared by two bands.
+
+    A render can also be updated in place for a new set of gains with render_delta, which only synthesizes the
+    changed narrow bands on a decimated grid.
+
+    """
+
+    def __init__(self, bands, backend=None):
+        """
+        Input :
+            bands : BandLayout, or list of (low, high) tuples in Hz, one per band
+            backend : FFTBackend, transform backend (defaults to the shared one)
+
+        """
+        self.backend = backend or default_backend
+        self.layout = as_layout(bands)
+        self.frequency_ranges = list(self.layout.ranges)
+        self.signal = None
+        self.fs = None
+        self.n = 0
+        self.n_fast = 0
+        self.spectrum = None
+        self.freqs = None
+
+    def set_bands(self, bands):
+        """Change the band layout (BandLayout or list of ranges), keeping the cached spectrum."""
+        self.layout = as_layout(bands)
+        self.frequency_ranges = list(self.layout.ranges)
+
+    def set_signal(self, signal, fs, spectrum=None, transform=True):
+        """
+        Compute and cache the forward transform of a signal. Nothing is recomputed if the same array is passed again.
+
+            Input :
+                signal : 1D np.array, time-domain signal
+                fs : float, sampling rate in Hz
+                spectrum : 1D np.array, forward transform of the signal if already known (e.g. from the project cache)
+                transform : bool, False to skip the forward transform when only render_window is used
+
+        """
+        if signal is self.signal and fs == self.fs and (self.spectrum is not None or not transform):
+            return
+        self.signal, self.fs = signal, fs
+        self.n = len(signal)
+        self.n_fast = self.backend.fast_length(self.n)
+        if spectrum is None and transform:
+            spectrum = self.backend.rfft(signal, self.n_fast)
+        self.spectrum = spectrum
+        self.freqs = self.backend.rfftfreq(self.n, 1 / fs, self.n_fast)
+
+    def gain_curves(self, gain_matrix, n_fft=None):
+        """
+        Build the per-bin gain curves of K gain vectors.
+
+            Input :
+                gain_matrix : 2D np.array (K x bands), one gain per band for each of the K candidates
+                n_fft : int, transform length of the frequency grid (defaults to the cached spectrum)
+            Output :
+                curves : 2D np.array (K x bins), gain applied to each bin
+
+        """
+        return self.layout.curves(gain_matrix, n_fft or self.n_fast, self.fs)
+
+    def render(self, gains):
+        """
+        Render the signal with one gain vector.
+
+            Input :
+                gains : 1D np.array, one gain per band
+            Output :
+                output : 1D np.array, equalized signal
+
+        """
+        return self.render_batch(np.asarray(gains)[np.newaxis, :])[0]
+
+    def render_batch(self, gain_matrix, batch_size=None):
+        """
+        Render the signal with K gain vectors from the single cached forward transform.
+
+            Input :
+                gain_matrix : 2D np.array (K x bands), one gain vector per output
+                batch_size : int, maximum number of outputs transformed together (bounds the K x bins memory)
+            Output :
+                outputs : 2D np.array (K x n), one equalized signal per gain vector
+
+        """
+        if self.spectrum is None:
+            raise RuntimeError("Equalizer.set_signal must be called before rendering")
+        gain_matrix = np.atleast_2d(gain_matrix)
+        batch_size = batch_size or gain_matrix.shape[0]
+
+        outputs = np.empty((gain_matrix.shape[0], self.n), dtype=real_dtype())
+        spectra = np.empty((min(batch_size, gain_matrix.shape[0]), self.spectrum.size), dtype=self.spectrum.dtype)
+        for first in range(0, gain_matrix.shape[0], batch_size):
+            batch = gain_matrix[first:first + batch_size]
+            # One gain curve at a time written straight into the spectra (no K x bins gain curves), then one batched
+            # inverse
+            work = spectra[:len(batch)]
+            for row, gains in enumerate(batch):
+                np.multiply(self.spectrum, self.layout.curve(gains, self.n_fast, self.fs), out=work[row])
+            outputs[first:first + batch_size] = self.backend.irfft(work, self.n, self.n_fast)
+        return outputs
+
+    def delta_decimation(self, n_bins):
+        """Return the decimation used to synthesize a band of n_bins bins, None if it is too wide to be worth it."""
+        for decimation in _divisors(self.n_fast):
+            if decimation < MIN_DELTA_DECIMATION:
+                return None
+            decimated = self.n_fast // decimation
+            if decimated >= 2 * DELTA_TAPS and (n_bins + 1) * DELTA_OVERSAMPLING <= decimated:
+                return decimation
+        return None
+
+    def add_band_component(self, output, band_spectrum, start, decimation):
+        """
+        Add the time-domain signal of a band-limited spectrum to output, without a full-length inverse transform.
+
+        The bins are folded onto a grid of n_fast / D bins and one short inverse FFT gives the band signal at every
+        D-th sample (with its center frequency aliased, which is undone by the interpolator). A polyphase
+        windowed-sinc interpolator, with the demodulation folded into its D x taps table, brings it back to the full
+        rate as one small matrix product per chunk of output, accumulated in place.
+
+            Input :
+                output : 1D np.array (n samples), updated in place
+                band_spectrum : 1D np.array (complex), bins [start, start + len) of an rfft of length n_fast
+                start : int, first bin of the band
+                decimation : int, divisor of n_fast (see delta_decimation)
+
+        """
+        n_fast, taps = self.n_fast, DELTA_TAPS
+        decimated = n_fast // decimation
+        bins = np.arange(start, start + band_spectrum.size)
+        center = (bins[0] + bins[-1]) // 2
+
+        # irfft counts the DC and Nyquist bins once (real part only) and the others twice
+        band_spectrum = np.array(band_spectrum, dtype=complex)
+        edges = (bins == 0) | (bins == n_fast // 2) if n_fast % 2 == 0 else bins == 0
+        band_spectrum[edges] = band_spectrum[edges].real / 2
+
+        folded = np.zeros(decimated, dtype=complex)
+        np.add.at(folded, bins % decimated, band_spectrum)
+        band = (self.backend.ifft(folded) * decimated).astype(complex_dtype())
+        # Circular signal: wrap the taps needed around both ends
+        band = np.concatenate([band[decimated - (taps // 2 - 1):], band, band[:taps // 2]])
+
+        # Output sample q D + r is the sum over p of Re(table[p, r] * band[q + p]), with the modulation by the center
+        # bin, exp(2 i pi center (r - p D) / n_fast), folded into the table
+        offsets = np.arange(-taps // 2 + 1, taps // 2 + 1)[:, np.newaxis] * decimation
+        phase = (center * ((np.arange(decimation)[np.newaxis, :] - offsets) % n_fast)) % n_fast
+        table = (2 / n_fast) * _interpolator(decimation, taps, DELTA_BETA).T * np.exp(2j * np.pi * phase / n_fast)
+        table = np.concatenate([table.real, -table.imag]).astype(real_dtype())
+
+        windows = np.lib.stride_tricks.sliding_window_view(band, taps)
+        rows = -(-len(output) // decimation)
+        chunk = max(1, 2 ** 16 // decimation)
+        for first in range(0, rows, chunk):
+            block = windows[first:min(first + chunk, rows)]
+            samples = (np.concatenate([block.real, block.imag], axis=1) @ table).ravel()
+            stop = min((first + len(block)) * decimation, len(output))
+            output[first * decimation:stop] += samples[:stop - first * decimation]
+
+    def render_delta(self, output, old_gains, new_gains):
+        """
+        Turn a render of old_gains into a render of new_gains in place, when the changed bands are narrow.
+
+        The equalizer is linear: the output only changes by the component of the signal in the changed bands times
+        their change of weight, which is synthesized band by band on a decimated grid (see add_band_component) for a
+        fraction of the cost of a full inverse transform.
+
+            Input :
+                output : 1D np.array, render of old_gains (n samples), updated in place
+                old_gains, new_gains : 1D np.array, one gain per band
+            Output :
+                applied : bool, False if a changed band is too wide (output untouched, a full render is needed)
+
+        """
+        if self.spectrum is None:
+            raise RuntimeError("Equalizer.set_signal must be called before rendering")
+        delta = np.asarray(new_gains, dtype=float) - np.asarray(old_gains, dtype=float)
+        weights = self.layout.weights(self.n_fast, self.fs)
+
+        changes = []
+        for band in np.flatnonzero(delta):
+            bins = weights.indices[weights.indptr[band]:weights.indptr[band + 1]]
+            if not bins.size:
+                continue
+            start, stop = int(bins.min()), int(bins.max()) + 1
+            decimation = self.delta_decimation(stop - start)
+            if decimation is None:
+                return False
+            changes.append((band, bins, start, stop, decimation))
+
+        for band, bins, start, stop, decimation in changes:
+            band_spectrum = np.zeros(stop - start, dtype=self.spectrum.dtype)
+            band_spectrum[bins - start] = weights.data[weights.indptr[band]:weights.indptr[band + 1]] * delta[band]
+            band_spectrum *= self.spectrum[start:stop]
+            self.add_band_component(output, band_spectrum, start, decimation)
+        return True
+
+    def render_window(self, gains, start, stop, frame=4096):
+        """
+        Render only the samples [start, stop) with a short-time overlap-add equalizer, without touching the full
+        spectrum. Used to preview a new setting around the playhead while the full render runs in the background.
+
+            Input :
+                gains : 1D np.array, one gain per band
+                start, stop : int, sample range to render
+                frame : int, analysis frame length (even), frames overlap by half
+            Output :
+                output : 1D np.array, equalized samples of [start, stop)
+
+        """
+        hop = frame // 2
+        start, stop = max(0, int(start)), min(self.n, int(stop))
+        if stop <= start:
+            return np.zeros(0, dtype=real_dtype())
+
+        # Analysed segment on a fixed grid of hops (zeros outside the signal), from the first frame whose filtered
+        # output, two frames long, reaches start: consecutive windows then add up exactly like a single render
+        first = start // hop * hop - 2 * frame + hop
+        n_frames = (stop - 1 - first) // hop + 1
+        segment = np.zeros((n_frames + 1) * hop, dtype=real_dtype())
+        available = self.signal[max(first, 0):first + segment.size]
+        segment[max(-first, 0):max(-first, 0) + available.size] = available
+
+        # Periodic Hann frames at 50 % overlap sum to one, so unity gains reconstruct the input exactly
+        window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(real_dtype())
+        frames = np.lib.stride_tricks.as_strided(segment, shape=(n_frames, frame),
+                                                 strides=(hop * segment.itemsize, segment.itemsize))
+
+        # Zero padded to twice the frame length to keep the filtered frames from wrapping around
+        n_fft = 2 * frame
+        curve = self.layout.curve(gains, n_fft, self.fs)
+        spectra = self.backend.rfft(frames * window, n_fft) * curve
+        filtered = self.backend.irfft(spectra, n_fft, n_fft).reshape(n_frames, 4, hop)
+
+        # Overlap-add: each filtered frame spans four hops
+        output = np.zeros((n_frames + 3, hop), dtype=real_dtype())
+        for quarter in range(4):
+            output[quarter:quarter + n_frames] += filtered[:, quarter, :]
+        output = output.ravel()
+        return output[start - first:stop - first]
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class RenderEntry:
+    """Rendered output of one equalizer setting and its spectrogram image."""
+
+    def __init__(self, output, spectrogram=None):
+        self.output = output
+        self.spectrogram = spectrogram
+
+    @property
+    def nbytes(self):
+        return self.output.nbytes + (self.spectrogram.nbytes if self.spectrogram is not None else 0)
+
+
+class RenderCache:
+    """
+    Bounded LRU cache of rendered outputs, keyed by (signal id, mode, quantized gain vector).
+
+    The cache holds at most max_bytes of output buffers and spectrogram images; the least recently used entries are
+    evicted when a new entry would exceed the ceiling.
+
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, gain_step=0.02):
+        """
+        Input :
+            max_bytes : int, RAM ceiling of the cached buffers in bytes
+            gain_step : float, gain quantization step used to build the keys
+
+        """
+        self.max_bytes = max_bytes
+        self.gain_step = gain_step
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def make_key(self, signal_id, mode, layout, gains):
+        """
+        Build the cache key of a gain vector under a band layout (layouts with as many bands render differently),
+        quantized so that equivalent slider positions share an entry.
+        """
+        quantized = np.round(np.asarray(gains, dtype=float) / self.gain_step).astype(int)
+        return signal_id, mode, layout, tuple(quantized.tolist())
+
+    def get(self, key):
+        """Return the entry stored under key (marking it as most recently used), or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, output, spectrogram=None):
+        """
+        Store a rendered output, evicting least recently used entries to stay under the RAM ceiling.
+
+            Output :
+                entry : RenderEntry, the stored entry (not kept if it is larger than the whole ceiling)
+
+        """
+        self.discard(key)
+        entry = RenderEntry(output, spectrogram)
+        if entry.nbytes > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        self._evict()
+        return entry
+
+    def set_spectrogram(self, key, spectrogram):
+        """Attach a spectrogram image to an existing entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        self.nbytes -= entry.nbytes
+        entry.spectrogram = spectrogram
+        self.nbytes += entry.nbytes
+        self._evict()
+
+    def discard(self, key):
+        """Remove one entry if present."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def invalidate(self, signal_id):
+        """Remove every entry rendered from the given signal."""
+        for key in [key for key in self._entries if key[0] == signal_id]:
+            self.discard(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+
+
+class RenderHistory:
+    """
+    Undo / redo history of equalizer settings, with an A/B toggle between the last two distinct settings.
+    States are any hashable value, typically (mode, gains tuple).
+    """
+
+    def __init__(self, max_length=100):
+        self.max_length = max_length
+        self._undo = []
+        self._redo = []
+        self.current = None
+        self.previous = None  # Setting compared against by the A/B toggle
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.current = None
+        self.previous = None
+
+    def push(self, state):
+        """Record a new setting. Pushing the current setting again does nothing."""
+        if state == self.current:
+            return
+        if self.current is not None:
+            self._undo.append(self.current)
+            del self._undo[:-self.max_length]
+        self._redo.clear()
+        self.previous, self.current = self.current, state
+
+    def undo(self):
+        """Step back to the previous setting and return it (None if there is none)."""
+        if not self._undo:
+            return None
+        self._redo.append(self.current)
+        self.previous, self.current = self.current, self._undo.pop()
+        return self.current
+
+    def redo(self):
+        """Step forward to the next undone setting and return it (None if there is none)."""
+        if not self._redo:
+            return None
+        self._undo.append(self.current)
+        self.previous, self.current = self.current, self._redo.pop()
+        return self.current
+
+    def toggle_ab(self):
+        """Swap the current setting with the one compared against and return it (None if there is none)."""
+        if self.previous is None:
+            return None
+        self.previous, self.current = self.current, self.previous
+        return self.current
@@ -0,0 +1,177 @@
+import numpy as np
+from scipy.ndimage import median_filter
+
+from app.utils.fft_backend import default_backend
+from app.utils.precision import real_dtype, complex_dtype
+
+
+class MaskSeparator:
+    """
+    Harmonic / percussive separation with median-filtered soft time-frequency masks.
+
+    analyze() computes the STFT of the signal once, chunk after chunk, and derives the harmonic soft mask from two
+    median filters of its magnitude: along time (sustained, harmonic partials such as voice and keyboard) and along
+    frequency (transient, percussive onsets). Only the STFT and the harmonic mask are kept, the percussive mask being
+    its complement.
+
+    render() then mixes the two parts with any gains (and an optional per-bin gain curve, e.g. the equalizer bands)
+    by scaling the cached STFT with the combined mask and overlap-adding the inverse transforms into the output
+    buffer, chunk after chunk. Changing the gains never redoes the analysis.
+
+    """
+
+    def __init__(self, frame=2048, hop=512, harmonic_kernel=17, percussive_kernel=17, power=2.0, chunk_frames=512,
+                 backend=None, budget=None):
+        """
+        Input :
+            frame, hop : int, STFT frame length and hop in samples
+            harmonic_kernel : int, median filter length along time, in frames
+            percussive_kernel : int, median filter length along frequency, in bins
+            power : float, exponent of the soft (Wiener-like) masks
+            chunk_frames : int, number of frames analysed or rendered at once (bounds the working memory)
+            backend : FFTBackend, transform backend (defaults to the shared one)
+            budget : MemoryBudget, accounts the STFT and mask, and maps them to disk above its RAM ceiling
+
+        """
+        self.FRAME, self.HOP = frame, hop
+        self.harmonic_kernel = harmonic_kernel
+        self.percussive_kernel = percussive_kernel
+        self.power = power
+        self.chunk_frames = chunk_frames
+        self.backend = backend or default_backend
+
+        # Periodic Hann window for analysis and synthesis, normalized by the overlap-added squared window
+        self.WINDOW = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(real_dtype())
+        self.SCALE = real_dtype()(hop / np.sum(self.WINDOW ** 2))
+
+        self.signal = None
+        self.fs = None
+        self.n = 0
+        self.stft = None  # (frames x bins), cached analysis
+        self.harmonic_mask = None  # (frames x bins), soft mask of the harmonic part
+        self.freqs = None
+
+        self.budget = budget
+        if budget is not None:
+            budget.track("Separation STFT", self, "stft")
+            budget.track("Harmonic mask", self, "harmonic_mask")
+
+    @property
+    def n_frames(self):
+        return 0 if self.stft is None else self.stft.shape[0]
+
+    def analyze(self, signal, fs):
+        """
+        Compute and cache the STFT and the harmonic mask of a signal. Nothing is recomputed if the same array is
+        passed again.
+
+            Input :
+                signal : 1D np.array, time-domain signal
+                fs : float, sampling rate in Hz
+
+        """
+        if signal is self.signal and fs == self.fs:
+            return
+        self.signal, self.fs, self.n = signal, fs, len(signal)
+        self.freqs = self.backend.rfftfreq(self.FRAME, 1 / fs, self.FRAME)
+
+        # Every sample is covered by the same number of frames: FRAME - HOP zeros before, up to a whole frame after
+        n_frames = -(-(self.n + self.FRAME - self.HOP) // self.HOP)
+        self.stft = self.harmonic_mask = None  # Released before the new buffers are allocated
+        self.stft = self._empty("Separation STFT", (n_frames, self.FRAME // 2 + 1), complex_dtype())
+        for first in range(0, n_frames, self.chunk_frames):
+            last = min(first + self.chunk_frames, n_frames)
+            self.stft[first:last] = self.backend.rfft(self._frames(first, last) * self.WINDOW, self.FRAME)
+
+        self.harmonic_mask = self._empty("Harmonic mask", self.stft.shape, real_dtype())
+        margin = self.harmonic_kernel // 2
+        for first in range(0, n_frames, self.chunk_frames):
+            last = min(first + self.chunk_frames, n_frames)
+            # The filter along time needs margin frames of context on each side of the chunk
+            low, high = max(first - margin, 0), min(last + margin, n_frames)
+            magnitude = np.abs(self.stft[low:high])
+            harmonic = median_filter(magnitude, size=(self.harmonic_kernel, 1), mode='reflect')[first - low:last - low]
+            percussive = median_filter(magnitude[first - low:last - low], size=(1, self.percussive_kernel),
+                                       mode='reflect')
+            np.power(harmonic, self.power, out=harmonic)
+            np.power(percussive, self.power, out=percussive)
+            total = harmonic + percussive
+            np.divide(harmonic, total, out=self.harmonic_mask[first:last], where=total > 0)
+            self.harmonic_mask[first:last][total <= 0] = 0.5
+
+    def _empty(self, name, shape, dtype):
+        if self.budget is not None:
+            return self.budget.empty(name, shape, dtype)
+        return np.empty(shape, dtype=dtype)
+
+    def _frames(self, first, last):
+        """Return the time-domain frames [first, last) of the zero-padded signal."""
+        start = first * self.HOP - (self.FRAME - self.HOP)
+        stop = (last - 1) * self.HOP + self.FRAME - (self.FRAME - self.HOP)
+        segment = np.zeros(stop - start, dtype=real_dtype())
+        available = self.signal[max(start, 0):max(min(stop, self.n), 0)]
+        segment[max(-start, 0):max(-start, 0) + available.size] = available
+        return np.lib.stride_tricks.as_strided(segment, shape=(last - first, self.FRAME),
+                                               strides=(self.HOP * segment.itemsize, segment.itemsize))
+
+    def iter_render(self, harmonic_gain=1.0, percussive_gain=1.0, frequency_gain=None, out=None):
+        """
+        Render the remix into out chunk after chunk, yielding each finished sample range so that callers can play or
+        display the beginning of the output while the rest is being rendered.
+
+            Input :
+                harmonic_gain, percussive_gain : float, gains of the two parts
+                frequency_gain : 1D np.array, optional gain of each STFT bin (see freqs)
+                out : 1D np.array, output buffer of n samples (allocated if None)
+            Output (yielded) :
+                start, stop : int, range of out that is final
+
+        """
+        if self.stft is None:
+            raise RuntimeError("MaskSeparator.analyze must be called before rendering")
+        out = np.zeros(self.n, dtype=real_dtype()) if out is None else out
+        out.fill(0)
+        offset = self.FRAME - self.HOP  # Padding in front of the signal
+        ratio = self.FRAME // self.HOP
+        done = 0
+        for first in range(0, self.n_frames, self.chunk_frames):
+            last = min(first + self.chunk_frames, self.n_frames)
+
+            # Mask = percussive gain + (harmonic gain - percussive gain) * harmonic mask, optionally times the curve
+            mask = self.harmonic_mask[first:last] * real_dtype()(harmonic_gain - percussive_gain)
+            mask += real_dtype()(percussive_gain)
+            if frequency_gain is not None:
+                mask *= frequency_gain
+            frames = self.backend.irfft(self.stft[first:last] * mask, self.FRAME, self.FRAME)
+            frames *= self.WINDOW * self.SCALE
+
+            # Overlap-add of the chunk: each frame spans `ratio` hops
+            hops = frames.reshape(last - first, ratio, self.HOP)
+            chunk = np.zeros((last - first + ratio - 1, self.HOP), dtype=real_dtype())
+            for part in range(ratio):
+                chunk[part:part + last - first] += hops[:, part, :]
+            chunk = chunk.ravel()
+            start = first * self.HOP - offset
+            low, high = max(start, 0), min(start + chunk.size, self.n)
+            out[low:high] += chunk[low - start:high - start]
+
+            # Samples before the first frame of the next chunk will not receive anything else
+            finished = min(last * self.HOP - offset, self.n) if last < self.n_frames else self.n
+            if finished > done:
+                yield done, finished
+                done = finished
+
+    def render(self, harmonic_gain=1.0, percussive_gain=1.0, frequency_gain=None, out=None):
+        """
+        Render the remix of the harmonic and percussive parts.
+
+            Input :
+                see iter_render
+            Output :
+                output : 1D np.array, remixed signal
+
+        """
+        out = np.zeros(self.n, dtype=real_dtype()) if out is None else out
+        for _ in self.iter_render(harmonic_gain, percussive_gain, frequency_gain, out):
+            pass
+        return out
@@ -0,0 +1,359 @@
+"""
+Local processing daemon.
+
+Runs equalization and Wiener denoising jobs for other tools of the same host without starting the GUI. Jobs are sent
+as JSON lines over a localhost TCP connection, queued by priority and run by a pool of persistent worker threads, so
+the interpreter, imports, FFT plans and workspaces, decoded projects and noise estimates stay warm from one job to the
+next. Progress and the output path are streamed back on the connection that submitted the job.
+
+    python -m app.server.daemon serve --workers 2
+    python -m app.server.daemon submit input.wav --gains 1,1,0.5,0,0,1,1,1,1,1 --output out.flac
+
+Protocol (one JSON object per line, every reply carries the "event" key):
+
+    {"op": "submit", "input": path, "gains": [...], "bands": [[low, high], ...], "scale": "linear", "output": path,
+     "denoise": {"noise": [begin, end]}, "priority": 0, "upsample": false}
+        -> queued, then progress (0 to 1), then done (with "output") or error / cancelled
+    {"op": "status", "job": id}   -> status
+    {"op": "cancel", "job": id}   -> cancelling
+    {"op": "ping"}                -> pong
+    {"op": "shutdown"}            -> bye
+
+"bands" defaults to len(gains) bands up to the Nyquist frequency, spaced by "scale" ("linear" or "log"), "output" to a
+WAV file in the artifact cache, and jobs with a lower priority run first (first come, first served among equal
+priorities). Without a "noise" region, the denoiser tracks the noise along the file ({"denoise": {}} or
+{"denoise": true}).
+
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.audio.export import ExportJob, ExportCancelled
+from app.equalizer.Equalizer import Equalizer
+from app.utils.artifact_cache import default_artifacts
+from app.utils.bands import BandLayout, band_ranges
+from app.utils.fft_backend import FFTBackend, WORKERS
+from app.utils.hashing import file_hash
+from app.utils.project_cache import ProjectCache
+from app.utils.resample import DEFAULT_PROCESSING_RATE
+from app.wiener_filter.StreamingWiener import StreamingWiener
+
+HOST = "127.0.0.1"
+# Port of the daemon, can be overridden with the SIGNAL_EQUALIZER_DAEMON_PORT environment variable
+DEFAULT_PORT = int(os.environ.get("SIGNAL_EQUALIZER_DAEMON_PORT", "8765"))
+
+# Smallest progress step streamed back to the client
+PROGRESS_STEP = 0.01
+
+
+class Job:
+    """One queued request and its state, shared between the connection that submitted it and a worker."""
+
+    def __init__(self, job_id, request, notify):
+        self.id = job_id
+        self.request = request
+        self.notify = notify  # callable (event dict), writes to the submitting connection
+        self.state = "queued"
+        self.progress = 0.0
+        self.output = None
+        self.export = None  # Running ExportJob, for cancellation
+        self.cancelled = False
+
+    def send(self, event, **values):
+        self.notify(dict(event=event, job=self.id, **values))
+
+    def status(self):
+        return {"event": "status", "job": self.id, "state": self.state, "progress": self.progress,
+                "output": self.output}
+
+
+class ProcessingDaemon:
+    """
+    Priority queue of jobs and the pool of worker threads running them.
+
+    The workers share one process: scipy keeps the FFT plans of the recurring sizes cached, the FFT backend keeps one
+    set of padded workspaces per worker thread, decoded samples and spectra are memory mapped from the project cache,
+    and the noise PSD of each (file, noise region) is kept in memory once estimated.
+
+    """
+
+    def __init__(self, workers=2, processing_rate=DEFAULT_PROCESSING_RATE, artifacts=default_artifacts,
+                 max_noise_estimates=64, max_finished_jobs=1024):
+        """
+        Input :
+            workers : int, number of worker threads (the cores are split between them for the transforms)
+            processing_rate : int, rate the inputs are processed at (None for their native rate)
+            artifacts : ArtifactCache, where projects and default outputs are stored
+            max_noise_estimates : int, noise PSDs kept in memory
+            max_finished_jobs : int, finished jobs whose status can still be queried
+
+        """
+        self.processing_rate = processing_rate
+        self.artifacts = artifacts
+        self.projects = ProjectCache(artifacts=artifacts)
+        self.backend = FFTBackend(workers=max(1, WORKERS // workers))
+        self.max_noise_estimates = max_noise_estimates
+        self._noise = OrderedDict()  # (file hash, begin, end, fs) -> noise PSD
+        self._noise_lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self.jobs = {}  # id -> Job, in submission order
+        self.max_finished_jobs = max_finished_jobs
+        self._finished = queue.SimpleQueue()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, request, notify):
+        """Queue a job request (see the module docstring) and return its Job."""
+        if "input" not in request or "gains" not in request:
+            raise ValueError("A job needs an 'input' path and 'gains'")
+        job = Job(next(self._ids), request, notify)
+        self.jobs[job.id] = job
+        job.send("queued")  # Before a worker can pick it up, so that it is always the first event
+        self._queue.put((int(request.get("priority", 0)), next(self._order), job))
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancelled = True
+            if job.export is not None:
+                job.export.cancel()
+        return job
+
+    def shutdown(self):
+        """Stop the workers once they finish their current job."""
+        for _ in self._workers:
+            self._queue.put((float("-inf"), next(self._order), None))
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            if job.cancelled:
+                job.state = "cancelled"
+                job.send("cancelled")
+                self._forget_old(job)
+                continue
+            job.state = "running"
+            try:
+                job.output = self.run(job)
+                job.state, job.progress = "done", 1.0
+                job.send("done", output=job.output)
+            except ExportCancelled:
+                job.state = "cancelled"
+                job.send("cancelled")
+            except Exception as error:
+                job.state = "error"
+                job.send("error", message=str(error))
+            self._forget_old(job)
+
+    def _forget_old(self, job):
+        """Keep the status of the last max_finished_jobs finished jobs only."""
+        job.export = None
+        self._finished.put(job.id)
+        while self._finished.qsize() > self.max_finished_jobs:
+            self.jobs.pop(self._finished.get(), None)
+
+    def noise_psd(self, path, samples, fs, region):
+        """Return the noise PSD of the (begin, end) region of a file, estimated on its first use only."""
+        key = (file_hash(path), float(region[0]), float(region[1]), fs)
+        with self._noise_lock:
+            noise_psd = self._noise.pop(key, None)
+            if noise_psd is None:
+                estimator = StreamingWiener(fs)
+                estimator.estimate_noise(samples[int(region[0] * fs):int(region[1] * fs)])
+                noise_psd = estimator.noise_psd
+                if len(self._noise) >= self.max_noise_estimates:
+                    self._noise.popitem(last=False)
+            self._noise[key] = noise_psd
+        return noise_psd
+
+    def run(self, job):
+        """Render one job to its output file with the streaming exporter, reporting progress on the way."""
+        request = job.request
+        project, samples = self.projects.load_audio(request["input"], self.processing_rate)
+        fs = project.meta["sampling_rate"]
+
+        gains = np.asarray(request["gains"], dtype=float)
+        scale = request.get("scale", "linear")
+        bands = request.get("bands") or band_ranges(len(gains), fs, scale)
+        if len(bands) != len(gains):
+            raise ValueError(f"{len(gains)} gains given for {len(bands)} bands")
+
+        # Overlap-add rendering block by block, which never needs the full-file spectrum
+        equalizer = Equalizer(BandLayout(bands, scale=scale), self.backend)
+        equalizer.set_signal(samples, fs, transform=False)
+
+        denoiser = None
+        if request.get("denoise") is not None and request["denoise"] is not False:
+            region = request["denoise"].get("noise") if isinstance(request["denoise"], dict) else None
+            if region is None:
+                denoiser = StreamingWiener(fs, track_noise=True)
+            else:
+                denoiser = StreamingWiener(fs, noise_psd=self.noise_psd(request["input"], samples, fs, region))
+
+        output = request.get("output")
+        if not output:
+            name = f"{file_hash(request['input'])}_{job.id}.wav"
+            output = self.artifacts.path("daemon", name)
+        target_rate = project.meta["source_rate"] if request.get("upsample") else None
+
+        def on_progress(progress):
+            if progress - job.progress >= PROGRESS_STEP or progress >= 1.0:
+                job.progress = progress
+                job.send("progress", progress=round(progress, 4))
+
+        job.export = ExportJob(output, len(samples), fs, lambda start, stop: equalizer.render_window(gains, start, stop),
+                               denoiser, target_rate, on_progress=on_progress)
+        if job.cancelled:
+            job.export.cancel()
+        job.export.run()
+        if os.path.dirname(os.path.abspath(output)).startswith(self.artifacts.root):
+            self.artifacts.register(output)
+        return output
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection: reads requests line by line, writes replies and job events as JSON lines."""
+
+    def setup(self):
+        super().setup()
+        self._write_lock = threading.Lock()
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode()
+        with self._write_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                pass  # The client went away, its jobs keep running
+
+    def handle(self):
+        daemon = self.server.daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                operation = request.get("op")
+                if operation == "submit":
+                    daemon.submit(request, self.send)
+                elif operation in ("status", "cancel"):
+                    job = daemon.cancel(request.get("job")) if operation == "cancel" else daemon.jobs.get(
+                        request.get("job"))
+                    if job is None:
+                        self.send({"event": "error", "message": f"Unknown job {request.get('job')}"})
+                    else:
+                        self.send(job.status() if operation == "status" else {"event": "cancelling", "job": job.id})
+                elif operation == "ping":
+                    self.send({"event": "pong"})
+                elif operation == "shutdown":
+                    self.send({"event": "bye"})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                else:
+                    self.send({"event": "error", "message": f"Unknown operation {operation!r}"})
+            except (ValueError, KeyError, TypeError) as error:
+                self.send({"event": "error", "message": str(error)})
+
+
+class DaemonServer(socketserver.ThreadingTCPServer):
+    """Localhost TCP server of a ProcessingDaemon (one thread per connection)."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, daemon, host=HOST, port=DEFAULT_PORT):
+        self.daemon = daemon
+        super().__init__((host, port), _Handler)
+
+    def server_close(self):
+        self.daemon.shutdown()
+        super().server_close()
+
+
+def serve(workers=2, host=HOST, port=DEFAULT_PORT):
+    """Run the daemon until a shutdown request (or Ctrl+C)."""
+    with DaemonServer(ProcessingDaemon(workers), host, port) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def submit(request, host=HOST, port=DEFAULT_PORT):
+    """
+    Send one job to a running daemon and yield its events until it is finished.
+
+        Input :
+            request : dict, job description (see the module docstring, "op" may be omitted)
+        Output (yielded) :
+            event : dict, queued / progress events, then done, error or cancelled
+
+    """
+    with socket.create_connection((host, port)) as connection:
+        stream = connection.makefile("rw", encoding="utf-8")
+        stream.write(json.dumps(dict(request, op="submit")) + "\n")
+        stream.flush()
+        for line in stream:
+            event = json.loads(line)
+            yield event
+            if event["event"] in ("done", "error", "cancelled"):
+                return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local equalization / denoising daemon.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the daemon")
+    serve_parser.add_argument("--workers", type=int, default=2)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    submit_parser = commands.add_parser("submit", help="send a job to a running daemon and follow it")
+    submit_parser.add_argument("input")
+    submit_parser.add_argument("--gains", required=True, help="comma-separated band gains")
+    submit_parser.add_argument("--bands", default=None, help="bands as low-high pairs in Hz, e.g. 0-600,600-800")
+    submit_parser.add_argument("--scale", default="linear", choices=("linear", "log"),
+                               help="spacing of the default bands and domain of the crossovers")
+    submit_parser.add_argument("--output", default=None, help="output file (.wav or .flac)")
+    submit_parser.add_argument("--denoise", default=None, nargs="?", const="track",
+                               help="noise-only region as begin-end seconds, e.g. 0-1 (tracked if no region)")
+    submit_parser.add_argument("--priority", type=int, default=0)
+    submit_parser.add_argument("--upsample", action="store_true", help="write at the source rate")
+    submit_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.workers, port=args.port)
+        return
+
+    request = {"input": os.path.abspath(args.input), "gains": [float(gain) for gain in args.gains.split(",")],
+               "scale": args.scale, "priority": args.priority, "upsample": args.upsample}
+    if args.bands:
+        request["bands"] = [[float(edge) for edge in band.split("-")] for band in args.bands.split(",")]
+    if args.output:
+        request["output"] = os.path.abspath(args.output)
+    if args.denoise == "track":
+        request["denoise"] = {}
+    elif args.denoise:
+        request["denoise"] = {"noise": [float(edge) for edge in args.denoise.split("-")]}
+    for event in submit(request, port=args.port):
+        if event["event"] == "progress":
+            print(f"\r{event['progress']:.0%}", end="", flush=True)
+        else:
+            print(("\n" if event["event"] != "queued" else "") + json.dumps(event))
+
+
+if __name__ == "__main__":
+    main()
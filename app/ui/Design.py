@@ -164,27 +164,44 @@ class Ui_MainWindow(object):
         self.right_control_layout.addWidget(self.button)
         self.button.setVisible(False)
 
-        # Equalizer sliders and labels (hidden initially)
+        # Equalizer sliders and labels, in a scrollable panel so that layouts of many bands fit
+        self.equalizer_scroll = QtWidgets.QScrollArea(self.verticalLayoutWidget)
+        self.equalizer_scroll.setWidgetResizable(True)
+        self.equalizer_scroll.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.equalizer_scroll.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.equalizer_panel = QtWidgets.QWidget()
+        self.equalizer_layout = QtWidgets.QVBoxLayout(self.equalizer_panel)
+        self.equalizer_layout.setContentsMargins(0, 0, 0, 0)
+        self.equalizer_layout.addStretch()
+        self.equalizer_scroll.setWidget(self.equalizer_panel)
+        self.right_control_layout.addWidget(self.equalizer_scroll)
+
         self.equalizer_sliders = []
         self.equalizer_labels = []
+        self.ensure_equalizer_sliders(10)
 
-        for i in range(10):
-            label = QtWidgets.QLabel(f"Slider {i + 1}", self.verticalLayoutWidget)
+    def ensure_equalizer_sliders(self, count: int) -> list:
+        """Create sliders (and their labels) until there are at least count of them, return the new sliders."""
+        created = []
+        while len(self.equalizer_sliders) < count:
+            label = QtWidgets.QLabel(f"Slider {len(self.equalizer_sliders) + 1}", self.equalizer_panel)
             label.setFont(self.get_font("Times New Roman"))
 
-            self.right_control_layout.addWidget(label)
-
-            slider = QtWidgets.QSlider(self.verticalLayoutWidget)
+            slider = QtWidgets.QSlider(self.equalizer_panel)
             slider.setOrientation(QtCore.Qt.Horizontal)
             slider.setMaximum(100)
             slider.setFixedHeight(25)
             slider.setMinimum(0)
             slider.setValue(100)
             slider.setStyleSheet(SLIDER_STYLESHEET)
-            self.right_control_layout.addWidget(slider)
 
+            # Inserted before the trailing stretch
+            self.equalizer_layout.insertWidget(self.equalizer_layout.count() - 1, label)
+            self.equalizer_layout.insertWidget(self.equalizer_layout.count() - 1, slider)
             self.equalizer_sliders.append(slider)
             self.equalizer_labels.append(label)
+            created.append(slider)
+        return created
 
     def setup_playback_controls(self) -> None:
         self.playback_controls = QtWidgets.QGroupBox("Playback Controls", self.gridLayoutWidget)
@@ -0,0 +1,104 @@
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
+
+from app.audio.meters import FLOOR_DB
+
+
+class MeterView(pg.GraphicsLayoutWidget):
+    """
+    Live meters window: one bar per equalizer band (RMS) with its peak-hold marker, and the smoothed output spectrum
+    on a log-frequency axis.
+
+    The plot items are created once and only their data is replaced; a timer reads the records the audio callback
+    wrote into the meter ring since the previous refresh, about 30 times per second while the window is shown.
+
+    """
+
+    def __init__(self, meter, fps=30, smoothing=0.6, peak_release_db=1.5, parent=None):
+        """
+        Input :
+            meter : LevelMeter, written by the audio callback
+            fps : int, refresh rate
+            smoothing : float, weight of the previous spectrum in the displayed one (0 for no smoothing)
+            peak_release_db : float, fall of the peak markers per refresh in dB
+
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Live Meters")
+        self.setBackground('w')
+        self.resize(600, 450)
+        self.meter = meter
+        self.smoothing = smoothing
+        self.peak_release_db = peak_release_db
+
+        self.bands_plot = self.addPlot(row=0, col=0, title="Band levels")
+        self.bands_plot.setYRange(-80, 0)
+        self.bands_plot.setLabel('left', 'dB')
+        self.bands_plot.showGrid(y=True)
+        self.bars = pg.BarGraphItem(x=[], height=[], width=0.6, y0=FLOOR_DB, brush='b')
+        self.peaks = pg.ScatterPlotItem(symbol='t1', size=10, brush='r', pen=None)
+        self.bands_plot.addItem(self.bars)
+        self.bands_plot.addItem(self.peaks)
+
+        self.spectrum_plot = self.addPlot(row=1, col=0, title="Output spectrum")
+        self.spectrum_plot.setLogMode(x=True, y=False)
+        self.spectrum_plot.setYRange(-100, 0)
+        self.spectrum_plot.setLabel('left', 'dB')
+        self.spectrum_plot.setLabel('bottom', 'Frequency (Hz)')
+        self.spectrum_plot.showGrid(x=True, y=True)
+        self.spectrum_curve = self.spectrum_plot.plot(pen=pg.mkPen('r', width=2))
+
+        self._ring = None
+        self._index = 0
+        self._records = None
+        self._levels = self._peak_hold = self._spectrum = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 / fps))
+        self.timer.timeout.connect(self.refresh)
+
+    def set_labels(self, labels):
+        """Name the band bars (e.g. with the slider labels)."""
+        self.bands_plot.getAxis('bottom').setTicks([list(enumerate(labels))])
+
+    def showEvent(self, event):
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def _reset(self, ring):
+        """Follow a new meter configuration (other bands or sampling rate)."""
+        self._ring, self._index = ring, ring.written
+        self._records = np.zeros((ring.capacity, ring.width), dtype=np.float32)
+        bands = len(self.meter.frequency_ranges)
+        self._levels = np.full(bands, FLOOR_DB, dtype=np.float32)
+        self._peak_hold = np.full(bands, FLOOR_DB, dtype=np.float32)
+        self._spectrum = np.full(ring.width - 2 * bands, FLOOR_DB, dtype=np.float32)
+        self.bars.setOpts(x=np.arange(bands), height=np.zeros(bands), y0=FLOOR_DB)
+
+    def refresh(self):
+        ring = self.meter.ring
+        if ring is None:
+            return
+        if ring is not self._ring:
+            self._reset(ring)
+        count, self._index = ring.read_since(self._index, self._records)
+        if not count:
+            return
+
+        bands = self._levels.size
+        records = self._records[:count]
+        # Loudest block since the last refresh for the bars, peak hold with a constant release for the markers
+        np.max(records[:, :bands], axis=0, out=self._levels)
+        self._peak_hold -= self.peak_release_db
+        np.maximum(self._peak_hold, records[:, bands:2 * bands].max(axis=0), out=self._peak_hold)
+        self._spectrum *= self.smoothing
+        self._spectrum += (1 - self.smoothing) * records[:, 2 * bands:].mean(axis=0)
+
+        self.bars.setOpts(height=self._levels - FLOOR_DB)
+        self.peaks.setData(x=np.arange(bands), y=self._peak_hold)
+        self.spectrum_curve.setData(self.meter.spectrum_frequencies, self._spectrum)
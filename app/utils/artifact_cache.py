@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates of concurrent processes are still merged, but not serialized
+    fcntl = None
+
+# Single location of every derived artifact (filtered audio, noise profiles, projects, tiles...), at the project root
+CACHE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".cache"))
+
+# Size limit of the cache, can be overridden with the SIGNAL_EQUALIZER_CACHE_MB environment variable
+DEFAULT_MAX_BYTES = int(float(os.environ.get("SIGNAL_EQUALIZER_CACHE_MB", "2048")) * 2 ** 20)
+
+
+def _size_of(path):
+    """Size in bytes of a file, or of the files directly inside an artifact directory."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class ArtifactCache:
+    """
+    Derived-artifact directory with a size limit and least-recently-used eviction.
+
+    Every artifact (a file, or a directory of files such as a project) is recorded in an index file with its size,
+    in least to most recently used order. Registering or touching an entry only updates the index, and eviction
+    removes entries from the least recently used end until the cache fits, so cleanup costs one removal per evicted
+    entry and never walks the tree.
+
+    Several processes (the GUI and the daemon) may share a cache root: every update reloads the index from the disk
+    under a lock file, applies its change and writes it back, so no process drops the entries of another.
+
+    """
+
+    def __init__(self, root=CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Input :
+            root : str, cache directory
+            max_bytes : int, size limit of all the artifacts together
+
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = os.path.join(root, "index.lock")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # Relative path -> size in bytes, least recently used first
+        self.total_bytes = 0
+        self._load()
+
+    def _load(self):
+        """Read the index as last written by any process."""
+        self._entries = OrderedDict()
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path) as file:
+                    self._entries = OrderedDict(json.load(file))
+            except (OSError, ValueError):
+                self._entries = OrderedDict()  # A damaged index only forgets the entries, never the cache
+        self.total_bytes = sum(self._entries.values())
+
+    @contextmanager
+    def _update(self):
+        """Reload the index, let the caller change it and write it back, locked against other threads and processes."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.lock_path, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    yield
+                    self._save()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def directory(self, kind):
+        """Return (and create) the directory of one kind of artifact, e.g. "filtered" or "noise_profiles"."""
+        path = os.path.join(self.root, kind)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, kind, name):
+        """Return the path of an artifact in the directory of its kind."""
+        return os.path.join(self.directory(kind), name)
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def register(self, path):
+        """Record a new or updated artifact as the most recently used, then evict others if over the limit."""
+        key, size = self._key(path), _size_of(path)
+        with self._update():
+            self.total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict(keep=key)
+
+    def touch(self, path):
+        """Mark an artifact as used. Returns False if it is not in the cache (any more)."""
+        key = self._key(path)
+        with self._update():
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return key in self._entries
+
+    def discard(self, path):
+        """Remove an artifact from the disk and from the index."""
+        with self._update():
+            self._remove(self._key(path))
+
+    def evict(self):
+        """Remove least recently used artifacts until the cache fits its size limit."""
+        with self._update():
+            self._evict()
+
+    def _evict(self, keep=None):
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key != keep:  # The artifact just registered is kept even if it is larger than the limit
+                self._remove(key)
+
+    def _remove(self, key):
+        if key not in self._entries:
+            return
+        path = os.path.join(self.root, key)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            return  # Still in use (e.g. memory mapped on Windows): kept, retried at the next eviction
+        self.total_bytes -= self._entries.pop(key)
+
+    def _save(self):
+        descriptor, temporary = tempfile.mkstemp(dir=self.root, prefix="index.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(self._entries, file)
+            os.replace(temporary, self.index_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+# Cache shared by the application
+default_artifacts = ArtifactCache()
@@ -0,0 +1,287 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+from scipy.fft import rfftfreq
+from scipy.sparse import csr_matrix
+
+from app.utils.precision import real_dtype
+
+# Base-ten octave ratio used by ISO 266 / IEC 61260 band centers
+OCTAVE_RATIO = 10 ** (3 / 10)
+
+# Graphic equalizer layouts offered by the Uniform Range mode, as "bands:scale" entries, can be overridden with the
+# SIGNAL_EQUALIZER_BAND_LAYOUTS environment variable (e.g. "10:linear,10:log,31:log,64:log")
+DEFAULT_LAYOUTS = tuple(
+    (int(entry.split(":")[0]), entry.split(":")[1] if ":" in entry else "linear")
+    for entry in os.environ.get("SIGNAL_EQUALIZER_BAND_LAYOUTS", "10:linear,10:log,31:log").split(",")
+)
+
+# Width of the crossover between two bands sharing an edge, as a fraction of the narrower band
+DEFAULT_CROSSOVER = 0.25
+
+# Lowest edge of log-spaced layouts (the first band still extends down to 0 Hz)
+LOG_FMIN = 20.0
+
+
+def fractional_octave_bands(fraction=3, fmin=16.0, fmax=20000.0):
+    """
+    ISO fractional-octave bands between fmin and fmax.
+
+        Input :
+            fraction : int, 1 for octave bands, 3 for third-octave bands
+            fmin, fmax : float, frequency range in Hz covered by the band centers
+        Output :
+            centers : 1D np.array, exact band center frequencies in Hz
+            edges : 1D np.array, band edges in Hz (len(centers) + 1, consecutive bands share an edge)
+
+    """
+    k_min = int(np.ceil(fraction * np.log(fmin / 1000) / np.log(OCTAVE_RATIO)))
+    k_max = int(np.floor(fraction * np.log(fmax / 1000) / np.log(OCTAVE_RATIO)))
+    centers = 1000 * OCTAVE_RATIO ** (np.arange(k_min, k_max + 1) / fraction)
+    half_band = OCTAVE_RATIO ** (1 / (2 * fraction))
+    edges = np.append(centers / half_band, centers[-1] * half_band)
+    return centers, edges
+
+
+class BandAggregator:
+    """
+    Aggregates a magnitude spectrum into a few frequency bands with np.add.reduceat / np.maximum.reduceat.
+    The bin index of every band edge is computed once, so each call is a couple of vectorized passes over the bins.
+    """
+
+    def __init__(self, freqs, centers, edges):
+        """
+        Input :
+            freqs : 1D np.array, sorted bin frequencies of the spectra to aggregate
+            centers : 1D np.array, band centers
+            edges : 1D np.array, contiguous band edges (len(centers) + 1)
+
+        """
+        bounds = np.searchsorted(freqs, edges, side='left')
+        # reduceat cannot express an empty band, bands without any bin (low frequencies) are dropped
+        keep = bounds[1:] > bounds[:-1]
+        self.centers = np.asarray(centers)[keep]
+        self.starts = bounds[:-1][keep]
+        self.stop = int(bounds[-1])
+        self.offsets = self.starts - (self.starts[0] if self.starts.size else 0)
+
+    def __len__(self):
+        return self.centers.size
+
+    def power(self, magnitudes):
+        """Return the summed power |X|^2 of each band."""
+        if not len(self):
+            return np.zeros(0)
+        segment = magnitudes[self.starts[0]:self.stop]
+        return np.add.reduceat(segment * segment, self.offsets)
+
+    def peak(self, magnitudes):
+        """Return the largest magnitude of each band."""
+        if not len(self):
+            return np.zeros(0)
+        return np.maximum.reduceat(magnitudes[self.starts[0]:self.stop], self.offsets)
+
+    def levels_db(self, magnitudes):
+        """Return the level of each band in dB (10 log10 of the band power)."""
+        return 10 * np.log10(self.power(magnitudes) + 1e-20)
+
+    def peak_db(self, magnitudes):
+        """Return the peak magnitude of each band in dB."""
+        return 20 * np.log10(self.peak(magnitudes) + 1e-10)
+
+
+@lru_cache(maxsize=16)
+def rfft_band_aggregator(n_fft, fs, fraction=3):
+    """
+    Return the (cached) fractional-octave aggregator of rfft spectra of length n_fft at sampling rate fs.
+    Bands above the Nyquist frequency are left out.
+    """
+    freqs = rfftfreq(n_fft, 1 / fs)
+    centers, edges = fractional_octave_bands(fraction, fmax=min(20000.0, fs / 2))
+    return BandAggregator(freqs, centers, edges)
+
+
+def band_ranges(n_bands, fs, scale="linear", fmin=None, fmax=None):
+    """
+    Contiguous bands splitting [0, fmax] for an N-band graphic equalizer.
+
+        Input :
+            n_bands : int, number of bands
+            fs : float, sampling rate in Hz
+            scale : str, "linear" for bands of equal width, "log" for bands of equal width in octaves
+            fmin : float, lowest interior edge of a log layout (defaults to LOG_FMIN, or fmax / 100 if lower)
+            fmax : float, highest edge (defaults to the Nyquist frequency)
+        Output :
+            ranges : list of (low, high) tuples in Hz, consecutive bands share an edge
+
+    """
+    fmax = fs / 2 if fmax is None else fmax
+    if scale == "linear":
+        edges = np.linspace(0, fmax, n_bands + 1)
+    elif scale == "log":
+        fmin = min(LOG_FMIN, fmax / 100) if fmin is None else fmin
+        edges = np.geomspace(fmin, fmax, n_bands + 1)
+        edges[0] = 0.0
+    else:
+        raise ValueError(f"Unknown band scale '{scale}', expected 'linear' or 'log'")
+    return [(float(low), float(high)) for low, high in zip(edges[:-1], edges[1:])]
+
+
+def format_frequency(frequency):
+    """Short label of a frequency, e.g. 63, 1.2k or 16k."""
+    if frequency >= 1000:
+        return f"{frequency / 1000:.3g}k"
+    return f"{frequency:.3g}"
+
+
+def _crossover_step(x):
+    """Raised-cosine step from 0 (x <= -1) to 1 (x >= 1)."""
+    return 0.5 + 0.5 * np.sin(0.5 * np.pi * np.clip(x, -1, 1))
+
+
+class BandLayout:
+    """
+    Band layout of an equalizer: one (low, high) range in Hz and one label per slider, with smooth crossovers.
+
+    Where two bands share an edge, the weight of the lower band falls and the weight of the upper band rises along
+    a raised-cosine crossover spanning `crossover` times the narrower band (measured in Hz for linear layouts and in
+    octaves for log ones). The two weights sum to one everywhere, so a bin on a shared edge is never boosted twice and
+    equal gains on both sides give a flat response. Edges not shared with another band are hard and included.
+
+    The layout turns into a sparse (bands x bins) weight matrix W for an rfft grid, computed once per (n_fft, fs) and
+    cached, so the gain curve of a new set of gains g is a single product: curve = 1 + W.T @ (g - 1).
+
+    """
+
+    def __init__(self, ranges, labels=None, scale="linear", crossover=DEFAULT_CROSSOVER):
+        """
+        Input :
+            ranges : list of (low, high) tuples in Hz, one per band
+            labels : list of str, slider labels (defaults to the band frequencies)
+            scale : str, "linear" or "log", domain in which the crossovers are measured
+            crossover : float, crossover width as a fraction of the narrower band (0 for rectangular bands)
+
+        """
+        self.ranges = tuple((float(low), float(high)) for low, high in ranges)
+        self.labels = list(labels) if labels is not None else [
+            f"{format_frequency(low)}-{format_frequency(high)} Hz" for low, high in self.ranges]
+        self.scale = scale
+        self.crossover = crossover
+
+    @classmethod
+    def spaced(cls, n_bands, fs, scale="linear", crossover=DEFAULT_CROSSOVER, **kwargs):
+        """N-band graphic equalizer layout, linear or log-spaced (see band_ranges)."""
+        return cls(band_ranges(n_bands, fs, scale, **kwargs), scale=scale, crossover=crossover)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def _key(self):
+        return self.ranges, self.scale, self.crossover
+
+    def __eq__(self, other):
+        return isinstance(other, BandLayout) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _warp(self, freqs):
+        if self.scale == "log":
+            with np.errstate(divide="ignore"):
+                return np.log2(np.asarray(freqs, dtype=float))
+        return np.asarray(freqs, dtype=float)
+
+    def _unwarp(self, values):
+        return np.exp2(values) if self.scale == "log" else values
+
+    def _half_widths(self):
+        """Return the crossover half width, in the warped domain, of the shared edge of every band pair."""
+        widths = [self._warp(high) - self._warp(low) for low, high in self.ranges]
+        lows = {low: band for band, (low, _) in enumerate(self.ranges)}
+        half_widths = {}  # edge -> half width
+        for band, (_, high) in enumerate(self.ranges):
+            upper = lows.get(high)
+            if upper is not None and upper != band:
+                half_widths[high] = 0.5 * self.crossover * min(widths[band], widths[upper])
+        return half_widths
+
+    def matrix(self, freqs):
+        """
+        Build the weight matrix of the layout on a frequency grid (uncached, see weights).
+
+            Input :
+                freqs : 1D np.array, sorted bin frequencies in Hz
+            Output :
+                W : scipy.sparse.csr_matrix (bands x bins), weight of each band at each bin
+
+        """
+        half_widths = self._half_widths()
+        rows, columns, values = [], [], []
+        for band, (low, high) in enumerate(self.ranges):
+            h_low, h_high = half_widths.get(low), half_widths.get(high)
+            support_low = self._unwarp(self._warp(low) - h_low) if h_low else low
+            support_high = self._unwarp(self._warp(high) + h_high) if h_high else high
+            start = int(np.searchsorted(freqs, support_low, side='left'))
+            stop = int(np.searchsorted(freqs, support_high, side='right'))
+            f = freqs[start:stop]
+            u = self._warp(f)
+
+            weight = np.ones(f.size)
+            if h_low:
+                weight *= _crossover_step((u - self._warp(low)) / h_low)
+            if h_high:
+                weight *= 1 - _crossover_step((u - self._warp(high)) / h_high)
+            elif h_high is not None:
+                weight *= f < high  # Rectangular crossover, the bin on the shared edge belongs to the upper band
+
+            nonzero = np.flatnonzero(weight)
+            rows.append(np.full(nonzero.size, band))
+            columns.append(start + nonzero)
+            values.append(weight[nonzero])
+
+        if not rows:
+            return csr_matrix((0, len(freqs)), dtype=real_dtype())
+        return csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                          shape=(len(self.ranges), len(freqs)), dtype=real_dtype())
+
+    def weights(self, n_fft, fs):
+        """Return the (cached) weight matrix of the layout for rfft spectra of length n_fft at sampling rate fs."""
+        return _layout_weights(self, n_fft, fs, real_dtype())
+
+    def curves(self, gain_matrix, n_fft, fs):
+        """
+        Build the per-bin gain curves of K gain vectors.
+
+            Input :
+                gain_matrix : 2D np.array (K x bands), one gain per band for each of the K candidates
+                n_fft, fs : int, float, transform length and sampling rate of the spectra to equalize
+            Output :
+                curves : 2D np.array (K x bins), gain applied to each bin
+
+        """
+        deltas = np.atleast_2d(np.asarray(gain_matrix, dtype=real_dtype())) - 1
+        curves = np.asarray((self.weights(n_fft, fs).T @ deltas.T).T, dtype=real_dtype())
+        curves += 1
+        return curves
+
+    def curve(self, gains, n_fft, fs):
+        """Return the per-bin gain curve (1D np.array) of a single gain vector."""
+        curve = np.asarray(self.weights(n_fft, fs).T @ (np.asarray(gains, dtype=real_dtype()) - 1),
+                           dtype=real_dtype())
+        curve += 1
+        return curve
+
+
+@lru_cache(maxsize=16)
+def _layout_weights(layout, n_fft, fs, dtype):
+    # The dtype is part of the key so that a precision change does not reuse matrices of the other precision
+    return layout.matrix(rfftfreq(n_fft, 1 / fs))
+
+
+def as_layout(bands):
+    """Return bands as a BandLayout (a list of (low, high) ranges gets the default labels and crossover)."""
+    return bands if isinstance(bands, BandLayout) else BandLayout(bands)
@@ -12,6 +12,8 @@ def remove_directories():
     )
     # Directories to remove
     dir_names = ["__pycache__", ".idea"]
+    # Data and derived artifacts are never searched
+    skipped_names = ["static", ".cache", ".git"]
 
     # Check if the base path exists
     if not os.path.exists(base_path):
@@ -20,6 +22,7 @@ def remove_directories():
 
     # print(f"Scanning {base_path} for {dir_names}...")
     for root, dirs, files in os.walk(base_path):  # Walk through the base directory
+        dirs[:] = [dir_name for dir_name in dirs if dir_name not in skipped_names]
         for dir_name in dirs:
             if dir_name in dir_names:
                 target_path = os.path.join(root, dir_name)
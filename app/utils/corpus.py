@@ -0,0 +1,284 @@
+"""
+Synthetic test-signal corpus.
+
+Generates multi-tone, chirp, speech-like and stationary noise signals of any length, sampling rate and channel
+count, chunk after chunk so that multi-GB files are built in bounded memory. Every file comes with a JSON sidecar
+holding the generation parameters and the ground-truth energy of the clean signal and of the noise in each band,
+so that equalizer and Wiener results can be checked automatically.
+
+    python -m app.utils.corpus speech static/data/corpus/speech_1h.wav --duration 3600 --fs 48000 --noise-level 0.05
+
+"""
+import argparse
+import json
+import os
+import wave
+
+import numpy as np
+from scipy.fft import rfft
+from scipy.signal import butter, chirp, sosfilt
+
+from app.utils.bands import fractional_octave_bands
+
+KINDS = ("multitone", "chirp", "speech", "noise")
+FORMATS = (".csv", ".wav", ".f32")
+
+
+def _components(kind, start, stop, fs, channels, state, params):
+    """
+    Clean signal and noise of the samples [start, stop).
+
+        Output :
+            signal, noise : 2D np.array (samples x channels), float64
+
+    """
+    t = np.arange(start, stop) / fs
+    signal = np.zeros((stop - start, channels))
+    if kind == "multitone":
+        for frequency, amplitude in zip(params["freqs"], params["amplitudes"]):
+            signal += (amplitude * np.sin(2 * np.pi * frequency * t))[:, np.newaxis]
+    elif kind == "chirp":
+        duration = params["n"] / fs
+        sweep = chirp(t, f0=params["f0"], t1=duration, f1=params["f1"], method=params["method"])
+        signal += (params["amplitude"] * sweep)[:, np.newaxis]
+    elif kind == "speech":
+        # Voice-band noise with a syllabic (about 4 Hz) envelope, the filter state is carried between chunks
+        excitation = state["excitation_rng"].standard_normal((stop - start, channels))
+        voiced, state["zi"] = sosfilt(state["sos"], excitation, axis=0, zi=state["zi"])
+        envelope = (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t + 2 * np.pi * 0.3 * np.sin(2 * np.pi * 0.5 * t))) ** 2
+        signal += params["amplitude"] * voiced * envelope[:, np.newaxis] / state["gain"]
+
+    # Signal-free lead-in, used as the noise-only region by the Wiener filter
+    signal[t < params["lead_in"]] = 0
+    noise = params["noise_level"] * state["noise_rng"].standard_normal((stop - start, channels))
+    return signal, noise
+
+
+class BandEnergy:
+    """
+    Accumulates the energy of a multichannel signal in frequency bands, chunk after chunk.
+
+    Signals are cut into periodic square-root Hann frames overlapping by half, whose squares add up to exactly one;
+    the one-sided bin energies of every frame are summed, so the total matches the energy of the signal.
+
+    """
+
+    def __init__(self, fs, edges, channels, frame=4096):
+        self.fs = fs
+        self.edges = np.asarray(edges, dtype=float)
+        self.frame, self.hop = frame, frame // 2
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame))
+        self.bins = np.zeros((frame // 2 + 1, channels))
+        # Frames start one hop before the signal, so every sample is covered by two frames
+        self._pending = np.zeros((self.hop, channels))
+
+    def add(self, chunk):
+        data = np.concatenate([self._pending, chunk])
+        n_frames = (len(data) - self.frame) // self.hop + 1
+        if n_frames > 0:
+            self._accumulate(data, n_frames)
+            data = data[n_frames * self.hop:]
+        self._pending = data
+
+    def _accumulate(self, data, n_frames):
+        for index in range(n_frames):
+            frame = data[index * self.hop:index * self.hop + self.frame] * self.window[:, np.newaxis]
+            power = np.abs(rfft(frame, axis=0)) ** 2
+            power[1:-1] *= 2  # One-sided spectrum
+            self.bins += power / self.frame
+
+    def energies(self):
+        """Return the energy of each band and channel (bands x channels), once every chunk was added."""
+        tail = np.zeros((self.frame + self.hop, self.bins.shape[1]))
+        tail[:len(self._pending)] = self._pending
+        self._accumulate(tail, 2 if len(self._pending) > self.hop else 1)
+        self._pending = np.zeros((0, self.bins.shape[1]))
+
+        freqs = np.arange(self.bins.shape[0]) * self.fs / self.frame
+        bounds = np.searchsorted(freqs, self.edges, side='left')
+        return np.array([self.bins[low:high].sum(axis=0) for low, high in zip(bounds[:-1], bounds[1:])])
+
+
+class _CsvWriter:
+    """"Time,Signal" text file, as read by MainApp.load_signal_data (extra channels as extra columns)."""
+
+    def __init__(self, path, fs, channels):
+        self.file = open(path, "w")
+        self.fs = fs
+        self.position = 0
+        names = ["Signal"] if channels == 1 else [f"Signal {channel + 1}" for channel in range(channels)]
+        self.file.write(",".join(["Time"] + names) + "\n")
+
+    def write(self, chunk):
+        time = np.arange(self.position, self.position + len(chunk)) / self.fs
+        np.savetxt(self.file, np.column_stack([time, chunk]), delimiter=",", fmt="%.9g")
+        self.position += len(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+class _WavWriter:
+    """16-bit PCM WAV file, written as chunks are produced."""
+
+    def __init__(self, path, fs, channels):
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(int(fs))
+
+    def write(self, chunk):
+        self.file.writeframes((np.clip(chunk, -1, 1) * 32767).astype('<i2').tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class _RawWriter:
+    """Headerless little-endian float32 frames, readable with np.memmap(path, '<f4', 'r', shape=(n, channels))."""
+
+    def __init__(self, path, fs, channels):
+        self.file = open(path, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk.astype('<f4').tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+WRITERS = {".csv": _CsvWriter, ".wav": _WavWriter, ".f32": _RawWriter}
+
+
+def generate(path, kind="multitone", duration=10.0, fs=44100, channels=1, noise_level=0.0, lead_in=0.0,
+             freqs=(440.0, 1000.0, 5000.0), f0=20.0, f1=None, method="logarithmic", amplitude=0.5, bands=None,
+             seed=0, chunk_size=2 ** 20):
+    """
+    Generate one corpus file and its "<path>.json" sidecar.
+
+        Input :
+            path : str, output file, .csv, .wav or .f32 (raw float32)
+            kind : str, "multitone", "chirp", "speech" (voice-band noise with a syllabic envelope) or "noise" (only
+                   the stationary noise)
+            duration : float, length in seconds
+            fs : int, sampling rate in Hz
+            channels : int, number of channels (independent noise and speech-like excitation per channel)
+            noise_level : float, RMS of the stationary white noise added over the whole file
+            lead_in : float, seconds of noise only at the beginning
+            freqs : list of float, tone frequencies of "multitone" (equal amplitudes summing to `amplitude`)
+            f0, f1, method : chirp start and end frequencies (f1 defaults to 0.45 fs) and scipy.signal.chirp method
+            amplitude : float, peak amplitude of the clean signal
+            bands : list of (low, high) Hz, bands of the ground truth (defaults to the ISO octave bands)
+            seed : int, random seed
+            chunk_size : int, samples generated at once
+        Output :
+            sidecar : dict, content of the JSON sidecar
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported corpus format '{extension}', expected one of {list(FORMATS)}")
+    if kind not in KINDS:
+        raise ValueError(f"Unknown signal kind '{kind}', expected one of {list(KINDS)}")
+
+    n = int(round(duration * fs))
+    freqs = [float(frequency) for frequency in freqs]
+    params = {
+        "n": n, "lead_in": lead_in, "noise_level": noise_level, "amplitude": amplitude if kind != "noise" else 0.0,
+        "freqs": freqs, "amplitudes": [amplitude / len(freqs)] * len(freqs),
+        "f0": f0, "f1": f1 or 0.45 * fs, "method": method,
+    }
+    if bands is None:
+        centers, edges = fractional_octave_bands(1, fmin=16.0, fmax=min(16000.0, 0.45 * fs))
+    else:
+        edges = None
+    band_list = [tuple(map(float, band)) for band in bands] if bands is not None else list(zip(edges[:-1], edges[1:]))
+
+    sos = butter(4, [300, min(3400, 0.45 * fs)], btype="bandpass", fs=fs, output="sos")
+    # Independent streams for the excitation and the noise, so that a seed gives the same file for any chunk_size
+    excitation_seed, noise_seed = np.random.SeedSequence(seed).spawn(2)
+    state = {
+        "excitation_rng": np.random.default_rng(excitation_seed),
+        "noise_rng": np.random.default_rng(noise_seed),
+        "sos": sos,
+        "zi": np.zeros((sos.shape[0], 2, channels)),
+        # Four standard deviations of the filtered excitation, so that its peaks are about one
+        "gain": 4 * np.sqrt(np.sum(sosfilt(sos, np.eye(1, fs // 10)[0]) ** 2)),
+    }
+
+    # Energies are accumulated between consecutive distinct edges, so that bands may overlap or leave gaps
+    band_edges = sorted({edge for band in band_list for edge in band})
+    signal_energy = BandEnergy(fs, band_edges, channels)
+    noise_energy = BandEnergy(fs, band_edges, channels)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = WRITERS[extension](path, fs, channels)
+    peak = 0.0
+    try:
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            signal, noise = _components(kind, start, stop, fs, channels, state, params)
+            signal_energy.add(signal)
+            noise_energy.add(noise)
+            mixture = signal + noise
+            peak = max(peak, float(np.abs(mixture).max(initial=0.0)))
+            writer.write(mixture)
+    finally:
+        writer.close()
+
+    def per_band(energy):
+        # Energy of each requested band from the energies between consecutive distinct edges
+        between = energy.energies()
+        index = {edge: position for position, edge in enumerate(band_edges)}
+        return [between[index[low]:index[high]].sum(axis=0).tolist() for low, high in band_list]
+
+    sidecar = {
+        "path": os.path.basename(path),
+        "format": extension[1:],
+        "kind": kind,
+        "fs": fs,
+        "samples": n,
+        "channels": channels,
+        "dtype": "float32" if extension == ".f32" else ("int16" if extension == ".wav" else "text"),
+        "peak": peak,
+        "clipped": peak > 1 and extension == ".wav",
+        "seed": seed,
+        "params": {key: value for key, value in params.items() if key != "n"},
+        "bands": band_list,
+        "signal_energy": per_band(signal_energy),  # bands x channels, sum of squares of the clean signal
+        "noise_energy": per_band(noise_energy),  # bands x channels, sum of squares of the noise
+    }
+    with open(path + ".json", "w") as file:
+        json.dump(sidecar, file, indent=2)
+    return sidecar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic test signal with ground-truth band energies.")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path", help="output file (.csv, .wav or .f32)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--fs", type=int, default=44100, help="sampling rate in Hz")
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--noise-level", type=float, default=0.0, help="RMS of the stationary noise")
+    parser.add_argument("--lead-in", type=float, default=0.0, help="seconds of noise only at the beginning")
+    parser.add_argument("--freqs", default="440,1000,5000", help="comma-separated tone frequencies (multitone)")
+    parser.add_argument("--f0", type=float, default=20.0, help="chirp start frequency")
+    parser.add_argument("--f1", type=float, default=None, help="chirp end frequency")
+    parser.add_argument("--amplitude", type=float, default=0.5, help="peak amplitude of the clean signal")
+    parser.add_argument("--bands", default=None, help="ground-truth bands as low-high pairs, e.g. 0-600,600-800")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=2 ** 20, help="samples generated at once")
+    args = parser.parse_args(argv)
+
+    bands = None
+    if args.bands:
+        bands = [tuple(float(edge) for edge in band.split("-")) for band in args.bands.split(",")]
+    sidecar = generate(args.path, args.kind, args.duration, args.fs, args.channels, args.noise_level, args.lead_in,
+                       [float(frequency) for frequency in args.freqs.split(",")], args.f0, args.f1,
+                       amplitude=args.amplitude, bands=bands, seed=args.seed, chunk_size=args.chunk_size)
+    print(f"{args.path}: {sidecar['samples']} samples x {sidecar['channels']} channels, peak {sidecar['peak']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
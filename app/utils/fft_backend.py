@@ -0,0 +1,144 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from scipy import fft as sp_fft
+
+# Number of threads used by every transform
+WORKERS = os.cpu_count() or 1
+
+# Bytes of padded buffers kept alive per thread, can be overridden with the SIGNAL_EQUALIZER_FFT_WORKSPACE_MB
+# environment variable (larger buffers, e.g. of whole-file transforms, are released after their transform)
+DEFAULT_WORKSPACE_BYTES = int(float(os.environ.get("SIGNAL_EQUALIZER_FFT_WORKSPACE_MB", "64")) * 2 ** 20)
+
+
+class _Workspaces(OrderedDict):
+    """Padded buffers of one thread, least recently used first (weakly referenced by the backend for nbytes)."""
+
+    # Compared by identity, so that the backend can keep them in a WeakSet
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+class FFTBackend:
+    """
+    Real FFT layer used by the whole application.
+
+    Transforms are computed with scipy.fft on all cores. Signals are zero padded to the next 5-smooth length
+    (next_fast_len) before the forward transform and cropped back to their original length after the inverse one,
+    so a file with a large prime number of samples costs about the same as a nearby fast length.
+
+    The padded input buffers are kept alive between calls (one set per thread, keyed by shape and dtype, within
+    max_workspace_bytes per thread), and scipy keeps the matching pocketfft plans cached, so repeated transforms of
+    the same size neither re-plan nor re-allocate their workspace. The bytes held are reported by nbytes.
+
+    """
+
+    def __init__(self, workers=None, max_workspace_bytes=DEFAULT_WORKSPACE_BYTES):
+        """
+        Input :
+            workers : int, number of threads per transform (defaults to the number of cores)
+            max_workspace_bytes : int, bytes of padded buffers kept alive per thread
+
+        """
+        self.workers = workers or WORKERS
+        self.max_workspace_bytes = max_workspace_bytes
+        self._local = threading.local()
+        self._all_workspaces = weakref.WeakSet()  # Workspaces of the living threads
+
+    @property
+    def nbytes(self):
+        """RAM held by the padded buffers kept alive, over all threads."""
+        return sum(buffer.nbytes for workspaces in list(self._all_workspaces) for buffer in list(workspaces.values()))
+
+    @staticmethod
+    def fast_length(n):
+        """Return the transform length used for a signal of n samples."""
+        return sp_fft.next_fast_len(int(n), real=True)
+
+    def _workspace(self, shape, dtype):
+        """Return the padded buffer for this shape, reusing the previous one if possible."""
+        workspaces = getattr(self._local, "workspaces", None)
+        if workspaces is None:
+            workspaces = self._local.workspaces = _Workspaces()
+            self._all_workspaces.add(workspaces)
+        key = (shape, np.dtype(dtype).str)
+        buffer = workspaces.pop(key, None)
+        if buffer is None:
+            buffer = np.zeros(shape, dtype=dtype)
+            if buffer.nbytes > self.max_workspace_bytes:
+                return buffer  # Too large to keep: freed once the transform is done
+            held = sum(kept.nbytes for kept in workspaces.values())
+            while workspaces and held + buffer.nbytes > self.max_workspace_bytes:
+                held -= workspaces.popitem(last=False)[1].nbytes  # Drop the least recently used workspace
+        workspaces[key] = buffer  # Mark as most recently used
+        return buffer
+
+    def rfft(self, x, n_fast=None):
+        """
+        Forward real FFT along the last axis of x, padded to a fast length.
+
+            Input :
+                x : np.array, real signal(s), transformed along the last axis
+                n_fast : int, transform length (defaults to fast_length(x.shape[-1]))
+            Output :
+                X : np.array, spectrum with n_fast // 2 + 1 bins
+
+        """
+        x = np.asarray(x)
+        n = x.shape[-1]
+        n_fast = n_fast or self.fast_length(n)
+        if n_fast == n:
+            return sp_fft.rfft(x, workers=self.workers)
+
+        # Copy into the reusable padded workspace; the tail stays zero between calls
+        buffer = self._workspace(x.shape[:-1] + (n_fast,), x.dtype)
+        buffer[..., :n] = x
+        buffer[..., n:] = 0
+        return sp_fft.rfft(buffer, workers=self.workers)
+
+    def irfft(self, X, n, n_fast=None):
+        """
+        Inverse real FFT along the last axis of X, cropped back to the original length.
+
+            Input :
+                X : np.array, spectrum as returned by rfft
+                n : int, length of the original signal
+                n_fast : int, transform length used by the forward transform
+            Output :
+                x : np.array, real signal(s) of n samples
+
+        """
+        n_fast = n_fast or self.fast_length(n)
+        x = sp_fft.irfft(X, n=n_fast, workers=self.workers)
+        return x[..., :n]
+
+    def ifft(self, X):
+        """Complex inverse FFT along the last axis of X (used by the decimated narrowband reconstructions)."""
+        return sp_fft.ifft(X, workers=self.workers)
+
+    def rfftfreq(self, n, d=1.0, n_fast=None):
+        """Return the bin frequencies of rfft for a signal of n samples spaced by d seconds."""
+        n_fast = n_fast or self.fast_length(n)
+        return sp_fft.rfftfreq(n_fast, d)
+
+
+# Backend shared by the application
+default_backend = FFTBackend()
+
+
+def rfft(x, n_fast=None):
+    """Forward real FFT with the shared backend (see FFTBackend.rfft)."""
+    return default_backend.rfft(x, n_fast)
+
+
+def irfft(X, n, n_fast=None):
+    """Inverse real FFT with the shared backend (see FFTBackend.irfft)."""
+    return default_backend.irfft(X, n, n_fast)
+
+
+def rfftfreq(n, d=1.0, n_fast=None):
+    """Bin frequencies with the shared backend (see FFTBackend.rfftfreq)."""
+    return default_backend.rfftfreq(n, d, n_fast)
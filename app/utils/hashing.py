@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from app.utils.artifact_cache import CACHE_ROOT
+
+# Content hashes of the files seen in earlier sessions, so that a file is only read once per version
+INDEX_PATH = os.path.join(CACHE_ROOT, "hashes.json")
+MAX_ENTRIES = 4096  # Files remembered, the least recently hashed are forgotten first
+
+_lock = threading.Lock()
+_hashes = None  # Absolute path -> [size, mtime_ns, content hash], loaded from INDEX_PATH on first use
+
+
+def _load():
+    try:
+        with open(INDEX_PATH) as file:
+            return {path: list(version) for path, version in json.load(file).items()}
+    except (OSError, ValueError, AttributeError, TypeError):
+        return {}  # Missing or damaged index: files are hashed again
+
+
+def _save():
+    directory = os.path.dirname(INDEX_PATH)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix="hashes.", suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(_hashes, file)
+        os.replace(temporary, INDEX_PATH)
+    except OSError:
+        pass  # Read-only cache: the hashes are only kept for this session
+
+
+def file_hash(path):
+    """Return the SHA-1 of a file's content (computed once per file version, remembered across sessions)."""
+    global _hashes
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    with _lock:
+        if _hashes is None:
+            _hashes = _load()
+        known = _hashes.get(path)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+
+    with _lock:
+        _hashes.pop(path, None)
+        _hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        for stale in list(_hashes)[:max(0, len(_hashes) - MAX_ENTRIES)]:
+            del _hashes[stale]
+        _save()
+    return digest
@@ -0,0 +1,185 @@
+import itertools
+import mmap
+import os
+
+import numpy as np
+
+from app.utils.artifact_cache import CACHE_ROOT
+from app.utils.precision import real_dtype
+
+# Spilled buffers of the running sessions
+DEFAULT_SPILL_DIRECTORY = os.path.join(CACHE_ROOT, "spill")
+
+# RAM ceiling of the tracked buffers, set with the SIGNAL_EQUALIZER_RAM_MB environment variable (no ceiling if unset)
+DEFAULT_MAX_BYTES = (int(float(os.environ["SIGNAL_EQUALIZER_RAM_MB"]) * 2 ** 20)
+                     if os.environ.get("SIGNAL_EQUALIZER_RAM_MB") else None)
+
+
+def is_mapped(array):
+    """Tell whether an array (or the array it is a view of) lives in a memory-mapped file rather than in RAM."""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+class TimeAxis:
+    """
+    Implicit time axis (start, dt, n): times are generated for the requested slice only, never for the whole signal.
+    """
+
+    def __init__(self, n, fs, start=0.0):
+        self.n = n
+        self.fs = fs
+        self.start = start
+        self.dt = 1 / fs
+
+    def __len__(self):
+        return self.n
+
+    def time(self, index):
+        return self.start + index * self.dt
+
+    def index(self, time):
+        """Return the sample index of a time, clipped to the axis."""
+        return min(max(int(round((time - self.start) * self.fs)), 0), self.n)
+
+    def slice(self, start=0, stop=None, step=1):
+        """Return the times of the samples [start, stop) every step samples, in the working real dtype."""
+        stop = self.n if stop is None else min(stop, self.n)
+        return (self.start + np.arange(start, stop, step) * self.dt).astype(real_dtype())
+
+
+class MemoryBudget:
+    """
+    Byte accounting of the large buffers of a session, with an optional RAM ceiling.
+
+    Buffers are tracked as (owner, attribute) pairs and read again at every report, so in-place updates and
+    reassignments are followed without registering anything. Above the ceiling, the largest spillable buffers still in
+    RAM are written to .npy files in the spill directory and their attribute is replaced with a read-write memory
+    map of the file, so that the owner keeps working on them as arrays. Buffers allocated with empty() are created as
+    memory maps directly when they would not fit.
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=DEFAULT_SPILL_DIRECTORY):
+        """
+        Input :
+            max_bytes : int, RAM ceiling of the tracked buffers (None for no ceiling)
+            directory : str, directory of the spilled buffers
+
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._tracked = {}  # name -> (owner, attribute, spillable)
+        self._watched = {}  # name -> callable returning the bytes held
+        self._spilled = {}  # name -> (path, memory map)
+        self._counter = itertools.count()
+
+    def track(self, name, owner, attribute, spillable=True):
+        """Account the array held in owner.attribute under name (spillable: may be replaced with a memory map)."""
+        self._tracked[name] = (owner, attribute, spillable)
+
+    def watch(self, name, size):
+        """Account bytes held by a structure managing its own memory, e.g. a cache: size() returns them."""
+        self._watched[name] = size
+
+    def _path(self, name):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{name.replace(' ', '_')}_{os.getpid()}_{next(self._counter)}.npy")
+
+    @staticmethod
+    def _remove(path):
+        """Remove a spill file, False if it is still mapped somewhere and cannot be removed yet (Windows)."""
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _prune(self):
+        """Remove the spill files whose buffer has been replaced since."""
+        for name, (path, spilled) in list(self._spilled.items()):
+            owner, attribute, _ = self._tracked.get(name, (None, None, None))
+            if owner is None or getattr(owner, attribute, None) is not spilled:
+                if self._remove(path):
+                    del self._spilled[name]
+
+    def usage(self):
+        """
+        Return the bytes held by every buffer.
+
+            Output :
+                rows : list of (name, bytes, location), location is "ram", "mapped" or "empty", largest first
+
+        """
+        self._prune()
+        rows = []
+        for name, (owner, attribute, _) in self._tracked.items():
+            array = getattr(owner, attribute, None)
+            if not isinstance(array, np.ndarray):
+                rows.append((name, 0, "empty"))
+            else:
+                rows.append((name, array.nbytes, "mapped" if is_mapped(array) else "ram"))
+        for name, size in self._watched.items():
+            nbytes = int(size() or 0)
+            rows.append((name, nbytes, "ram" if nbytes else "empty"))
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def ram_bytes(self):
+        return sum(nbytes for _, nbytes, location in self.usage() if location == "ram")
+
+    def report(self):
+        """Return the accounting as a text table."""
+        rows = self.usage()
+        lines = [f"{name:<24}{nbytes / 2 ** 20:>10.1f} MB  {location}" for name, nbytes, location in rows]
+        ram = sum(nbytes for _, nbytes, location in rows if location == "ram")
+        ceiling = "none" if self.max_bytes is None else f"{self.max_bytes / 2 ** 20:.0f} MB"
+        lines.append(f"{'RAM total':<24}{ram / 2 ** 20:>10.1f} MB  (ceiling: {ceiling})")
+        return "\n".join(lines)
+
+    def empty(self, name, shape, dtype):
+        """Allocate a buffer in RAM, or directly as a memory-mapped file if it would go over the ceiling."""
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if self.max_bytes is None or self.ram_bytes() + nbytes <= self.max_bytes:
+            return np.empty(shape, dtype=dtype)
+        path = self._path(name)
+        array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        self._record(name, path, array)
+        return array
+
+    def enforce(self):
+        """Spill the largest spillable buffers still in RAM until the tracked buffers fit under the ceiling."""
+        if self.max_bytes is None:
+            return
+        excess = self.ram_bytes() - self.max_bytes
+        candidates = [row for row in self.usage() if row[2] == "ram" and row[0] in self._tracked
+                      and self._tracked[row[0]][2]]
+        for name, nbytes, _ in candidates:
+            if excess <= 0:
+                break
+            self._spill(name)
+            excess -= nbytes
+
+    def _spill(self, name):
+        owner, attribute, _ = self._tracked[name]
+        array = getattr(owner, attribute)
+        path = self._path(name)
+        np.save(path, array)
+        spilled = np.load(path, mmap_mode="r+")
+        setattr(owner, attribute, spilled)
+        self._record(name, path, spilled)
+
+    def _record(self, name, path, array):
+        previous = self._spilled.get(name)
+        if previous is not None:
+            self._remove(previous[0])
+        self._spilled[name] = (path, array)
+
+    def close(self):
+        """Remove every spill file of this session (the owners must not use the spilled buffers afterwards)."""
+        for name, (path, _) in list(self._spilled.items()):
+            if self._remove(path):
+                del self._spilled[name]
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+# Working precisions: name -> (real dtype, complex dtype)
+PRECISIONS = {
+    "single": (np.float32, np.complex64),
+    "double": (np.float64, np.complex128),
+}
+
+# Default precision, can be overridden with the SIGNAL_EQUALIZER_PRECISION environment variable
+_current_precision = os.environ.get("SIGNAL_EQUALIZER_PRECISION", "single")
+if _current_precision not in PRECISIONS:
+    _current_precision = "single"
+
+
+def set_precision(name):
+    """
+    Select the working precision used by the whole signal pipeline.
+
+        Input :
+            name : str, "single" (float32 / complex64) or "double" (float64 / complex128)
+
+    """
+    global _current_precision
+    if name not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{name}', expected one of {list(PRECISIONS)}")
+    _current_precision = name
+
+
+def get_precision():
+    """Return the name of the current working precision."""
+    return _current_precision
+
+
+def real_dtype():
+    """Return the real dtype of the current working precision."""
+    return PRECISIONS[_current_precision][0]
+
+
+def complex_dtype():
+    """Return the complex dtype of the current working precision."""
+    return PRECISIONS[_current_precision][1]
+
+
+def as_working(x):
+    """Return x as an array of the working real dtype (no copy if it already is one)."""
+    return np.asarray(x, dtype=real_dtype())
+
+
+def time_axis(n, fs):
+    """Build a time axis of n samples at sampling rate fs in the working real dtype."""
+    return np.linspace(0, n / fs, n, dtype=real_dtype())
+
+
+def time_slice(start, stop, fs):
+    """Build the time axis of the samples [start, stop) at sampling rate fs in the working real dtype."""
+    return (np.arange(start, stop) / fs).astype(real_dtype())
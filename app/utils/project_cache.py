@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from app.utils.artifact_cache import CACHE_ROOT
+from app.utils.hashing import file_hash
+from app.utils.precision import get_precision, real_dtype
+from app.utils.resample import to_processing_rate
+
+# Default location of the per-file projects, in the derived-artifact cache
+DEFAULT_DIRECTORY = os.path.join(CACHE_ROOT, "projects")
+
+# Each pyramid level keeps the min / max of PYRAMID_FACTOR consecutive values of the level below
+PYRAMID_FACTOR = 16
+
+
+def min_max_envelope(samples, max_points, chunk_blocks=2 ** 14):
+    """
+    Decimate samples that are not stored in a project to an interleaved min / max curve of at most about max_points
+    points, block by block on views of the samples (no full-length intermediate).
+
+        Output :
+            curve : 1D np.array, min then max of each block
+            factor : int, samples per block (a power of PYRAMID_FACTOR, as the project pyramid levels)
+
+    """
+    factor = PYRAMID_FACTOR
+    while 2 * -(-len(samples) // factor) > max_points:
+        factor *= PYRAMID_FACTOR
+    full, blocks = len(samples) // factor, -(-len(samples) // factor)
+    curve = np.empty((blocks, 2), dtype=samples.dtype)
+    for first in range(0, full, chunk_blocks):
+        last = min(first + chunk_blocks, full)
+        view = samples[first * factor:last * factor].reshape(last - first, factor)
+        np.min(view, axis=1, out=curve[first:last, 0])
+        np.max(view, axis=1, out=curve[first:last, 1])
+    if blocks > full:
+        tail = samples[full * factor:]
+        curve[full] = tail.min(), tail.max()
+    return curve.ravel(), factor
+
+
+class Project:
+    """
+    Derived data of one audio file stored as .npy arrays in a directory, opened as read-only memory maps.
+
+    Arrays are only paged in when they are read, so reopening a large file costs a few file opens and the RAM used
+    is what the views actually touch.
+
+    """
+
+    def __init__(self, directory, artifacts=None):
+        self.directory = directory
+        self.artifacts = artifacts
+        self._meta_path = os.path.join(directory, "meta.json")
+        self.meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as file:
+                self.meta = json.load(file)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def has(self, name):
+        return os.path.exists(self._path(name))
+
+    def get(self, name):
+        """Return the stored array as a read-only memory map, or None."""
+        return np.load(self._path(name), mmap_mode='r') if self.has(name) else None
+
+    def _replace(self, path, write):
+        """
+        Write a file through a uniquely named temporary file moved over it, so a crash never leaves a truncated file
+        and concurrent writers of the same project (e.g. daemon workers opening the same input) do not collide.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                write(file)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def put(self, name, array):
+        """Store an array (see _replace)."""
+        self._replace(self._path(name), lambda file: np.save(file, np.ascontiguousarray(array)))
+        if self.artifacts is not None:
+            self.artifacts.register(self.directory)
+        return self.get(name)
+
+    def set_meta(self, **values):
+        self.meta.update(values)
+        self._replace(self._meta_path, lambda file: file.write(json.dumps(self.meta).encode()))
+
+    def pyramid(self, samples=None):
+        """
+        Return the min / max decimation pyramid of the samples, building and storing it on first use.
+
+            Output :
+                levels : list of 2D np.array (blocks x 2), level k holds the (min, max) of PYRAMID_FACTOR ** (k + 1)
+                         consecutive samples, down to a single block
+
+        """
+        levels = []
+        while self.has(f"pyramid_{len(levels) + 1}"):
+            levels.append(self.get(f"pyramid_{len(levels) + 1}"))
+        if levels or samples is None:
+            return levels
+
+        current = np.stack([samples, samples], axis=1)
+        while len(current) > 1:
+            blocks = -(-len(current) // PYRAMID_FACTOR)
+            padded = np.empty((blocks * PYRAMID_FACTOR, 2), dtype=current.dtype)
+            padded[:len(current)] = current
+            padded[len(current):] = current[-1]  # Repeating the last value leaves the min / max unchanged
+            padded = padded.reshape(blocks, PYRAMID_FACTOR, 2)
+            current = np.stack([padded[:, :, 0].min(axis=1), padded[:, :, 1].max(axis=1)], axis=1)
+            levels.append(self.put(f"pyramid_{len(levels) + 1}", current))
+        return levels
+
+    def envelope(self, max_points, samples=None):
+        """
+        Return the coarsest-needed pyramid level as an interleaved min / max curve of at most about max_points
+        points, with the decimation factor of that level (None if the samples are short enough to plot as is).
+        """
+        for level, blocks in enumerate(self.pyramid(samples), start=1):
+            if 2 * len(blocks) <= max_points:
+                return np.asarray(blocks).ravel(), PYRAMID_FACTOR ** level
+        return None
+
+
+class ProjectCache:
+    """
+    Per-file projects keyed by the content hash of the file and the processing parameters, so that reopening a file
+    reuses its decoded samples, spectrum, spectrogram and decimation pyramid instead of recomputing them.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, artifacts=None):
+        """
+        Input :
+            directory : str, directory of the projects
+            artifacts : ArtifactCache, size-limited cache every project is accounted in as one entry
+
+        """
+        self.directory = directory
+        self.artifacts = artifacts
+
+    def key(self, path, processing_rate=None):
+        return f"{file_hash(path)}_{processing_rate or 'native'}_{get_precision()}"
+
+    def open(self, path, processing_rate=None):
+        """Return the project of a file for the current processing parameters (empty if it was never opened)."""
+        project = Project(os.path.join(self.directory, self.key(path, processing_rate)), self.artifacts)
+        if self.artifacts is not None:
+            self.artifacts.touch(project.directory)
+        return project
+
+    def load_audio(self, path, processing_rate=None):
+        """
+        Open the project of an audio file and return its samples, decoded at the native rate and brought down to the
+        processing rate on the first open only (later opens map them from disk).
+
+            Output :
+                project : Project, with the source_rate and sampling_rate of the samples in its meta
+                samples : 1D np.array, read-only memory map of the samples
+
+        """
+        project = self.open(path, processing_rate)
+        samples = project.get("samples")
+        if samples is None or "sampling_rate" not in project.meta:
+            import librosa
+
+            audio, source_rate = librosa.load(path, sr=None, dtype=real_dtype())
+            audio, sampling_rate = to_processing_rate(audio, source_rate, processing_rate)
+            samples = project.put("samples", audio)
+            project.set_meta(source_rate=int(source_rate), sampling_rate=int(sampling_rate))
+        return project, samples
@@ -0,0 +1,129 @@
+import os
+from fractions import Fraction
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from app.utils.precision import real_dtype
+
+# Highest rate the signal is processed at (sources above it are resampled on load), can be overridden with the
+# SIGNAL_EQUALIZER_PROCESSING_RATE environment variable ("0" or "native" keeps every source at its own rate)
+_processing_rate = os.environ.get("SIGNAL_EQUALIZER_PROCESSING_RATE", "48000")
+DEFAULT_PROCESSING_RATE = None if _processing_rate in ("0", "native", "") else int(_processing_rate)
+# Whether exports of resampled sources are brought back to the source rate by default, can be overridden with the
+# SIGNAL_EQUALIZER_UPSAMPLE_EXPORT environment variable ("1" / "on" to enable)
+_upsample_on_export = os.environ.get("SIGNAL_EQUALIZER_UPSAMPLE_EXPORT", "0").lower()
+DEFAULT_UPSAMPLE_ON_EXPORT = _upsample_on_export in ("1", "on", "true", "yes")
+
+
+def resample_ratio(fs, target_fs, max_denominator=1000):
+    """Return the (up, down) integer factors of the polyphase resampler going from fs to target_fs."""
+    ratio = Fraction(int(round(target_fs)), int(round(fs))).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+
+def filter_margin(up, down):
+    """Input context (a whole number of resampler periods) needed by resample_poly's default filter on each side."""
+    half_length = 10 * max(up, down)
+    return -(-(half_length // up + 1) // down) * down
+
+
+def resample(signal, fs, target_fs, chunk_size=2 ** 20, dtype=None):
+    """
+    Resample a signal with a polyphase filter (scipy.signal.resample_poly), chunk after chunk for long signals.
+
+    Chunks are aligned on whole periods of the resampler and filtered with enough context on each side for the
+    anti-aliasing filter, so the output is the same as resampling the whole signal at once.
+
+        Input :
+            signal : 1D np.array, time-domain signal
+            fs, target_fs : float, source and target sampling rates in Hz
+            chunk_size : int, approximate number of input samples filtered at once
+            dtype : output dtype (defaults to the working precision)
+        Output :
+            output : 1D np.array, resampled signal (ceil(len(signal) * up / down) samples)
+
+    """
+    dtype = dtype or real_dtype()
+    up, down = resample_ratio(fs, target_fs)
+    if up == down:
+        return np.asarray(signal, dtype=dtype)
+
+    n = len(signal)
+    n_out = -(-n * up // down)
+    if n <= chunk_size:
+        return resample_poly(signal, up, down).astype(dtype, copy=False)
+
+    margin = filter_margin(up, down)
+    chunk_size = max(chunk_size // down, 1) * down
+
+    output = np.empty(n_out, dtype=dtype)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        low, high = max(start - margin, 0), min(stop + margin, n)
+        filtered = resample_poly(signal[low:high], up, down)
+        first = (start - low) * up // down
+        out_start = start * up // down
+        out_stop = n_out if stop == n else stop * up // down
+        output[out_start:out_stop] = filtered[first:first + out_stop - out_start]
+    return output
+
+
+def to_processing_rate(signal, fs, processing_rate=DEFAULT_PROCESSING_RATE):
+    """
+    Bring a loaded source down to the processing rate. Sources at or below it are left untouched.
+
+        Output :
+            signal : 1D np.array, signal at the new rate
+            fs : int, new sampling rate
+
+    """
+    if processing_rate is None or fs <= processing_rate:
+        return signal, fs
+    return resample(signal, fs, processing_rate), processing_rate
+
+
+class BlockResampler:
+    """
+    Streaming version of resample: blocks of any size go in, resampled blocks come out, with one filter margin of
+    look-ahead. The concatenated output is the same as resampling the whole signal at once.
+    """
+
+    def __init__(self, fs, target_fs, dtype=None):
+        self.up, self.down = resample_ratio(fs, target_fs)
+        self.margin = filter_margin(self.up, self.down)
+        self.dtype = dtype or real_dtype()
+        self._buffer = np.zeros(0, dtype=self.dtype)  # Input samples from _start on
+        self._start = 0
+        self._done = 0  # Input samples whose output was already returned
+        self._received = 0
+
+    def process(self, block):
+        """Add a block of input, return the output samples that are final."""
+        self._buffer = np.concatenate([self._buffer, np.asarray(block, dtype=self.dtype)])
+        self._received += len(block)
+        return self._emit(max((self._received - self.margin) // self.down * self.down, self._done))
+
+    def flush(self):
+        """Return the last output samples, once the whole input was given."""
+        return self._emit(self._received, final=True)
+
+    def _emit(self, stop, final=False):
+        out_start = self._done * self.up // self.down
+        out_stop = -(-stop * self.up // self.down) if final else stop * self.up // self.down
+        if out_stop <= out_start:
+            return np.zeros(0, dtype=self.dtype)
+        if self.up == self.down:
+            output = self._buffer[self._done - self._start:stop - self._start]
+        else:
+            low = max(self._done - self.margin, self._start)
+            filtered = resample_poly(self._buffer[low - self._start:], self.up, self.down)
+            first = (self._done - low) * self.up // self.down
+            output = filtered[first:first + out_stop - out_start].astype(self.dtype, copy=False)
+        self._done = stop
+
+        # Only the context of the next output is kept
+        keep = max(self._done - self.margin, self._start)
+        self._buffer = self._buffer[keep - self._start:]
+        self._start = keep
+        return output
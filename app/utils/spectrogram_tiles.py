@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from app.utils.fft_backend import default_backend
+from app.utils.precision import real_dtype
+
+# Level of a full-scale sinusoid, and the floor of the stored images
+FLOOR_DB = -120.0
+
+
+class SpectrogramTiles:
+    """
+    Multi-resolution spectrogram computed lazily, one tile at a time.
+
+    Level 0 has one STFT frame every hop samples. A frame of level k covers the 2 ** k frames of level 0 from its
+    time on, and is the one of them whose hop-long cell holds the most energy, so transients falling between the
+    frame times of a coarse level are kept at the cost of one STFT frame per column (plus a pass over the samples).
+    Levels are cut into tiles of tile_frames frames. A viewport is drawn from the coarsest level that still gives
+    max_columns frames over the visible time range, so every request touches a bounded number of tiles whatever the
+    zoom, and only the tiles never seen before are computed.
+
+    Tiles are dB magnitudes (float16, 0 dB for a full-scale sinusoid) kept in a small in-memory LRU and, when a store
+    is given (e.g. the file's Project), saved to it so that they are memory mapped on later sessions.
+
+    """
+
+    def __init__(self, signal, fs, n_fft=2048, hop=512, tile_frames=256, store=None, prefix="tiles", max_tiles=256,
+                 backend=None):
+        """
+        Input :
+            signal : 1D np.array, time-domain signal
+            fs : float, sampling rate in Hz
+            n_fft, hop : int, frame length and hop of the finest level
+            tile_frames : int, frames per tile
+            store : object with has / get / put(name, array), persistent tile storage (None to keep them in memory)
+            prefix : str, name prefix of the stored tiles (e.g. to separate input and output spectrograms)
+            max_tiles : int, tiles kept in memory
+            backend : FFTBackend, transform backend (defaults to the shared one)
+
+        """
+        self.signal = signal
+        self.fs = fs
+        self.n_fft, self.hop = n_fft, hop
+        self.tile_frames = tile_frames
+        self.store = store
+        self.prefix = prefix
+        self.max_tiles = max_tiles
+        self.backend = backend or default_backend
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(real_dtype())
+        self.reference = float(np.sum(self.window)) / 2  # |X| of a full-scale sinusoid
+        self.freqs = np.arange(n_fft // 2 + 1) * fs / n_fft
+        self._tiles = OrderedDict()  # (level, index) -> tile, most recently used last
+        self._frames = np.zeros((tile_frames, n_fft), dtype=real_dtype())
+
+        self.levels = 1
+        while self.n_frames(self.levels - 1) > tile_frames:
+            self.levels += 1
+
+    @property
+    def nbytes(self):
+        """RAM held by the tiles in memory (stored tiles are memory mapped)."""
+        return sum(tile.nbytes for tile in self._tiles.values() if not isinstance(tile, np.memmap))
+
+    def level_hop(self, level):
+        return self.hop << level
+
+    def n_frames(self, level):
+        return len(self.signal) // self.level_hop(level) + 1
+
+    def level_for(self, start, stop, max_columns):
+        """Return the finest level showing the samples [start, stop) with at most max_columns frames."""
+        for level in range(self.levels):
+            if (stop - start) / self.level_hop(level) <= max_columns:
+                return level
+        return self.levels - 1
+
+    def tile(self, level, index):
+        """Return a tile (tile_frames x bins dB image), computing it if it was never computed."""
+        key = (level, index)
+        tile = self._tiles.pop(key, None)
+        if tile is None:
+            name = f"{self.prefix}_{level}_{index}"
+            if self.store is not None and self.store.has(name):
+                tile = self.store.get(name)
+            else:
+                tile = self._compute(level, index)
+                if self.store is not None:
+                    tile = self.store.put(name, tile)
+            if len(self._tiles) >= self.max_tiles:
+                self._tiles.popitem(last=False)
+        self._tiles[key] = tile
+        return tile
+
+    def _compute(self, level, index):
+        first = index * self.tile_frames
+        count = min(self.tile_frames, self.n_frames(level) - first)
+        centers = self._loudest_centers(level, first, count)
+        frames = self._frames[:count]
+        frames.fill(0)
+        # Frames are centered on their time (as librosa's center=True), zero outside the signal
+        for row in range(count):
+            start = centers[row] - self.n_fft // 2
+            low, high = max(start, 0), min(start + self.n_fft, len(self.signal))
+            if high > low:
+                frames[row, low - start:high - start] = self.signal[low:high]
+        spectra = self.backend.rfft(frames * self.window, self.n_fft)
+        magnitude = np.abs(spectra) / self.reference
+        tile = np.full((self.tile_frames, self.freqs.size), FLOOR_DB, dtype=np.float16)
+        tile[:count] = 20 * np.log10(np.maximum(magnitude, 10 ** (FLOOR_DB / 20)))
+        return tile
+
+    def _loudest_centers(self, level, first, count):
+        """
+        Return the center sample of the frame computed for each of count frames of a level from frame first on: the
+        level-0 frame whose cell ([center - hop / 2, center + hop / 2)) holds the most energy among those it covers.
+        """
+        step = 1 << level
+        centers = (first + np.arange(count)) * self.level_hop(level)
+        if step == 1:
+            return centers
+        cells = np.zeros(step * self.hop, dtype=real_dtype())
+        for row in range(count):
+            low = centers[row] - self.hop // 2
+            samples = self.signal[max(low, 0):min(low + cells.size, len(self.signal))]
+            cells.fill(0)
+            cells[max(-low, 0):max(-low, 0) + len(samples)] = samples
+            blocks = cells.reshape(step, self.hop)
+            energies = np.einsum('ij,ij->i', blocks, blocks)
+            centers[row] += int(np.argmax(energies)) * self.hop
+        return centers
+
+    def viewport(self, start_time, stop_time, max_columns=1024):
+        """
+        Return the spectrogram of a time range from the tiles at the right level.
+
+            Input :
+                start_time, stop_time : float, visible time range in seconds
+                max_columns : int, largest number of frames returned
+            Output :
+                image : 2D np.array (bins x frames), dB
+                extent : (t0, t1, f0, f1), time and frequency span of the image, for imshow
+
+        """
+        start = max(int(start_time * self.fs), 0)
+        stop = min(max(int(stop_time * self.fs), start + 1), len(self.signal))
+        level = self.level_for(start, stop, max_columns)
+        hop = self.level_hop(level)
+        first, last = start // hop, min(-(-stop // hop), self.n_frames(level) - 1) + 1
+
+        image = np.empty((last - first, self.freqs.size), dtype=np.float16)
+        for index in range(first // self.tile_frames, (last - 1) // self.tile_frames + 1):
+            tile_first = index * self.tile_frames
+            low, high = max(first, tile_first), min(last, tile_first + self.tile_frames)
+            image[low - first:high - first] = self.tile(level, index)[low - tile_first:high - tile_first]
+        # A frame of level k stands for the 2 ** k frames of level 0 it was chosen from
+        extent = ((first * hop - self.hop / 2) / self.fs, (last * hop - self.hop / 2) / self.fs, 0, self.fs / 2)
+        return image.T, extent
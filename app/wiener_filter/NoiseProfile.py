@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+
+from app.utils.artifact_cache import CACHE_ROOT
+from app.utils.hashing import file_hash
+
+# Default location of the stored profiles, in the derived-artifact cache
+DEFAULT_DIRECTORY = os.path.join(CACHE_ROOT, "noise_profiles")
+
+
+class NoiseProfile:
+    """Noise PSD estimated by Wiener.welchs_periodogram, with the analysis parameters it is only valid for."""
+
+    def __init__(self, Sbb, FS, NFFT, FRAME, SHIFT, window="hann", region=None, source=None):
+        """
+        Input :
+            Sbb : 2D np.array (NFFT x channels), Power Spectral Density of the noise
+            FS, NFFT, FRAME, SHIFT : sampling rate, FFT length, frame length and shift used to estimate it
+            window : str, analysis window name
+            region : (float, float), noise region in seconds
+            source : str, content hash of the file it was estimated from
+
+        """
+        self.Sbb = Sbb
+        self.FS, self.NFFT, self.FRAME, self.SHIFT = int(FS), int(NFFT), int(FRAME), float(SHIFT)
+        self.window = window
+        self.region = tuple(region) if region is not None else None
+        self.source = source
+
+    def matches(self, FS, NFFT, FRAME, SHIFT, channels, window="hann"):
+        """Return True if the profile can be used with these analysis parameters."""
+        return (self.FS, self.NFFT, self.FRAME, self.SHIFT, self.window) == (FS, NFFT, FRAME, SHIFT, window) \
+            and self.Sbb.shape[1] == channels
+
+    def save(self, path):
+        np.savez(path, Sbb=self.Sbb, FS=self.FS, NFFT=self.NFFT, FRAME=self.FRAME, SHIFT=self.SHIFT,
+                 window=self.window, region=np.asarray(self.region if self.region else (np.nan, np.nan)),
+                 source=self.source or "")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            region = tuple(data["region"].tolist())
+            return cls(data["Sbb"], int(data["FS"]), int(data["NFFT"]), int(data["FRAME"]), float(data["SHIFT"]),
+                       str(data["window"]), None if np.isnan(region[0]) else region, str(data["source"]) or None)
+
+
+class NoiseProfileCache:
+    """
+    On-disk cache of noise profiles, keyed by the content hash of the recording and the noise region.
+
+    Profiles can also be stored under a name (e.g. the recorder or microphone) to be reused on other files, and a
+    session profile can be shared by every file denoised during a batch.
+
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, artifacts=None):
+        """
+        Input :
+            directory : str, directory of the stored profiles
+            artifacts : ArtifactCache, size-limited cache the per-recording profiles are accounted in (named profiles
+                        are never evicted)
+
+        """
+        self.directory = directory
+        self.artifacts = artifacts
+        self.session_profile = None
+        self._memory = {}  # key -> NoiseProfile, profiles already used in this session
+
+    def key(self, path, region):
+        begin, end = region
+        return f"{file_hash(path)}_{float(begin):g}_{float(end):g}"
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def load(self, path, region):
+        """Return the cached profile of a recording's noise region, or None."""
+        key = self.key(path, region)
+        if key not in self._memory:
+            file_path = self._path(key)
+            if not os.path.exists(file_path):
+                return None
+            self._memory[key] = NoiseProfile.load(file_path)
+            if self.artifacts is not None:
+                self.artifacts.touch(file_path)
+        return self._memory[key]
+
+    def store(self, path, region, profile):
+        """Cache a recording's noise profile in memory and on disk."""
+        key = self.key(path, region)
+        profile.source = profile.source or file_hash(path)
+        self._memory[key] = profile
+        os.makedirs(self.directory, exist_ok=True)
+        profile.save(self._path(key))
+        if self.artifacts is not None:
+            self.artifacts.register(self._path(key))
+
+    def names(self):
+        """Return the sorted names of the stored named profiles."""
+        directory = os.path.join(self.directory, "named")
+        if not os.path.isdir(directory):
+            return []
+        return sorted(entry[:-4] for entry in os.listdir(directory) if entry.endswith(".npz"))
+
+    def load_named(self, name):
+        """Return the profile stored under a name (e.g. a recorder), or None."""
+        file_path = self._path(os.path.join("named", name))
+        return NoiseProfile.load(file_path) if os.path.exists(file_path) else None
+
+    def store_named(self, name, profile):
+        """Store a profile under a name so that it can be reused on other recordings."""
+        os.makedirs(os.path.join(self.directory, "named"), exist_ok=True)
+        profile.save(self._path(os.path.join("named", name)))
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class NoiseTracker:
+    """
+    Online noise PSD tracking with Minima Controlled Recursive Averaging (MCRA).
+
+    Each frame, the power spectrum is smoothed over frequency and time and its minimum over the last `window` seconds
+    is tracked with two running minima (Smin, Stmp) swapped every window. Bins whose smoothed power rises above
+    delta times that minimum are counted as speech; the speech presence probability p is smoothed over time and the
+    noise PSD is recursively averaged with the forgetting factor alpha_d + (1 - alpha_d) * p, so it follows slow
+    drifts of the noise while freezing during speech. No noise-only region is needed.
+
+    An update costs O(bins) in preallocated buffers and the state (a few bins-long vectors) does not depend on the
+    length of the signal, so the same tracker runs frame by frame (update), on chunks of consecutive frames (track)
+    or on a whole file.
+
+    Reference :
+        Israel Cohen, Baruch Berdugo. Noise Estimation by Minima Controlled Recursive Averaging for Robust Speech
+        Enhancement. IEEE Signal Processing Letters, 2002.
+
+    """
+
+    def __init__(self, n_bins, frame_rate, window=1.0, alpha_s=0.8, alpha_d=0.95, alpha_p=0.2, delta=5.0,
+                 dtype=np.float32):
+        """
+        Input :
+            n_bins : int, number of bins of the power spectra
+            frame_rate : float, frames per second (sampling rate / hop)
+            window : float, length in seconds of the minimum search window
+            alpha_s : float, time smoothing of the power spectrum
+            alpha_d : float, smallest forgetting factor of the noise PSD (used when speech is surely absent)
+            alpha_p : float, time smoothing of the speech presence probability
+            delta : float, ratio to the minimum above which a bin is considered as speech
+            dtype : np.dtype, precision of the state
+
+        """
+        self.n_bins = n_bins
+        self.L = max(1, int(round(window * frame_rate)))  # Frames per minimum search window
+        self.alpha_s, self.alpha_d, self.alpha_p, self.delta = alpha_s, alpha_d, alpha_p, delta
+
+        self.noise_psd = np.zeros(n_bins, dtype=dtype)
+        self._S = np.zeros(n_bins, dtype=dtype)  # Time and frequency smoothed power
+        self._Smin = np.zeros(n_bins, dtype=dtype)
+        self._Stmp = np.zeros(n_bins, dtype=dtype)
+        self._p = np.zeros(n_bins, dtype=dtype)  # Speech presence probability
+        self._Sf = np.zeros(n_bins, dtype=dtype)
+        self._neighbour = np.zeros(n_bins, dtype=dtype)  # Weighted power of the neighbouring bins
+        self._alpha = np.zeros(n_bins, dtype=dtype)
+        self._speech = np.zeros(n_bins, dtype=bool)
+        self._frame = 0
+
+    def reset(self, noise_psd=None):
+        """Start over, from a known noise PSD if given (otherwise the next frame is taken as noise)."""
+        self._frame = 0
+        self._p.fill(0)
+        if noise_psd is not None:
+            self.noise_psd[:] = np.asarray(noise_psd)[:self.n_bins]
+            self._S[:] = self.noise_psd
+            self._Smin[:] = self.noise_psd
+            self._Stmp[:] = self.noise_psd
+            self._frame = 1
+
+    def update(self, power):
+        """
+        Track one frame.
+
+            Input :
+                power : 1D np.array, power spectrum |X| ** 2 of the frame (n_bins)
+            Output :
+                noise_psd : 1D np.array, updated noise PSD (the tracker's own buffer)
+
+        """
+        if self._frame == 0:
+            self.noise_psd[:] = power
+            self._S[:] = power
+            self._Smin[:] = power
+            self._Stmp[:] = power
+            self._frame = 1
+            return self.noise_psd
+
+        # Frequency smoothing with a (0.25, 0.5, 0.25) window, then first-order time smoothing
+        Sf, neighbour = self._Sf, self._neighbour
+        np.multiply(power, 0.5, out=Sf)
+        np.multiply(power[:-1], 0.25, out=neighbour[1:])
+        Sf[1:] += neighbour[1:]
+        np.multiply(power[1:], 0.25, out=neighbour[:-1])
+        Sf[:-1] += neighbour[:-1]
+        Sf[0] += 0.25 * power[0]
+        Sf[-1] += 0.25 * power[-1]
+        self._S *= self.alpha_s
+        Sf *= 1 - self.alpha_s
+        self._S += Sf
+
+        # Minimum over the last window: running minima, the temporary one restarts every L frames
+        np.minimum(self._Smin, self._S, out=self._Smin)
+        np.minimum(self._Stmp, self._S, out=self._Stmp)
+        if self._frame % self.L == 0:
+            np.minimum(self._Stmp, self._S, out=self._Smin)
+            self._Stmp[:] = self._S
+        self._frame += 1
+
+        # Speech presence: S / Smin > delta, smoothed over time into a probability
+        np.multiply(self._Smin, self.delta, out=self._alpha)
+        np.greater(self._S, self._alpha, out=self._speech)
+        self._p *= self.alpha_p
+        np.add(self._p, 1 - self.alpha_p, out=self._p, where=self._speech)
+
+        # Noise update with the speech-presence dependent forgetting factor
+        alpha = self._alpha
+        np.multiply(self._p, 1 - self.alpha_d, out=alpha)
+        alpha += self.alpha_d
+        self.noise_psd -= power
+        self.noise_psd *= alpha
+        self.noise_psd += power
+        return self.noise_psd
+
+    def track(self, powers, out=None):
+        """
+        Track consecutive frames (a chunk of a file, or a whole file), continuing from the previous call.
+
+            Input :
+                powers : 2D np.array (frames x n_bins), power spectra
+                out : 2D np.array, optional output buffer of the same shape
+            Output :
+                noise : 2D np.array (frames x n_bins), noise PSD estimated at each frame
+
+        """
+        out = np.empty(powers.shape, dtype=self.noise_psd.dtype) if out is None else out
+        for frame in range(powers.shape[0]):
+            out[frame] = self.update(powers[frame])
+        return out
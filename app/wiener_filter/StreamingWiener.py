@@ -0,0 +1,201 @@
+import numpy as np
+from scipy.fft import rfft, irfft
+
+from app.wiener_filter.Wiener import Wiener, ESTIMATORS
+from app.wiener_filter.NoiseTracker import NoiseTracker
+
+
+class StreamingWiener:
+    """
+    Wiener denoising as a stage of the real-time playback chain.
+
+    Blocks of any size are cut into 20 ms frames with 50 % overlap, each frame is filtered with the Wiener gain of
+    one of the a priori SNR estimators of Wiener.wiener (posterior, decision-directed, TSNR or HRNR, computed the same
+    way frame by frame, so the live stage sounds like the offline filter) and the frames are overlap-added back. The
+    overlap-add and decision-directed states are carried from one block to the next, so the stage adds a constant
+    latency of one frame. All the working buffers are allocated once; only the FFT outputs are created per frame.
+
+    The noise PSD is either estimated once (estimate_noise) or given, and can optionally keep being updated online
+    on the frames where no signal is detected, or be tracked on every frame with MCRA (NoiseTracker), which needs
+    no noise-only region at all.
+
+    """
+
+    def __init__(self, fs, noise_psd=None, frame_duration=0.02, nfft=None, noise_update=None, noise_threshold=2.0,
+                 track_noise=False, estimator="posterior", beta=0.98):
+        """
+        Input :
+            fs : int, sampling rate in Hz
+            noise_psd : 1D np.array, noise PSD on the nfft // 2 + 1 bins (see estimate_noise)
+            frame_duration : float, frame length in seconds
+            nfft : int, FFT length (defaults to the power of two >= frame, at least 1024 as in Wiener)
+            noise_update : float, forgetting factor of the online noise update (None to keep the PSD fixed)
+            noise_threshold : float, a posteriori SNR under which a bin is considered as noise for the update
+            track_noise : bool, track the noise PSD online with MCRA (starting from noise_psd if given)
+            estimator : str, a priori SNR estimator, one of Wiener's ESTIMATORS
+            beta : float, weight of the previous frame in the decision-directed recursion
+
+        """
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{estimator}', expected one of {ESTIMATORS}")
+        self.FS = fs
+        self.HOP = max(1, int(frame_duration * fs / 2))
+        self.FRAME = 2 * self.HOP
+        self.NFFT = nfft or max(2 ** 10, 1 << int(np.ceil(np.log2(self.FRAME))))
+        self.noise_update = noise_update
+        self.noise_threshold = noise_threshold
+        self.estimator, self.beta = estimator, beta
+
+        # Periodic Hanning window: the 50 % overlapped windows sum to one, so no gain correction is needed
+        self.WINDOW = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.FRAME) / self.FRAME)).astype(np.float32)
+        self.EW = np.float32(np.sum(self.WINDOW))
+
+        n_bins = self.NFFT // 2 + 1
+        self.noise_psd = np.ones(n_bins, dtype=np.float32)
+        self.tracker = NoiseTracker(n_bins, fs / self.HOP) if track_noise else None
+        if noise_psd is not None:
+            self.set_noise_psd(noise_psd)
+
+        # Carried state and preallocated work buffers
+        self._frame = np.zeros(self.FRAME, dtype=np.float32)  # Last FRAME input samples
+        self._windowed = np.zeros(self.NFFT, dtype=np.float32)  # Zero padded windowed frame
+        self._ola = np.zeros(self.FRAME, dtype=np.float32)  # Overlap-add accumulator
+        self._ready = np.zeros(self.HOP, dtype=np.float32)  # Finished output hop being played
+        self._pending = 0  # Input samples received since the last processed frame
+        self._power = np.zeros(n_bins, dtype=np.float32)
+        self._snr = np.zeros(n_bins, dtype=np.float32)
+        self._gain = np.zeros(n_bins, dtype=np.float32)
+        self._noise_mask = np.zeros(n_bins, dtype=bool)
+        self._prio = np.zeros(n_bins, dtype=np.float32)  # A priori SNR
+        self._last = np.zeros(n_bins, dtype=np.float32)  # Decision-directed state, G ** 2 * SNR_post of the last frame
+        self._started = False  # Whether _last holds a frame yet
+        self._filtered = np.zeros(n_bins, dtype=np.complex64)  # TSNR estimate, for the harmonic regeneration
+        self._scratch = np.zeros(n_bins, dtype=np.float32)
+
+    @property
+    def latency(self):
+        """Delay introduced by the stage, in samples."""
+        return self.FRAME
+
+    def set_noise_psd(self, noise_psd):
+        """Use a new noise PSD (nfft // 2 + 1 bins, or a full nfft-long two-sided PSD)."""
+        noise_psd = np.asarray(noise_psd, dtype=np.float32)[:self.NFFT // 2 + 1]
+        np.maximum(noise_psd, np.finfo(np.float32).tiny, out=self.noise_psd)
+        if self.tracker is not None:
+            self.tracker.reset(self.noise_psd)
+
+    def estimate_noise(self, noise):
+        """
+        Estimate the noise PSD with Welch's periodogram over samples where only noise is present.
+
+            Input :
+                noise : 1D np.array, noise-only samples (at least one frame)
+
+        """
+        noise = np.asarray(noise, dtype=np.float32)
+        n_frames = (len(noise) - self.FRAME) // self.HOP + 1
+        if n_frames < 1:
+            raise ValueError("At least one frame of noise is needed to estimate its PSD")
+        frames = np.lib.stride_tricks.as_strided(noise, shape=(n_frames, self.FRAME),
+                                                 strides=(self.HOP * noise.itemsize, noise.itemsize))
+        spectra = rfft(frames * self.WINDOW, self.NFFT, axis=-1)
+        self.set_noise_psd(np.mean(np.abs(spectra) ** 2, axis=0))
+
+    def reset(self):
+        """Clear the carried overlap-add state (e.g. after a seek)."""
+        self._frame.fill(0)
+        self._ola.fill(0)
+        self._ready.fill(0)
+        self._pending = 0
+        self._started = False
+
+    def process(self, block):
+        """
+        Denoise one block in place. The output is delayed by `latency` samples.
+
+            Input :
+                block : 1D np.array (float32), samples of the block
+
+        """
+        position, n = 0, len(block)
+        while position < n:
+            take = min(self.HOP - self._pending, n - position)
+            start = self.HOP + self._pending
+            self._frame[start:start + take] = block[position:position + take]
+            block[position:position + take] = self._ready[self._pending:self._pending + take]
+            self._pending += take
+            position += take
+            if self._pending == self.HOP:
+                self._process_frame()
+                self._pending = 0
+        return block
+
+    def _process_frame(self):
+        np.multiply(self._frame, self.WINDOW, out=self._windowed[:self.FRAME])
+        spectrum = rfft(self._windowed)
+
+        # A posteriori SNR and Wiener gain, computed in the preallocated buffers
+        np.abs(spectrum, out=self._power)
+        np.square(self._power, out=self._power)
+        if self.tracker is not None:
+            np.maximum(self.tracker.update(self._power), np.finfo(np.float32).tiny, out=self.noise_psd)
+        np.divide(self._power, self.noise_psd, out=self._snr)  # Normalised as in Wiener.gains
+        if self.estimator == "posterior":
+            Wiener.a_priori_gain(self._snr, out=self._gain)
+        else:
+            self._a_priori_gain(spectrum)
+        spectrum *= self._gain
+
+        if self.noise_update is not None:
+            # Recursive averaging of the noise PSD on the bins where no signal is detected
+            np.less(self._snr, self.noise_threshold, out=self._noise_mask)
+            np.multiply(self.noise_psd, self.noise_update, out=self.noise_psd, where=self._noise_mask)
+            np.multiply(self._power, 1 - self.noise_update, out=self._gain)  # The gain buffer is free again
+            np.add(self.noise_psd, self._gain, out=self.noise_psd, where=self._noise_mask)
+
+        # Overlap-add: the first half of the accumulator is now complete
+        self._ola += irfft(spectrum, self.NFFT)[:self.FRAME]
+        self._ready[:] = self._ola[:self.HOP]
+        self._ola[:self.HOP] = self._ola[self.HOP:]
+        self._ola[self.HOP:] = 0
+        self._frame[:self.HOP] = self._frame[self.HOP:]
+
+    def _a_priori_gain(self, spectrum):
+        """Gain of the decision-directed, TSNR or HRNR a priori SNR of the current frame (see Wiener.gains)."""
+        snr, prio, last, gain = self._snr, self._prio, self._last, self._gain
+
+        # Decision-directed: beta * G(l - 1) ** 2 * SNR_post(l - 1) + (1 - beta) * max(SNR_post(l) - 1, 0)
+        np.subtract(snr, 1, out=prio)
+        np.maximum(prio, 0, out=prio)
+        if self._started:
+            prio *= 1 - self.beta
+            last *= self.beta
+            prio += last
+        Wiener.a_priori_gain(prio, out=gain)
+        np.multiply(gain, gain, out=last)
+        last *= snr
+        self._started = True
+        if self.estimator == "dd":
+            return
+
+        # TSNR: a priori SNR of the decision-directed estimate of the current frame, G_dd ** 2 * SNR_post
+        Wiener.a_priori_gain(last, out=gain)
+        if self.estimator == "tsnr":
+            return
+
+        # HRNR: G_tsnr |G_tsnr X| ** 2 + (1 - G_tsnr) |S_harmo| ** 2 over the noise PSD
+        np.multiply(spectrum, gain, out=self._filtered)
+        harmonics = irfft(self._filtered, self.NFFT)
+        np.maximum(harmonics, 0, out=harmonics)
+        harmonics = rfft(harmonics)
+        np.abs(harmonics, out=prio)
+        np.square(prio, out=prio)
+        prio /= self.noise_psd
+        scratch = self._scratch
+        np.subtract(1, gain, out=scratch)
+        prio *= scratch
+        np.multiply(gain, gain, out=scratch)
+        scratch *= gain
+        scratch *= snr
+        prio += scratch
+        Wiener.a_priori_gain(prio, out=gain)
@@ -1,7 +1,15 @@
 import numpy as np
-from scipy.fftpack import fft, ifft
+from scipy.fft import fft, rfft, irfft
 import scipy.io.wavfile as wav
 
+from app.utils.precision import real_dtype
+from app.wiener_filter.NoiseProfile import NoiseProfile
+from app.wiener_filter.NoiseTracker import NoiseTracker
+
+# A priori SNR estimators of wiener(): the a posteriori SNR used as is, decision-directed, two-step noise reduction and
+# harmonic regeneration noise reduction
+ESTIMATORS = ("posterior", "dd", "tsnr", "hrnr")
+
 
 class Wiener:
     """
@@ -15,16 +23,23 @@ class Wiener:
 
     """
 
-    def __init__(self, WAV_FILE, *T_NOISE):
+    def __init__(self, WAV_FILE, *T_NOISE, dtype=None, noise_profile=None):
         """
         Input :
             WAV_FILE
             T_NOISE : float, Time in seconds /!\ Only works if stationnary noise is at the beginning of x /!\
+                      Without T_NOISE (nor noise_profile), the noise PSD is tracked online with MCRA (NoiseTracker)
+            dtype : np.dtype, working precision of the filter (defaults to the pipeline precision)
+            noise_profile : NoiseProfile, previously estimated noise PSD, skips the estimation when compatible
 
         """
         # Constants are defined here
+        self.DTYPE = np.dtype(dtype if dtype is not None else real_dtype())
         self.WAV_FILE, self.T_NOISE = WAV_FILE, T_NOISE
         self.FS, self.x = wav.read(self.WAV_FILE)
+        # Samples x channels, mono signals included (written back as read)
+        self.MONO = self.x.ndim == 1
+        self.x = self.x.astype(self.DTYPE, copy=False).reshape(self.x.shape[0], -1)
         self.NFFT, self.SHIFT, self.T_NOISE = 2 ** 10, 0.5, T_NOISE
         self.FRAME = int(0.02 * self.FS)  # Frame of 20 ms
 
@@ -35,14 +50,34 @@ class Wiener:
         def hann_window(N):
             return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N) / (N - 1))
 
-        self.WINDOW = hann_window(self.FRAME)
+        self.WINDOW = hann_window(self.FRAME).astype(self.DTYPE)
         self.EW = np.sum(self.WINDOW)
 
-        self.channels = np.arange(self.x.shape[1]) if self.x.shape != (self.x.size,) else np.arange(1)
-        length = self.x.shape[0] if len(self.channels) > 1 else self.x.size
-        self.frames = np.arange((length - self.FRAME) // self.OFFSET + 1)
-        # Evaluating noise psd with n_noise
-        self.Sbb = self.welchs_periodogram()
+        self.channels = np.arange(self.x.shape[1])
+        self.frames = np.arange((self.x.shape[0] - self.FRAME) // self.OFFSET + 1)
+        # Evaluating noise psd with n_noise, unless a compatible profile is given or the noise is tracked
+        self.PROFILE_USED = noise_profile is not None and noise_profile.matches(self.FS, self.NFFT, self.FRAME,
+                                                                                self.SHIFT, self.channels.size)
+        self.TRACKING = not self.T_NOISE and not self.PROFILE_USED
+        if self.PROFILE_USED:
+            self.Sbb = noise_profile.Sbb.astype(self.DTYPE, copy=False)
+        elif self.TRACKING:
+            self.Sbb = None
+        else:
+            self.N_NOISE = int(self.T_NOISE[0] * self.FS), int(self.T_NOISE[1] * self.FS)
+            self.Sbb = self.welchs_periodogram()
+
+    def noise_profile(self):
+        """
+        Function that packs the estimated noise PSD with its analysis parameters, so it can be cached and reused.
+
+            Output :
+                profile : NoiseProfile (None when the noise is tracked)
+
+        """
+        if self.TRACKING:
+            return None
+        return NoiseProfile(self.Sbb, self.FS, self.NFFT, self.FRAME, self.SHIFT, region=self.T_NOISE)
 
     @staticmethod
     def a_posteriori_gain(SNR):
@@ -59,18 +94,22 @@ class Wiener:
         return G
 
     @staticmethod
-    def a_priori_gain(SNR):
+    def a_priori_gain(SNR, out=None):
         """
         Function that computes the a priori gain G of Wiener filtering.
 
             Input :
                 SNR : 1D np.array, Signal to Noise Ratio
+                out : 1D np.array, optional preallocated output (G is then computed without any allocation)
             Output :
                 G : 1D np.array, gain G of Wiener filtering
 
         """
-        G = SNR / (SNR + 1)
-        return G
+        if out is None:
+            return SNR / (SNR + 1)
+        np.add(SNR, 1, out=out)
+        np.divide(SNR, out, out=out)
+        return out
 
     def welchs_periodogram(self):
         """
@@ -83,7 +122,7 @@ class Wiener:
 
         """
         # Initialising Sbb
-        Sbb = np.zeros((self.NFFT, self.channels.size))
+        Sbb = np.zeros((self.NFFT, self.channels.size), dtype=self.DTYPE)
 
         self.N_NOISE = int(self.T_NOISE[0] * self.FS), int(self.T_NOISE[1] * self.FS)
         # Number of frames used for the noise
@@ -98,7 +137,7 @@ class Wiener:
 
     def moving_average(self):
         # Initialising Sbb
-        Sbb = np.zeros((self.NFFT, self.channels.size))
+        Sbb = np.zeros((self.NFFT, self.channels.size), dtype=self.DTYPE)
         # Number of frames used for the noise
         noise_frames = np.arange((self.N_NOISE - self.FRAME) + 1)
         for channel in self.channels:
@@ -108,35 +147,163 @@ class Wiener:
                 Sbb[:, channel] += np.abs(X_framed) ** 2
         return Sbb / noise_frames.size
 
-    def wiener(self):
+    def decision_directed(self, SNR_post, beta=0.98, previous=None):
+        """
+        Function that computes the decision-directed a priori SNR of consecutive frames and its Wiener gain:
+            SNR_prio(l) = beta * G(l - 1) ** 2 * SNR_post(l - 1) + (1 - beta) * max(SNR_post(l) - 1, 0)
+        Bins are processed together, the recursion over frames runs in place in preallocated buffers.
+
+            Input :
+                SNR_post : 2D np.array (frames x bins), a posteriori SNR
+                beta : float, weight of the previous frame
+                previous : 1D np.array, G ** 2 * SNR_post of the frame before the first one (None at the start)
+            Output :
+                G : 2D np.array (frames x bins), Wiener gain of the decision-directed a priori SNR
+                previous : 1D np.array, state to pass with the next frames
+
+        """
+        SNR_prio = np.subtract(SNR_post, 1)
+        np.maximum(SNR_prio, 0, out=SNR_prio)
+        SNR_prio *= 1 - beta
+        G = np.empty_like(SNR_prio)
+        last = np.empty(SNR_prio.shape[1], dtype=SNR_prio.dtype)
+        first = 0
+        if previous is None:
+            # No history for the first frame: its a priori SNR is max(SNR_post - 1, 0)
+            SNR_prio[0] /= 1 - beta
+            Wiener.a_priori_gain(SNR_prio[0], out=G[0])
+            np.multiply(G[0], G[0], out=last)
+            last *= SNR_post[0]
+            first = 1
+        else:
+            last[:] = previous
+        for frame in range(first, SNR_prio.shape[0]):
+            last *= beta
+            SNR_prio[frame] += last
+            Wiener.a_priori_gain(SNR_prio[frame], out=G[frame])
+            np.multiply(G[frame], G[frame], out=last)
+            last *= SNR_post[frame]
+        return G, last
+
+    def gains(self, X, Sbb, estimator="tsnr", beta=0.98, previous=None):
+        """
+        Function that computes the Wiener gains of consecutive frames with one of the ESTIMATORS.
+
+            Input :
+                X : 2D np.array (frames x bins), spectra of the windowed frames (rfft)
+                Sbb : 1D np.array, noise PSD on the same bins
+                estimator : str, "posterior" (a priori gain of the a posteriori SNR), "dd" (decision-directed), "tsnr"
+                            (two-step noise reduction) or "hrnr" (harmonic regeneration noise reduction)
+                beta : float, weight of the previous frame in the decision-directed recursion
+                previous : 1D np.array, decision-directed state of the frame before X[0] (None at the start)
+            Output :
+                G : 2D np.array (frames x bins), gains
+                previous : 1D np.array, decision-directed state to pass with the next frames
+
+        """
+        # A posteriori SNR, the same for every estimator: Sbb is the mean |X| ** 2 of windowed noise frames, so the
+        # frame power is compared to it as is (no extra window-energy factor)
+        power = np.abs(X).astype(self.DTYPE, copy=False)
+        np.square(power, out=power)
+        power /= Sbb
+        if estimator == "posterior":
+            return Wiener.a_priori_gain(power, out=np.empty_like(power)), previous
+
+        SNR_post = power
+        G, previous = self.decision_directed(SNR_post, beta, previous)
+        if estimator == "dd":
+            return G, previous
+
+        # TSNR: a priori SNR of the decision-directed estimate of the current frame, G_dd ** 2 * SNR_post
+        SNR_prio = np.multiply(G, G)
+        SNR_prio *= SNR_post
+        G = Wiener.a_priori_gain(SNR_prio, out=G)
+        if estimator == "tsnr":
+            return G, previous
+
+        # HRNR: SNR of rho |S_tsnr| ** 2 + (1 - rho) |S_harmo| ** 2 with rho = G_tsnr, where S_tsnr = G_tsnr X and
+        # S_harmo is the spectrum of the TSNR estimate through a half-wave rectifier (the regenerated harmonics)
+        S_harmo = irfft(X * G, self.NFFT, axis=-1)
+        np.maximum(S_harmo, 0, out=S_harmo)
+        harmo = np.abs(rfft(S_harmo, axis=-1)).astype(self.DTYPE, copy=False)
+        np.square(harmo, out=harmo)
+        harmo /= Sbb
+        harmo *= 1 - G
+        np.multiply(G, G, out=SNR_prio)
+        SNR_prio *= G
+        SNR_prio *= SNR_post
+        SNR_prio += harmo
+        return Wiener.a_priori_gain(SNR_prio, out=G), previous
+
+    def wiener(self, output_path='static/data/WAV/Filtered Guitar.wav', estimator="posterior", beta=0.98,
+               chunk_frames=1024):
         """
         Function that returns the estimated speech signal using overlapp - add method
         by applying a Wiener Filter on each frame to the noised input signal.
 
+        Frames are transformed chunk_frames at a time, the gains of a chunk are computed for all its bins at once and
+        the decision-directed state is carried from one chunk to the next, as the state of the noise tracker when the
+        noise is tracked (one pass, the noise PSD of each frame only depends on the frames up to it).
+
+            Input :
+                output_path : str, WAV file the estimated signal is written to
+                estimator : str, a priori SNR estimator, one of ESTIMATORS (see gains)
+                beta : float, weight of the previous frame in the decision-directed recursion
+                chunk_frames : int, number of frames processed at once (bounds the working memory)
+
             Output :
                 s_est : 1D np.array, Estimated speech signal
 
         """
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{estimator}', expected one of {ESTIMATORS}")
+        x = self.x
+        n_bins = self.NFFT // 2 + 1
+        hops = -(-self.FRAME // self.OFFSET)  # Hops spanned by a frame
+
         # Initialising estimated signal s_est
-        s_est = np.zeros(self.x.shape)
+        s_est = np.zeros(x.shape, dtype=self.DTYPE)
+        tiny = np.finfo(self.DTYPE).tiny
         for channel in self.channels:
-            for frame in self.frames:
-                ############# Initialising Frame ###################################
-                # Temporal framing with a Hanning window
-                i_min, i_max = frame * self.OFFSET, frame * self.OFFSET + self.FRAME
-                x_framed = self.x[i_min:i_max, channel] * self.WINDOW
+            if self.TRACKING:
+                tracker = NoiseTracker(n_bins, self.FS / self.OFFSET, dtype=self.DTYPE)
+                Sbb = None
+            else:
+                Sbb = np.maximum(self.Sbb[:n_bins, channel], tiny)
+            previous = None
+            for first in range(0, self.frames.size, chunk_frames):
+                last = min(first + chunk_frames, self.frames.size)
+                count = last - first
 
-                # Zero padding x_framed
-                X_framed = fft(x_framed, self.NFFT)
+                ############# Initialising Frames ##################################
+                # Temporal framing with a Hanning window, zero padded to NFFT
+                segment = x[first * self.OFFSET:(last - 1) * self.OFFSET + self.FRAME, channel]
+                frames = np.lib.stride_tricks.as_strided(segment, shape=(count, self.FRAME),
+                                                         strides=(self.OFFSET * segment.strides[0], segment.strides[0]))
+                X = rfft(frames * self.WINDOW, self.NFFT, axis=-1)
+
+                if self.TRACKING:
+                    # Noise PSD of every frame of the chunk, continuing the tracking of the previous chunks
+                    power = np.abs(X).astype(self.DTYPE, copy=False)
+                    np.square(power, out=power)
+                    Sbb = tracker.track(power, out=power)
+                    np.maximum(Sbb, tiny, out=Sbb)
 
                 ############# Wiener Filter ########################################
-                # Apply a priori wiener gains G to X_framed to get output S
-                SNR_post = (np.abs(X_framed) ** 2 / self.EW) / self.Sbb[:, channel]
-                G = Wiener.a_priori_gain(SNR_post)
-                S = X_framed * G
+                G, previous = self.gains(X, Sbb, estimator, beta, previous)
+                X *= G
 
                 ############# Temporal estimated Signal ############################
-                # Estimated signals at each frame normalized by the shift value
-                temp_s_est = np.real(ifft(S)) * self.SHIFT
-                s_est[i_min:i_max, channel] += temp_s_est[:self.FRAME]  # Truncating zero padding
-        wav.write('static/data/WAV/Filtered Guitar.wav', self.FS, s_est / s_est.max())
+                # Estimated frames normalized by the shift value and overlap-added hop by hop
+                S = np.zeros((count, hops * self.OFFSET), dtype=self.DTYPE)
+                S[:, :self.FRAME] = irfft(X, self.NFFT, axis=-1)[:, :self.FRAME]  # Truncating zero padding
+                S *= self.SHIFT
+                S = S.reshape(count, hops, self.OFFSET)
+                out = s_est[first * self.OFFSET:, channel]
+                for hop in range(hops):
+                    span = min(count * self.OFFSET, out.size - hop * self.OFFSET)
+                    out[hop * self.OFFSET:hop * self.OFFSET + span] += S[:, hop, :].ravel()[:span]
+        if self.MONO:
+            s_est = s_est[:, 0]
+        wav.write(output_path, self.FS, s_est / s_est.max())
+        return s_est
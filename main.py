@@ -1,10 +1,13 @@
+import os
 import sys
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 # PyQt5 imports
 from PyQt5.QtCore import QRect, QTimer
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QShortcut, QInputDialog
 
 # PyQtGraph imports
 import pyqtgraph as pg
@@ -15,19 +18,34 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 # SciPy imports
-from scipy.fft import rfft, rfftfreq, irfft
 from scipy.signal import spectrogram
 
 # Librosa import
 import librosa
 
-# SoundDevice import
-import sounddevice as sd
-
 # Application-specific imports
 import app.wiener_filter.Wiener as nr
+from app.wiener_filter.StreamingWiener import StreamingWiener
+from app.wiener_filter.NoiseProfile import NoiseProfileCache
+from app.equalizer.Equalizer import Equalizer
+from app.equalizer.RenderCache import RenderCache, RenderHistory
+from app.separation.MaskSeparator import MaskSeparator
+from app.audio.backends import create_backend
+from app.audio.engine import AudioEngine, DEFAULT_USE_ENGINE
+from app.audio.processing import BlockEqualizer
+from app.audio.export import ExportJob, ExportCancelled
+from app.audio.meters import LevelMeter
 from app.ui.Design import Ui_MainWindow
-from app.utils.clean_cache import remove_directories
+from app.ui.MeterView import MeterView
+from app.utils.precision import real_dtype, complex_dtype, time_slice
+from app.utils.fft_backend import rfft, rfftfreq, irfft, default_backend
+from app.utils.bands import rfft_band_aggregator, band_ranges, BandLayout, DEFAULT_LAYOUTS
+from app.utils.resample import DEFAULT_PROCESSING_RATE, DEFAULT_UPSAMPLE_ON_EXPORT
+from app.utils.project_cache import ProjectCache, min_max_envelope
+from app.utils.artifact_cache import default_artifacts
+from app.utils.hashing import file_hash
+from app.utils.spectrogram_tiles import SpectrogramTiles
+from app.utils.memory import MemoryBudget, TimeAxis, is_mapped
 
 # Ignore specific runtime warnings related to overflow in casting
 warnings.filterwarnings('ignore', 'overflow encountered in cast')
@@ -41,6 +59,11 @@ class MainApp(QMainWindow):
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
 
+        # Size-limited cache of every derived file (filtered audio, profiles, projects...)
+        self.artifacts = default_artifacts
+        # Byte accounting of the session buffers (Ctrl+M), spilled to memory maps above the RAM ceiling if one is set
+        self.memory = MemoryBudget()
+
         # Initialize widgets and variables
         self.init_graph_widgets()
         self.setup_signals()  # Connect template signals to functions
@@ -66,6 +89,38 @@ class MainApp(QMainWindow):
 
         # Sliders and frequency adjustment
         self.slidervalues = np.ones((10,), dtype=float)  # Default slider values for equalizer adjustments
+        # Band layout of the current mode, and the graphic equalizer layouts of the Uniform Range mode (cycled with G)
+        self.band_layout = None
+        self.frequency_ranges = None
+        self.band_layouts = DEFAULT_LAYOUTS  # (bands, "linear" / "log") pairs
+        self.band_layout_index = 0
+        self.equalizer = Equalizer([])  # Caches the forward transform of the loaded audio
+        self.separator = MaskSeparator(budget=self.memory)  # Caches the STFT and harmonic mask used by the Eliminates Vowels mode
+        self.separation_labels = ["Harmonic", "Percussive"]
+
+        # Rendered outputs cache (bounded by a RAM ceiling) and undo / redo / A-B history
+        self.render_cache = RenderCache(max_bytes=256 * 2 ** 20)
+        self.render_history = RenderHistory()
+        self.signal_id = 0  # Incremented every time new audio is loaded
+        self.input_spectrogram = None  # (signal id, spectrogram image) of the loaded audio
+
+        # Progressive rendering of long files: the window around the playhead is shown first,
+        # the full render runs in the background and is swapped in when done
+        self.progressive_rendering = True
+        self.progressive_min_seconds = 30  # Shorter files are rendered synchronously
+        self.preview_seconds = 5  # Seconds rendered on each side of the playhead
+        # Changes of narrow bands are rendered from the shown output by adding the changed band components
+        self.delta_rendering = True
+        self.render_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_render = None  # (cache key, future) of the background full render
+        self.render_poll_timer = QTimer()
+        self.render_poll_timer.timeout.connect(self.poll_background_render)
+
+        # Streaming export of the processed audio, run on its own thread and polled for progress
+        self.export_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_export = None  # (job, future) of the running export
+        self.export_poll_timer = QTimer()
+        self.export_poll_timer.timeout.connect(self.poll_export)
 
         # Flags for initial plotting
         self.original_signal_plotted = False
@@ -73,6 +128,7 @@ class MainApp(QMainWindow):
 
         # Fourier magnitudes and display scale
         self.initial_fourier_magnitudes = None
+        self.audiogram_fraction = 3  # Audiogram bands: 1 for octaves, 3 for third-octaves
 
         # Connect slider signals to callback functions
         for i, slider in enumerate(self.ui.equalizer_sliders):
@@ -87,6 +143,22 @@ class MainApp(QMainWindow):
 
         self.ui.button.clicked.connect(self.noise_reduction)
 
+        # Noise profiles reused across denoise runs, optionally shared by every file of the session
+        self.noise_profiles = NoiseProfileCache(artifacts=self.artifacts)
+        self.share_noise_profile = False
+        self.wiener_estimator = "tsnr"  # A priori SNR estimator of the offline denoiser (see Wiener.ESTIMATORS)
+        # Longer recordings have their noise tracked online (MCRA) instead of estimated over the first second
+        self.noise_tracking_seconds = 30
+
+        # Decoded and rendered samples are shared with the project and render caches, only the spectrum may be spilled
+        self.memory.track("Input samples", self, "audio_data", spillable=False)
+        self.memory.track("Output samples", self, "adjusted_audio_data", spillable=False)
+        self.memory.track("Input spectrum", self.equalizer, "spectrum")
+        self.memory.watch("Render cache", lambda: self.render_cache.nbytes)
+        self.memory.watch("Input spectrogram", self.input_spectrogram_bytes)
+        self.memory.watch("Spectrogram tiles", lambda: sum(tiles.nbytes for tiles in self.spectrogram_tiles.values()))
+        self.memory.watch("FFT workspaces", lambda: default_backend.nbytes)
+
     def setup_signals(self):
         # Connect template signals to respective functions
         self.ui.quit_app_button.clicked.connect(self.quit_app)
@@ -99,9 +171,48 @@ class MainApp(QMainWindow):
         self.ui.toggle_spectrogram_button.clicked.connect(self.toggle_show_spectrogram)
         self.ui.toggle_scale_button.clicked.connect(self.toggle_scale_mode_2)
 
+        # Undo / redo / A-B compare of equalizer settings
+        QShortcut(QKeySequence.Undo, self, activated=self.undo_equalizer)
+        QShortcut(QKeySequence.Redo, self, activated=self.redo_equalizer)
+        QShortcut(QKeySequence("B"), self, activated=self.toggle_ab_equalizer)
+
+        # Live Wiener denoising during playback
+        QShortcut(QKeySequence("D"), self, activated=self.toggle_live_denoise)
+
+        # Named noise profiles (e.g. per recorder) shared by every file denoised in the session
+        QShortcut(QKeySequence("N"), self, activated=self.choose_noise_profile)
+
+        # Live band meters and output spectrum
+        QShortcut(QKeySequence("M"), self, activated=self.toggle_meters)
+
+        # Click on a cine graph to seek, L to add / remove an A-B loop region
+        self.input_cine_graph.scene().sigMouseClicked.connect(
+            lambda event: self.seek_from_click(self.input_cine_graph, event))
+        self.output_cine_graph.scene().sigMouseClicked.connect(
+            lambda event: self.seek_from_click(self.output_cine_graph, event))
+        QShortcut(QKeySequence("L"), self, activated=self.toggle_loop)
+
+        # Export of the processed audio to WAV / FLAC
+        QShortcut(QKeySequence.Save, self, activated=self.export_audio)
+        QShortcut(QKeySequence("Escape"), self, activated=self.cancel_export)
+
+        # Memory held by each buffer of the session
+        QShortcut(QKeySequence("Ctrl+M"), self, activated=self.show_memory_usage)
+
+        # Next graphic equalizer layout (10 / 31 / N bands, linear or log) of the Uniform Range mode
+        QShortcut(QKeySequence("G"), self, activated=self.cycle_band_layout)
+
+        # Playback through the engine process or an in-process stream
+        QShortcut(QKeySequence("E"), self, activated=self.toggle_audio_engine)
+
     def quit_app(self):
         QApplication.quit()
-        remove_directories()
+        self.cancel_export()
+        self.export_executor.shutdown(wait=False)
+        self.render_executor.shutdown(wait=False)
+        self.audio_engine.close()
+        self.memory.close()
+        self.artifacts.evict()
 
     def toggle_current_mode(self):
         # Increment the index and wrap around to the beginning if at the end
@@ -140,6 +251,10 @@ class MainApp(QMainWindow):
             self.setup_sliders()  # Update sliders based on the current mode
 
     def setup_sliders(self):
+        # Create the sliders the layout needs beyond the existing ones
+        self.ensure_sliders(len(self.labels))
+        self.slidervalues = np.ones((len(self.labels),), dtype=float)
+
         # Reset sliders
         for slider in self.ui.equalizer_sliders:
             slider.blockSignals(True)  # Temporarily block signals
@@ -173,16 +288,89 @@ class MainApp(QMainWindow):
 
         # Store the audio data for playback
         self.audio_data = None
+        self.adjusted_audio_data = None
+        self.rendered = None  # (cache key, band gains) of adjusted_audio_data, for delta updates
         self.sampling_rate = None
         self.playback_index = 0
+
+        # Sources above the processing rate are resampled on load, exports can be brought back to the source rate
+        self.processing_rate = DEFAULT_PROCESSING_RATE
+        self.source_rate = None
+        self.upsample_on_export = DEFAULT_UPSAMPLE_ON_EXPORT
+
+        # Decoded samples, spectrum, spectrogram and overview pyramid of every opened file, reused on reopen
+        self.project_cache = ProjectCache(artifacts=self.artifacts)
+        self.project = None
+        self.overview_points = 2 ** 17  # Longer signals are drawn from the min / max pyramid
+
+        # Long files get a spectrogram pyramid computed tile by tile, drawn for the visible time range only
+        self.tiled_spectrogram_seconds = 60
+        self.spectrogram_tiles = {}  # output flag -> SpectrogramTiles of the displayed signal
+        self.spectrogram_timer = QTimer()
+        self.spectrogram_timer.setSingleShot(True)
+        self.spectrogram_timer.timeout.connect(self.refresh_spectrogram_viewport)
+        self.input_cine_graph.sigXRangeChanged.connect(self.spectrogram_viewport_changed)
         self.playback_speed_factor = 1
+
+        # Real-time equalizer applied to each played block, followed by the optional live Wiener stage
+        self.block_equalizer = BlockEqualizer()
+        # Band levels and output spectrum measured from the equalized blocks, shown in the live meters window
+        self.level_meter = LevelMeter()
+        self.meter_view = None
+        self.meters_enabled = False
+        self.live_denoiser = None
+
+        # Audio output (sound card by default, or a simulated null / WAV file sink for headless runs)
+        self.audio_backend = create_backend()
+
+        # Optional engine process owning the output stream, fed through shared-memory ring buffers
+        self.use_audio_engine = DEFAULT_USE_ENGINE
+        self.audio_engine = AudioEngine(backend=self.audio_backend)
+        self.engine_output = None  # Processed frames read back from the engine, for the live meters
+        self.engine_source, self.engine_samplerate = None, None  # Samples and stream rate the engine is playing
+
         # Timer for playback
         self.play_timer = QTimer()
         self.play_timer.timeout.connect(self.update_playback)
 
+        # Seek and A-B loop: the callback applies a pending seek itself and wraps around the loop region
+        self.pending_seek = None  # Sample index to jump to at the next callback
+        self.loop_region = None  # (start, stop) samples of the loop, or None
+        self.loop_seconds = 2.0  # Length of a new loop region
+        self.preroll = None  # Samples run through the live denoiser before a seek point, to warm its overlap-add
+        self.loop_regions = {}  # Cine graph -> persistent pg.LinearRegionItem
+        self.cine_curves = {}  # Cine graph -> persistent playback curve
+
+    def ensure_sliders(self, count):
+        """Create the missing sliders of a layout of count bands and connect them like the initial ones."""
+        first = len(self.ui.equalizer_sliders)
+        for i, slider in enumerate(self.ui.ensure_equalizer_sliders(count), first):
+            slider.sliderReleased.connect(self.create_slider_callback(i))
+
+    def set_band_layout(self, layout, extra_labels=()):
+        """Use a BandLayout for the current mode: its ranges and labels, followed by any extra (non band) sliders."""
+        self.band_layout = layout
+        self.frequency_ranges = list(layout.ranges)
+        self.labels = list(layout.labels) + list(extra_labels)
+
+    def uniform_layout(self, fs):
+        """Return the graphic equalizer layout of the Uniform Range mode for a sampling rate."""
+        num_sliders, scale = self.band_layouts[self.band_layout_index]
+        return BandLayout(self.define_frequency_bands(fs, num_sliders, scale), scale=scale)
+
+    def cycle_band_layout(self):
+        """Switch the Uniform Range mode to its next band layout, with one slider per band."""
+        if self.current_mode != "Uniform Range":
+            return
+        self.band_layout_index = (self.band_layout_index + 1) % len(self.band_layouts)
+        self.set_band_layout(self.uniform_layout(self.fs or 1000))
+        self.setup_sliders()
+        if self.original_time is not None and len(self.original_time):
+            self.plot_signal_uniform(self.original_time, self.original_amplitude, fs=self.fs)
+
     def configure_uniform_range_mode(self):
-        self.labels = ["Slider 1", "Slider 2", "Slider 3", "Slider 4", "Slider 5", "Slider 6", "Slider 7", "Slider 8",
-                       "Slider 9", "Slider 10"]
+        self.set_band_layout(self.uniform_layout(self.fs or 1000))
+        self.setup_sliders()
         self.ui.button.hide()
         self.ui.upload_signal_button.disconnect()
         self.ui.upload_signal_button.clicked.connect(self.upload_signal_file)
@@ -191,29 +379,29 @@ class MainApp(QMainWindow):
         )
 
     def configure_hybrid_sounds_mode(self):
-        self.labels = ["Wolf", "Owl", "Birds", "Studio", "80s sine synth"]
-        self.frequency_ranges = [
+        self.set_band_layout(BandLayout([
             (0, 600),
             (600, 800),
             (1800, 5500),
             (1200, 1800),
             (5500, 20000),
-        ]
+        ], labels=["Wolf", "Owl", "Birds", "Studio", "80s sine synth"]))
         self.configure_sliders()
 
     def configure_vocals_mode(self):
-        self.labels = ["Keyboard", "synth", "C", "A "]
-        self.frequency_ranges = [
+        # The band sliders are followed by the gains of the harmonic (voice) and percussive parts
+        self.set_band_layout(BandLayout([
         (0, 50),  # A
         (6000, 7000),  # A
         (2000, 5000),  # C
         (600, 800),  # C+A
-        ]
+        ], labels=["Keyboard", "synth", "C", "A "]), extra_labels=self.separation_labels)
         self.configure_sliders()
 
     def configure_sliders(self):
         # Configure sliders for sounds
-        for slider in self.ui.equalizer_sliders[:4]:
+        self.ensure_sliders(len(self.labels))
+        for slider in self.ui.equalizer_sliders[:len(self.labels)]:
             slider.setMinimum(0)  # Minimum gain (mute)
             slider.setMaximum(100)  # Maximum gain (boost)
             slider.setValue(50)  # Default gain (no change)
@@ -262,14 +450,20 @@ class MainApp(QMainWindow):
         # Adjust the audio playback speed by modifying the samplerate
         adjusted_samplerate = int(self.sampling_rate * self.current_speed)
 
+        if self.use_audio_engine:
+            if self.is_playing and self.audio_engine.running:
+                self.play_through_engine(self.audio_engine.position, adjusted_samplerate)
+            return
+
         if hasattr(self, 'audio_stream') and self.audio_stream.active:
             self.audio_stream.stop()
             self.audio_stream.close()
 
         # Create a new audio stream with the adjusted sampling rate
-        self.audio_stream = sd.OutputStream(
+        self.audio_stream = self.audio_backend.open_stream(
             samplerate=adjusted_samplerate,
             channels=1,
+            dtype='float32',
             callback=self.audio_callback
         )
 
@@ -310,6 +504,9 @@ class MainApp(QMainWindow):
 
             # Save the current audio position for resuming
             if file_extension == "wav":
+                if self.use_audio_engine and self.audio_engine.running:
+                    self.audio_engine.stop()
+                    self.playback_index = self.audio_engine.position
                 if hasattr(self, "audio_stream") and self.audio_stream.active:
                     self.audio_stream.stop()
                 if hasattr(self, "play_timer"):
@@ -323,10 +520,22 @@ class MainApp(QMainWindow):
         # Adjust the playback sampling rate for slower playback
         adjusted_sampling_rate = int(self.sampling_rate * self.playback_speed_factor)
 
+        if self.use_audio_engine:
+            # The engine process owns the stream, the GUI only keeps its ring buffer filled
+            self.audio_engine.start()
+            self.engine_output = np.zeros(self.audio_engine.capacity, dtype=np.float32)
+            self.sync_playback_equalizer()
+            self.sync_playback_denoiser()
+            self.play_through_engine(self.playback_index, adjusted_sampling_rate)
+            return
+
+        self.sync_playback_equalizer()
+
         # Create a Stream for audio playback
-        self.audio_stream = sd.OutputStream(
+        self.audio_stream = self.audio_backend.open_stream(
             samplerate=adjusted_sampling_rate,  # Use the adjusted sampling rate
             channels=1,
+            dtype='float32',
             callback=self.audio_callback
         )
 
@@ -337,6 +546,18 @@ class MainApp(QMainWindow):
         if self.audio_data is None or len(self.audio_data) == 0:
             return
 
+        engine_playing = self.use_audio_engine and self.audio_engine.running
+        if engine_playing:
+            # Keep the engine supplied ahead of the playhead and follow its position, restarting it from the playhead
+            # when the samples to play change (a render finished, or a new setting waits for its render)
+            source, _ = self.playback_source()
+            if source is not self.engine_source:
+                self.play_through_engine(self.audio_engine.position, self.engine_samplerate)
+            else:
+                self.audio_engine.feed(source)
+            self.playback_index = self.audio_engine.position
+            self.meter_engine_output()
+
         # Calculate the playback chunk based on the current speed
         chunk_size = int(0.003 * self.sampling_rate * self.current_speed)  # Adjust chunk size for speed
         start_index = self.playback_index
@@ -351,74 +572,192 @@ class MainApp(QMainWindow):
         if end_index > len(self.audio_data):
             end_index = len(self.audio_data)
 
-        # Update the graph with the current playback chunk
-        self.input_cine_graph.clear()
+        # Update the graph with the current playback chunk (the curves are created once and only get new data)
         self.input_cine_graph.enableAutoRange(axis='x')
-        self.output_cine_graph.clear()
         self.output_cine_graph.enableAutoRange(axis='x')
 
-        time_axis = np.linspace(0, len(self.audio_data) / self.sampling_rate, len(self.audio_data))
-        self.input_cine_graph.plot(
-            time_axis[start_index:end_index], self.audio_data[start_index:end_index], pen='b'
-        )
-        self.output_cine_graph.plot(
-            time_axis[start_index:end_index], self.audio_data[start_index:end_index], pen='r'
-        )
+        source, _ = self.playback_source()
+        chunk_time = time_slice(start_index, end_index, self.sampling_rate)
+        self.cine_curve(self.input_cine_graph, 'b').setData(chunk_time, self.audio_data[start_index:end_index])
+        self.cine_curve(self.output_cine_graph, 'r').setData(chunk_time, source[start_index:end_index])
+        self.show_loop_region()
 
-        # Increment playback_index
-        self.playback_index += chunk_size
+        # Increment playback_index (an active stream moves it itself, from the audio callback)
+        if not engine_playing and getattr(self, "audio_stream", None) is None:
+            self.playback_index += chunk_size
+            if self.loop_region is not None and self.playback_index >= self.loop_region[1]:
+                self.playback_index = self.loop_region[0]
 
-    def audio_callback(self, outdata, frames, time, status):
-        if self.audio_data is None or self.frequency_ranges is None or self.audio_stream is None:
-            outdata[:] = np.zeros((frames, 1))  # Fill with silence if no data
+    def play_through_engine(self, index, samplerate):
+        """
+        Start the engine at a sample index on the same samples as the in-process stream: the rendered output as it
+        is, or the input equalized block by block in the engine while a render is pending.
+        """
+        source, prerendered = self.playback_source()
+        self.engine_source, self.engine_samplerate = source, samplerate
+        self.audio_engine.play(source, index, samplerate, equalize=not prerendered)
+
+    def meter_engine_output(self):
+        """Drain the frames played by the engine process, metering them block by block like the audio callback."""
+        count = self.audio_engine.read_output(self.engine_output)
+        if not self.meters_enabled:
             return
+        blocksize = self.audio_engine.blocksize
+        for start in range(0, count - blocksize + 1, blocksize):
+            block = self.engine_output[start:start + blocksize]
+            self.level_meter.measure(rfft(block, blocksize), blocksize)
 
-        # Extract the current chunk of audio data
-        start_index = self.playback_index
-        end_index = start_index + frames
-
-        if start_index >= len(self.audio_data):
-            outdata[:] = np.zeros((frames, 1))
-            self.stop_audio()
+    def audio_callback(self, outdata, frames, time, status):
+        if self.audio_data is None or self.frequency_ranges is None or self.audio_stream is None:
+            outdata.fill(0)  # Fill with silence if no data
             return
 
-        if end_index > len(self.audio_data):
-            chunk = self.audio_data[start_index:]
-            outdata[:len(chunk)] = chunk.reshape(-1, 1)
-            outdata[len(chunk):] = 0
-            self.playback_index = len(self.audio_data)
+        block = outdata[:, 0]
+        if self.pending_seek is not None:
+            self.apply_seek()
+
+        # Copy the next frames directly in the output buffer, wrapping around the loop region
+        source, prerendered = self.playback_source()
+        loop = self.loop_region
+        position, filled = self.playback_index, 0
+        while filled < frames:
+            if loop is not None and position == loop[1]:
+                position = loop[0]
+            end = loop[1] if loop is not None and position < loop[1] else len(source)
+            take = min(frames - filled, end - position)
+            if take <= 0:
+                break  # End of the audio
+            block[filled:filled + take] = source[position:position + take]
+            filled += take
+            position += take
+        self.playback_index = position
+
+        if filled < frames:
+            block[filled:] = 0
             self.stop_audio()
             return
 
-        # Normal case: Process a full chunk
-        chunk = self.audio_data[start_index:end_index]
+        # Apply frequency adjustments (equalizer), unless the source is already the rendered output
+        if not prerendered:
+            self.block_equalizer.process(block)
 
-        # Apply frequency adjustments (equalizer)
-        fft_data = np.fft.rfft(chunk)  # Perform Fourier Transform
-        fft_freqs = np.fft.rfftfreq(len(chunk), d=1 / self.sampling_rate)
+        # Meter the equalized block from the spectrum the equalizer just computed
+        if self.meters_enabled:
+            spectrum = self.block_equalizer.spectrum if not prerendered else rfft(block, frames)
+            self.level_meter.measure(spectrum, frames)
 
-        # Get the value of the first slider
-        first_slider_gain = self.ui.equalizer_sliders[0].value() / 50.0  # Normalize gain
+        # Apply live noise reduction
+        denoiser = self.live_denoiser
+        if denoiser is not None:
+            denoiser.process(block)
 
-        # Apply gain to the first frequency range (0-600) and (800-1200)
-        freq_mask_1 = (fft_freqs >= 0) & (fft_freqs <= 600)
-        freq_mask_2 = (fft_freqs >= 800) & (fft_freqs <= 1200)
-        fft_data[freq_mask_1] *= first_slider_gain  # Apply gain to 0-600 Hz
-        fft_data[freq_mask_2] *= first_slider_gain  # Apply gain to 800-1200 Hz
-
-
-
-        # Perform Inverse Fourier Transform to get the modified audio
-        adjusted_chunk = self.call_inverese_fourier(fft_data,fft_freqs)#.astype(np.float32)
+    def playback_source(self):
+        """
+        Return the samples to play and whether they are already processed: the rendered output when it matches the
+        current setting (no background render pending), otherwise the input, equalized block by block.
+        """
+        rendered = self.adjusted_audio_data
+        if rendered is not None and self.pending_render is None and len(rendered) == len(self.audio_data):
+            return rendered, True
+        return self.audio_data, False
 
-        # Fill the output buffer with the modified chunk
-        outdata[:len(adjusted_chunk)] = adjusted_chunk.reshape(-1, 1)
-        outdata[len(adjusted_chunk):] = 0  # Fill remaining frames with silence
+    def seek(self, index):
+        """Move the playhead to a sample index, applied by the audio callback at its next block when playing."""
+        if self.audio_data is None:
+            return
+        index = int(np.clip(index, 0, len(self.audio_data) - 1))
+        if self.use_audio_engine and self.audio_engine.running and self.is_playing:
+            self.play_through_engine(index, int(self.sampling_rate * self.current_speed))
+        elif getattr(self, "audio_stream", None) is not None and self.is_playing:
+            self.pending_seek = index
+        else:
+            self.playback_index = index
+
+    def apply_seek(self):
+        """Jump to the pending seek point (audio thread). The live denoiser is reset and warmed with a pre-roll."""
+        index, self.pending_seek = self.pending_seek, None
+        self.playback_index = index
+        denoiser = self.live_denoiser
+        if denoiser is not None:
+            denoiser.reset()
+            if self.preroll is None or len(self.preroll) != denoiser.latency:
+                self.preroll = np.zeros(denoiser.latency, dtype=np.float32)
+            start = max(index - denoiser.latency, 0)
+            self.preroll.fill(0)
+            self.preroll[denoiser.latency - (index - start):] = self.audio_data[start:index]
+            denoiser.process(self.preroll)
+
+    def seek_from_click(self, graph, event):
+        """Seek to the time clicked on a cine graph (a plain left click, drags are left to the view)."""
+        if self.audio_data is None or event.button() != 1 or event.double():
+            return
+        view = graph.getPlotItem().getViewBox()
+        if not view.sceneBoundingRect().contains(event.scenePos()):
+            return
+        seconds = view.mapSceneToView(event.scenePos()).x()
+        region = self.loop_regions.get(graph)
+        if region is not None:
+            low, high = region.getRegion()
+            if low <= seconds <= high:
+                return  # Clicks inside the loop region are left to the region (dragging it)
+        self.seek(seconds * self.sampling_rate)
+
+    def toggle_loop(self):
+        """Add an A-B loop region around the playhead on both cine graphs, or remove it."""
+        if self.audio_data is None:
+            return
+        if self.loop_region is not None:
+            self.loop_region = None
+            for graph, region in self.loop_regions.items():
+                graph.removeItem(region)
+            self.loop_regions = {}
+            return
 
-        # Increment playback index
-        self.playback_index += frames
+        start = min(self.playback_index, max(len(self.audio_data) - int(self.loop_seconds * self.sampling_rate), 0))
+        stop = min(start + int(self.loop_seconds * self.sampling_rate), len(self.audio_data))
+        self.loop_region = (start, stop)
+        for graph in (self.input_cine_graph, self.output_cine_graph):
+            region = pg.LinearRegionItem(values=(start / self.sampling_rate, stop / self.sampling_rate),
+                                         brush=pg.mkBrush(255, 200, 0, 60))
+            region.sigRegionChanged.connect(self.loop_region_changed)
+            self.loop_regions[graph] = region
+        self.show_loop_region()
+
+    def loop_region_changed(self, region):
+        """Follow a loop region dragged on one graph, on the other graph and in samples."""
+        low, high = region.getRegion()
+        start, stop = int(max(low, 0) * self.sampling_rate), int(min(high * self.sampling_rate, len(self.audio_data)))
+        if stop - start < 2:
+            return
+        self.loop_region = (start, stop)
+        for other in self.loop_regions.values():
+            if other is not region:
+                other.blockSignals(True)
+                other.setRegion((low, high))
+                other.blockSignals(False)
+        if not start <= self.playback_index < stop:
+            self.seek(start)
+
+    def show_loop_region(self):
+        """Put the loop regions back on their graphs if a clear() removed them."""
+        for graph, region in self.loop_regions.items():
+            if region.scene() is None:
+                graph.addItem(region, ignoreBounds=True)
+
+    def cine_curve(self, graph, pen):
+        """
+        Return the persistent playback curve of a cine graph. It is created (replacing whatever the graph shows) on
+        the first playback update, and again if a clear() removed it.
+        """
+        curve = self.cine_curves.get(graph)
+        if curve is None or curve.scene() is None:
+            graph.clear()
+            curve = self.cine_curves[graph] = graph.plot(pen=pen)
+        return curve
 
     def stop_audio(self):
+        if self.audio_engine.running:
+            self.audio_engine.stop()
         if hasattr(self, "audio_stream") and self.audio_stream is not None:
             if self.audio_stream.active:
                 self.audio_stream.stop()
@@ -430,19 +769,30 @@ class MainApp(QMainWindow):
         self.ui.play_pause_button.setText("Play")
         self.playback_index = 0
 
-    def update_audio_equalizer(self):
+    def update_audio_equalizer(self, record_history=True):
         if self.audio_data is None or self.frequency_ranges is None:
             return
 
-        # Perform Fourier Transform on the audio data
-        fft_data = np.fft.rfft(self.audio_data)
-        fft_freqs = np.fft.rfftfreq(len(self.audio_data), d=1 / self.sampling_rate)
+        # The real-time playback chain follows the sliders
+        self.sync_playback_equalizer()
+
+        # Fourier Transform of the audio data (computed once per loaded signal and cached by the equalizer)
+        self.equalizer.set_bands(self.band_layout)
+        self.set_equalizer_signal()
+        fft_data, fft_freqs = self.equalizer.spectrum, self.equalizer.freqs
 
         # if self.ui.input_spectrogram_container.isVisible():
         if not self.ui.input_spectrogram_container.isVisible():
             pass
 
-        self.plot_spectrogram(self.audio_data, is_audio=True, output=False)
+        # The input spectrogram only changes with the signal
+        if self.input_spectrogram is None or self.input_spectrogram[0] != self.signal_id:
+            self.input_spectrogram = (self.signal_id, None)
+        spectrogram_db = self.plot_spectrogram(self.audio_data, is_audio=True, output=False,
+                                               spectrogram_db=self.input_spectrogram[1])
+        if self.input_spectrogram[1] is None and self.project is not None and spectrogram_db is not None:
+            spectrogram_db = self.project.put("stft_db", spectrogram_db)
+        self.input_spectrogram = (self.signal_id, spectrogram_db)
 
         # Get positive frequencies and corresponding magnitude
         positive_freqs = fft_freqs[:len(fft_freqs) // 2]
@@ -450,17 +800,8 @@ class MainApp(QMainWindow):
 
         self.fourier_graph.clear()
         if self.is_toggle:
-            freq_axis = self.freq_axis[:len(self.freq_axis)]
-            # Calculate the dB scale if toggle is enabled
-            freq_data_magnitude_db = 20 * np.log10(positive_magnitudes + 1e-10)  # Avoid log(0)
-
-            # Call the audiogram plotting function
-            audiogram_data = {
-                "Left": {freq: mag for freq, mag in zip(freq_axis, freq_data_magnitude_db) if freq <= 500},
-                # Example range
-                "Right": {freq: mag for freq, mag in zip(freq_axis, freq_data_magnitude_db) if freq > 500}
-                # Example range
-            }
+            # Calculate the dB levels of the fractional-octave bands and plot them as an audiogram
+            audiogram_data = self.audiogram_levels(np.abs(fft_data), self.equalizer.n_fast, self.sampling_rate)
             self.plot_audiogram(audiogram_data)
         else:
             self.fourier_graph.plot(positive_freqs, positive_magnitudes, pen='r')  # Plot FFT results
@@ -468,18 +809,183 @@ class MainApp(QMainWindow):
             self.fourier_graph.setLabel('left', 'Amplitude')
             self.fourier_graph.setLabel('bottom', 'Frequency (Hz)')
 
-        # Perform Inverse Fourier Transform to get the adjusted audio
-        self.adjusted_audio_data = self.call_inverese_fourier(fft_data , fft_freqs)
+        if record_history:
+            self.render_history.push(self.get_equalizer_state())
+
+        # Perform Inverse Fourier Transform to get the adjusted audio, unless this setting was already rendered
+        gains = self.get_band_gains()
+        key = self.render_key()
+        entry = self.render_cache.get(key)
+        if entry is None and self.uses_separation():
+            entry = self.render_cache.put(key, self.render_separation(gains))
+        if entry is None:
+            # Changes of narrow bands are rendered from the shown output, for a fraction of a full inverse transform
+            entry = self.render_delta(key, gains)
+        if entry is None:
+            if self.progressive_rendering and len(self.audio_data) > self.progressive_min_seconds * self.sampling_rate:
+                self.start_progressive_render(key, gains)
+                return
+            entry = self.render_cache.put(key, self.equalizer.render(gains))
+        self.adjusted_audio_data = entry.output
+        self.rendered = None if self.uses_separation() else (key, gains)
 
         # Plot the spectrogram (output audio)
         if not self.ui.input_spectrogram_container.isVisible():
             pass
-        self.plot_spectrogram(self.adjusted_audio_data, is_audio=True, output=True)
+        spectrogram_db = self.plot_spectrogram(self.adjusted_audio_data, is_audio=True, output=True,
+                                               spectrogram_db=entry.spectrogram)
+        if entry.spectrogram is None and spectrogram_db is not None:
+            self.render_cache.set_spectrogram(key, spectrogram_db)
 
         # Update the output cine graph
-        time_axis = np.linspace(0, len(self.adjusted_audio_data) / self.sampling_rate, len(self.adjusted_audio_data))
+        output_time, output_curve = self.overview_curve(self.adjusted_audio_data)
+        self.output_cine_graph.clear()
+        self.output_cine_graph.plot(output_time, output_curve, pen='r')
+        self.memory.enforce()
+
+    def start_progressive_render(self, key, gains):
+        """Show the new setting around the playhead right away and render the full file in the background."""
+        start, stop = self.preview_window()
+        preview = self.equalizer.render_window(gains, start, stop)
         self.output_cine_graph.clear()
-        self.output_cine_graph.plot(time_axis, self.adjusted_audio_data, pen='r')
+        self.output_cine_graph.plot(time_slice(start, stop, self.sampling_rate), preview, pen='r')
+
+        if self.pending_render is None or self.pending_render[0] != key:
+            self.pending_render = (key, self.render_executor.submit(self.equalizer.render, gains))
+            self.render_poll_timer.start(50)
+
+    def render_delta(self, key, gains):
+        """
+        Render a setting from the shown output when the bands changed since its render are narrow (see
+        Equalizer.render_delta), and cache it under its key. The update is made on a copy: the previous render stays
+        cached for undo and A-B, and the audio callback never plays a half-updated buffer.
+        Return the new cache entry, or None when a full render is needed instead.
+        """
+        if not self.delta_rendering or self.rendered is None or self.adjusted_audio_data is None:
+            return None
+        rendered_key, rendered_gains = self.rendered
+        if rendered_key[:3] != key[:3] or len(rendered_gains) != len(gains):
+            return None
+        output = np.array(self.adjusted_audio_data)
+        if not self.equalizer.render_delta(output, rendered_gains, gains):
+            return None
+
+        # The shown output is current again: a background render still running for an older setting is dropped
+        self.pending_render = None
+        return self.render_cache.put(key, output)
+
+    def preview_window(self):
+        """Return the sample range rendered first: the visible output window plus a few seconds around the playhead."""
+        half = int(self.preview_seconds * self.sampling_rate)
+        view_start, view_stop = (int(t * self.sampling_rate) for t in self.output_cine_graph.viewRange()[0])
+        start = min(view_start, self.playback_index - half)
+        stop = max(view_stop, self.playback_index + half)
+        if stop - start > 4 * half:
+            # The whole file is visible, only the playhead surroundings are rendered first
+            start, stop = self.playback_index - half, self.playback_index + half
+        return max(start, 0), min(stop, len(self.audio_data))
+
+    def poll_background_render(self):
+        """Swap the background full render in once it is done, if its setting is still the current one."""
+        if self.pending_render is None:
+            self.render_poll_timer.stop()
+            return
+        key, future = self.pending_render
+        if not future.done():
+            return
+        self.render_poll_timer.stop()
+        self.pending_render = None
+        if future.exception() is not None:
+            return
+
+        self.render_cache.put(key, future.result())
+        if self.audio_data is not None and key == self.render_key():
+            self.update_audio_equalizer(record_history=False)
+
+    def render_key(self):
+        """Return the render cache key of the current setting (band gains, then separation gains if any)."""
+        gains = self.get_band_gains()
+        if self.uses_separation():
+            gains = np.append(gains, self.get_separation_gains())
+        return self.render_cache.make_key(self.signal_id, self.current_mode, self.band_layout, gains)
+
+    def uses_separation(self):
+        return self.current_mode == "Eliminates Vowels"
+
+    def get_separation_gains(self):
+        """Return the (harmonic, percussive) gains from the sliders that follow the band sliders."""
+        first = len(self.frequency_ranges)
+        sliders = self.ui.equalizer_sliders[first:first + len(self.separation_labels)]
+        return tuple(slider.value() / 50.0 for slider in sliders)
+
+    def render_separation(self, gains):
+        """
+        Remix the harmonic and percussive parts of the audio with the band gains applied on the STFT bins.
+        The STFT and the masks are computed once per signal, a new setting only costs the masking and inverse STFT.
+        """
+        self.separator.analyze(self.audio_data, self.sampling_rate)
+        curve = self.band_layout.curve(gains, self.separator.FRAME, self.sampling_rate)
+        harmonic_gain, percussive_gain = self.get_separation_gains()
+        return self.separator.render(harmonic_gain, percussive_gain, curve)
+
+    def get_equalizer_state(self):
+        """Return the current equalizer setting as a hashable (signal id, mode, band layout, slider values) tuple."""
+        slider_values = tuple(slider.value() for slider in self.ui.equalizer_sliders[:len(self.labels)])
+        return self.signal_id, self.current_mode, self.band_layout, slider_values
+
+    def restore_equalizer_state(self, state):
+        """Move the sliders (and band layout) back to a recorded setting and show its (usually cached) render."""
+        if state is None:
+            return
+        signal_id, mode, layout, slider_values = state
+        if signal_id != self.signal_id or mode != self.current_mode:
+            return
+        if layout != self.band_layout:
+            # Recorded under another layout of the Uniform Range mode (see cycle_band_layout)
+            self.set_band_layout(layout)
+            if (len(layout), layout.scale) in self.band_layouts:
+                self.band_layout_index = self.band_layouts.index((len(layout), layout.scale))
+            self.setup_sliders()
+        for slider, value in zip(self.ui.equalizer_sliders, slider_values):
+            slider.blockSignals(True)
+            slider.setValue(value)
+            slider.blockSignals(False)
+        self.update_audio_equalizer(record_history=False)
+
+    def undo_equalizer(self):
+        self.restore_equalizer_state(self.render_history.undo())
+
+    def redo_equalizer(self):
+        self.restore_equalizer_state(self.render_history.redo())
+
+    def toggle_ab_equalizer(self):
+        self.restore_equalizer_state(self.render_history.toggle_ab())
+
+    def sync_playback_equalizer(self):
+        """Send the current bands and gains to the real-time playback chain (in-process and engine)."""
+        gains = self.get_band_gains()
+        self.block_equalizer.configure(self.sampling_rate, self.band_layout, gains)
+        self.level_meter.configure(self.sampling_rate, self.frequency_ranges)
+        if self.meter_view is not None:
+            self.meter_view.set_labels(self.labels[:len(self.frequency_ranges)])
+        if self.audio_engine.running:
+            self.audio_engine.configure(self.sampling_rate, self.band_layout, gains)
+
+    def get_band_gains(self):
+        """Return the gain of each frequency range from the current slider positions."""
+        sliders = self.ui.equalizer_sliders[:len(self.frequency_ranges)]
+        return np.array([slider.value() / 50.0 for slider in sliders])  # Normalize gain
+
+    def render_presets(self, gain_vectors):
+        """
+        Render the loaded audio once per candidate gain vector, e.g. to compare band settings.
+        The forward transform is shared and the K inverse transforms run as one batch.
+        """
+        if self.audio_data is None or self.frequency_ranges is None:
+            return None
+        self.equalizer.set_bands(self.band_layout)
+        self.set_equalizer_signal()
+        return self.equalizer.render_batch(gain_vectors)
 
     def init_graph_widgets(self):
         # Cine Signal Viewers with zoom-enabled ViewBox
@@ -514,7 +1020,7 @@ class MainApp(QMainWindow):
     def load_signal_data(self, file_path):
         try:
             # Load data from CSV, excluding the first row (headers)
-            data = np.loadtxt(file_path, delimiter=',', skiprows=1)
+            data = np.loadtxt(file_path, delimiter=',', skiprows=1, dtype=real_dtype())
             self.current_file = file_path
 
             # Assuming the first column is time and the second is amplitude
@@ -570,22 +1076,25 @@ class MainApp(QMainWindow):
         """Load audio signal from a file, plot it, and calculate its frequency data."""
         try:
             # Load audio data
-            self.audio_data, self.sampling_rate = librosa.load(file_path, sr=None)
+            self.audio_data, self.sampling_rate = self.read_audio(file_path)
+            self.new_signal_loaded()
 
             # Plot the audio signal in the input_cine_graph
-            time_axis = np.linspace(0, len(self.audio_data) / self.sampling_rate, len(self.audio_data))
+            input_time, input_curve = self.overview_curve()
             self.input_cine_graph.clear()
-            self.input_cine_graph.plot(time_axis, self.audio_data, pen='b')  # Plot actual data instead of zeros
+            self.input_cine_graph.plot(input_time, input_curve, pen='b')  # Plot actual data instead of zeros
             self.output_cine_graph.clear()
-            self.output_cine_graph.plot(time_axis, self.audio_data, pen='r')  # Plot actual data instead of zeros
+            self.output_cine_graph.plot(input_time, input_curve, pen='r')  # Plot actual data instead of zeros
 
-            # FFT computation
-            fft_result = np.fft.fft(self.audio_data)
-            freq_axis = np.fft.fftfreq(len(self.audio_data), d=1 / self.sampling_rate)
+            # FFT computation (the real FFT holds every positive frequency of the full FFT), stored with the project
+            self.set_equalizer_signal()
+            self.memory.enforce()
+            fft_result = self.equalizer.spectrum
+            freq_axis = self.equalizer.freqs
 
             # Get positive frequencies and corresponding magnitude
-            positive_freqs = freq_axis[:len(freq_axis) // 2]
-            positive_magnitudes = np.abs(fft_result[:len(fft_result) // 2])
+            positive_freqs = freq_axis
+            positive_magnitudes = np.abs(fft_result)
 
             # Normalize or cap the magnitudes to a reasonable level
             max_allowed_magnitude = 100  # Example cap value
@@ -603,6 +1112,134 @@ class MainApp(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load audio file:\n{str(e)}")
 
+    def read_audio(self, file_path):
+        """
+        Decode an audio file at its native rate, then bring it down to the processing rate if it is above.
+        The samples are stored in the file's project, later opens map them from disk instead of decoding again.
+        """
+        self.project, samples = self.project_cache.load_audio(file_path, self.processing_rate)
+        self.source_rate = self.project.meta["source_rate"]
+        return samples, self.project.meta["sampling_rate"]
+
+    def set_equalizer_signal(self):
+        """Hand the audio to the equalizer, with the spectrum stored in the project when there is one."""
+        spectrum = self.project.get("spectrum") if self.project is not None else None
+        self.equalizer.set_signal(self.audio_data, self.sampling_rate, spectrum)
+        if self.project is not None and spectrum is None:
+            self.project.put("spectrum", self.equalizer.spectrum)
+
+    def overview_curve(self, samples=None):
+        """
+        Return the time axis and curve drawing a whole signal (the input audio by default): the samples, or a min / max
+        envelope if long, taken from the project pyramid for the input.
+        """
+        samples = self.audio_data if samples is None else samples
+        axis = TimeAxis(len(samples), self.sampling_rate)
+        if len(samples) <= self.overview_points:
+            return axis.slice(), samples
+        if samples is self.audio_data and self.project is not None:
+            curve, factor = self.project.envelope(self.overview_points, samples)
+        else:
+            curve, factor = min_max_envelope(samples, self.overview_points)
+        # Each block is drawn as its min then its max, at the block start time
+        return np.repeat(axis.slice(step=factor), 2), curve
+
+    def input_spectrogram_bytes(self):
+        image = self.input_spectrogram[1] if self.input_spectrogram is not None else None
+        return image.nbytes if image is not None and not is_mapped(image) else 0
+
+    def show_memory_usage(self):
+        """Show the bytes held by each buffer of the session, after spilling what goes over the RAM ceiling."""
+        self.memory.enforce()
+        QMessageBox.information(self, "Memory", f"<pre>{self.memory.report()}</pre>")
+
+    def export_audio(self):
+        """
+        Export the processed audio to a WAV or FLAC file. The current equalizer (and live denoiser, if on) is applied
+        block after block on a worker thread, the progress is shown in the status bar and Escape cancels.
+        """
+        if self.audio_data is None or self.pending_export is not None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Audio", "", "WAV Files (*.wav);;FLAC Files (*.flac)")
+        if not path:
+            return
+        if not path.lower().endswith(('.wav', '.flac')):
+            path += '.wav'
+
+        if self.source_rate and self.source_rate != self.sampling_rate:
+            # The source was resampled on load: offer to write the export at its original rate
+            default = QMessageBox.Yes if self.upsample_on_export else QMessageBox.No
+            answer = QMessageBox.question(
+                self, "Export Rate", f"Export at the source rate ({self.source_rate} Hz) instead of the processing "
+                f"rate ({self.sampling_rate} Hz)?", QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, default)
+            if answer == QMessageBox.Cancel:
+                return
+            self.upsample_on_export = answer == QMessageBox.Yes
+
+        if self.uses_separation() or self.frequency_ranges is None:
+            # The separation render is already complete in memory
+            audio = self.adjusted_audio_data if self.adjusted_audio_data is not None else self.audio_data
+            render_block = lambda start, stop: audio[start:stop]
+        else:
+            # Overlap-add equalizer on its own instance, sharing the cached spectrum, so the GUI can keep working
+            self.set_equalizer_signal()
+            equalizer = Equalizer(self.band_layout, self.equalizer.backend)
+            equalizer.set_signal(self.audio_data, self.sampling_rate, self.equalizer.spectrum)
+            gains = self.get_band_gains()
+            render_block = lambda start, stop: equalizer.render_window(gains, start, stop)
+
+        denoiser = None
+        if self.live_denoiser is not None:
+            # A stage of its own, estimated from the noise region like the live one: the worker thread never shares
+            # the PSD the playback callback keeps tracking, and long exports track their noise too
+            denoiser = self.create_live_denoiser()
+        target_rate = self.source_rate if self.upsample_on_export else None
+
+        job = ExportJob(path, len(self.audio_data), self.sampling_rate, render_block, denoiser, target_rate)
+        self.pending_export = (job, self.export_executor.submit(job.run))
+        self.export_poll_timer.start(200)
+
+    def cancel_export(self):
+        if self.pending_export is not None:
+            self.pending_export[0].cancel()
+
+    def poll_export(self):
+        """Show the progress of the running export, and its outcome once it is done."""
+        if self.pending_export is None:
+            self.export_poll_timer.stop()
+            return
+        job, future = self.pending_export
+        if not future.done():
+            self.statusBar().showMessage(f"Exporting {job.path}: {job.progress:.0%} (Esc to cancel)")
+            return
+        self.export_poll_timer.stop()
+        self.pending_export = None
+        error = future.exception()
+        if error is None:
+            self.statusBar().showMessage(f"Exported {job.path}", 5000)
+        elif isinstance(error, ExportCancelled):
+            self.statusBar().showMessage("Export cancelled", 5000)
+        else:
+            self.statusBar().clearMessage()
+            QMessageBox.critical(self, "Error", f"Failed to export audio file:\n{str(error)}")
+
+    def new_signal_loaded(self):
+        """Drop the renders and history of the previous audio signal."""
+        self.render_cache.invalidate(self.signal_id)
+        self.render_history.clear()
+        self.pending_render = None
+        self.adjusted_audio_data = None
+        self.rendered = None
+        self.spectrogram_tiles.clear()
+        self.signal_id += 1
+        if self.project is not None:
+            # The input spectrogram of a reopened file is mapped from its project
+            self.input_spectrogram = (self.signal_id, self.project.get("stft_db"))
+        if self.live_denoiser is not None:
+            # Live denoising stays on, with the noise of the new signal
+            self.live_denoiser = self.create_live_denoiser()
+            self.sync_playback_denoiser()
+
     def update_cine(self):
         # Only proceed if we are within the range of the data
         if self.cine_index < len(self.original_time):
@@ -632,6 +1269,7 @@ class MainApp(QMainWindow):
         self.cine_index = 0
         self.is_playing = False
         self.audio_data = None
+        self.project = None
         self.sampling_rate = None
         self.playback_index = 0
         self.playback_speed_factor = 1
@@ -728,25 +1366,15 @@ class MainApp(QMainWindow):
         if not hasattr(self, "initial_fourier_magnitudes"):
             self.initial_fourier_magnitudes = magnitude.copy()
 
-        # Define 10 custom frequency ranges
-        self.frequency_ranges = [
-            (0, 50),
-            (50, 100),
-            (100, 150),
-            (150, 200),
-            (200, 250),
-            (250, 300),
-            (300, 350),
-            (350, 400),
-            (400, 450),
-            (450, 500)
-        ]
+        # Bands of the selected graphic equalizer layout, up to the Nyquist frequency of the signal
+        if self.band_layout is None or self.band_layout != self.uniform_layout(fs):
+            self.set_band_layout(self.uniform_layout(fs))
 
         # Clone the original frequency data to apply selective adjustments
         adjusted_freq_data = freq_data.copy()
 
         # Inverse Fourier Transform to get the adjusted signal back in the time domain
-        adjusted_signal = self.call_inverese_fourier(adjusted_freq_data , frequencies)
+        adjusted_signal = self.call_inverese_fourier(adjusted_freq_data, N, fs)
         self.adjusted_signal_plot_data = adjusted_signal  # Set this to avoid AttributeError
         if not self.ui.input_spectrogram_container.isVisible():
             pass
@@ -765,24 +1393,8 @@ class MainApp(QMainWindow):
         # Update the Fourier Transform plot with adjusted amplitudes
         self.fourier_graph.clear()
         if self.is_toggle:
-            freq = [10.0, 60.0, 110.0, 160.0, 210.0, 260.0, 310.0, 360.0, 410.0, 460.0]
-            freq_data_magnitude_db = []
-            freq_data_magnitude_db_2 = []
-            # Calculate the dB scale if toggle is enabled
-            for mag in magnitude:
-                if mag > 0:
-                    freq_data_magnitude_db.append(20 * np.log10(mag))  # Avoid log(0)
-            for ind, mag in enumerate(freq_data_magnitude_db):
-                if mag < 0:
-                    freq_data_magnitude_db_2.append(mag)
-
-            # Call the audiogram plotting function
-            audiogram_data = {
-                "Left": {fr: mag for fr, mag in zip(freq, freq_data_magnitude_db_2) if fr <= 500},
-                # Example range
-                "Right": {fr: mag for fr, mag in zip(freq, freq_data_magnitude_db_2) if fr > 500}
-                # Example range
-            }
+            # Calculate the dB levels of the fractional-octave bands and plot them as an audiogram
+            audiogram_data = self.audiogram_levels(magnitude, default_backend.fast_length(N), fs)
             self.plot_audiogram(audiogram_data)
         else:
             self.fourier_graph.plot(frequencies, np.abs(adjusted_freq_data), pen='r')
@@ -802,29 +1414,27 @@ class MainApp(QMainWindow):
         for slider in self.ui.equalizer_sliders:
             slider.setValue(100)  # Set to middle value, assuming range is 0-100
 
-    def define_frequency_bands(self, fs, num_sliders=10):
-        """Define frequency bands for each slider."""
-        max_freq = fs / 2
-        band_width = max_freq / num_sliders
-        frequency_bands = [(i * band_width, (i + 1) * band_width) for i in range(num_sliders)]
-        return frequency_bands
+    def define_frequency_bands(self, fs, num_sliders=10, scale="linear"):
+        """Define frequency bands for each slider, linear or log-spaced up to the Nyquist frequency."""
+        return band_ranges(num_sliders, fs, scale)
 
-    def call_inverese_fourier(self, data ,fft_freqs):
-        # Apply gain to other frequency ranges
-        for slider, freq_range in zip(self.ui.equalizer_sliders[1:], self.frequency_ranges[1:]):
-            gain = slider.value() / 50.0  # Normalize gain
-            freq_mask = (fft_freqs >= freq_range[0]) & (fft_freqs <= freq_range[1])
-            data[freq_mask] *= gain  # Apply gain to the selected frequency range
+    def call_inverese_fourier(self, data, n, fs):
+        # Gain curve of the band layout (one product with its cached weight matrix), applied in place
+        data *= self.band_layout.curve(self.get_band_gains(), default_backend.fast_length(n), fs)
 
-        return np.fft.irfft(data)
+        # Inverse on the padded fast length, cropped back to the n original samples
+        return irfft(data, n).astype(real_dtype(), copy=False)
 
-    def plot_spectrogram(self, input_data, is_audio=False, output=False):
+    def plot_spectrogram(self, input_data, is_audio=False, output=False, spectrogram_db=None):
         """
         Plots the spectrogram for the given audio or signal data.
         Parameters:
             input_data: Raw signal data (e.g., np.array for audio) or tuple (time, amplitude)
             is_audio: Set to True for audio data; otherwise, False.
             output: Set to True to plot on the output spectrogram graph; otherwise, input graph.
+            spectrogram_db: Previously computed dB image of the audio data, skips the STFT when given.
+        Returns:
+            The dB spectrogram image for audio data (None otherwise), so callers can cache it.
         """
         # Determine the target graph (input or output spectrogram)
         target_graph = self.output_spectrogram_graph if output else self.input_spectrogram_graph
@@ -838,21 +1448,30 @@ class MainApp(QMainWindow):
             signal = input_data
             sample_rate = self.sampling_rate
 
-            # Compute Short-Time Fourier Transform (STFT)
-            stft = librosa.stft(signal, n_fft=2048, hop_length=512)
-            spectro = np.abs(stft)
-            spectrogram_db = librosa.amplitude_to_db(spectro, ref=np.max)
-
-            # Plot the spectrogram in decibels (dB)
-            img = librosa.display.specshow(
-                spectrogram_db,
-                y_axis='log',
-                x_axis='time',
-                sr=sample_rate,
-                hop_length=512,
-                cmap='inferno',
-                ax=ax
-            )
+            tiles = self.tiled_spectrogram(signal, output)
+            if tiles is not None:
+                # Long signal: only the visible time range, from the pyramid level matching the zoom
+                image, extent = tiles.viewport(*self.spectrogram_viewport())
+                img = ax.imshow(image, origin='lower', aspect='auto', extent=extent, cmap='inferno',
+                                vmin=-100, vmax=0, interpolation='nearest')
+                spectrogram_db = None
+            else:
+                # Compute Short-Time Fourier Transform (STFT)
+                if spectrogram_db is None:
+                    stft = librosa.stft(signal, n_fft=2048, hop_length=512, dtype=complex_dtype())
+                    spectro = np.abs(stft)
+                    spectrogram_db = librosa.amplitude_to_db(spectro, ref=np.max)
+
+                # Plot the spectrogram in decibels (dB)
+                img = librosa.display.specshow(
+                    spectrogram_db,
+                    y_axis='log',
+                    x_axis='time',
+                    sr=sample_rate,
+                    hop_length=512,
+                    cmap='inferno',
+                    ax=ax
+                )
             ax.set_title('Spectrogram' + (' (Output)' if output else ' (Input)'))
             ax.set_xlabel('Time (s)')
             ax.set_ylabel('Frequency (Hz)')
@@ -879,6 +1498,43 @@ class MainApp(QMainWindow):
 
         # Redraw the canvas to update the graph
         target_graph.draw()
+        return spectrogram_db
+
+    def tiled_spectrogram(self, signal, output):
+        """Return the tile pyramid of a long signal (None for signals drawn whole)."""
+        if len(signal) < self.tiled_spectrogram_seconds * self.sampling_rate:
+            return None
+        tiles = self.spectrogram_tiles.get(output)
+        if tiles is None or tiles.signal is not signal or tiles.fs != self.sampling_rate:
+            # Input tiles are saved in the file's project, output tiles only live as long as their render
+            store = None if output else self.project
+            tiles = SpectrogramTiles(signal, self.sampling_rate, store=store, max_tiles=64)
+            self.spectrogram_tiles[output] = tiles
+        return tiles
+
+    def spectrogram_viewport(self):
+        """Return the (start, stop) time range of the input cine graph, clipped to the signal."""
+        duration = len(self.audio_data) / self.sampling_rate
+        start, stop = self.input_cine_graph.viewRange()[0]
+        start, stop = max(start, 0.0), min(stop, duration)
+        if stop <= start:
+            return 0.0, duration
+        return start, stop
+
+    def spectrogram_viewport_changed(self):
+        # Redrawn once zooming / panning settles, not while the playhead drags the view along
+        if self.is_playing or not self.spectrogram_tiles:
+            return
+        self.spectrogram_timer.start(150)
+
+    def refresh_spectrogram_viewport(self):
+        """Redraw the tiled spectrograms for the current view; only tiles never shown before are computed."""
+        if self.audio_data is None or not self.ui.input_spectrogram_container.isVisible():
+            return
+        for output, signal in ((False, self.audio_data), (True, self.adjusted_audio_data)):
+            tiles = self.spectrogram_tiles.get(output)
+            if signal is not None and tiles is not None and tiles.signal is signal:
+                self.plot_spectrogram(signal, is_audio=True, output=output)
 
     def toggle_show_spectrogram(self):
         spectrogram_visible = self.ui.input_spectrogram_container.isVisible()
@@ -926,19 +1582,144 @@ class MainApp(QMainWindow):
         self.ui.button.setVisible(True)
         self.labels = []
 
+    def toggle_live_denoise(self):
+        """Enable / disable the streaming Wiener stage of the playback chain."""
+        if self.live_denoiser is not None:
+            self.live_denoiser = None
+        elif self.audio_data is not None:
+            self.live_denoiser = self.create_live_denoiser()
+        self.sync_playback_denoiser()
+
+    def toggle_audio_engine(self):
+        """Switch playback between the engine process and the in-process stream (playback stops first)."""
+        if self.is_playing:
+            self.stop_audio()
+        self.use_audio_engine = not self.use_audio_engine
+        if not self.use_audio_engine:
+            self.audio_engine.close()
+        self.statusBar().showMessage(
+            "Playback through the audio engine process" if self.use_audio_engine else "Playback in process", 5000)
+
+    def toggle_meters(self):
+        """Show / hide the live band meters and output spectrum window."""
+        if self.meter_view is None:
+            self.meter_view = MeterView(self.level_meter)
+            self.meter_view.set_labels(self.labels[:len(self.frequency_ranges or [])])
+        self.meters_enabled = not self.meter_view.isVisible()
+        self.meter_view.setVisible(self.meters_enabled)
+
+    def tracks_noise(self):
+        """Tell whether the noise of the loaded recording is tracked online rather than taken from its first second."""
+        return self.audio_data is not None and len(self.audio_data) > self.noise_tracking_seconds * self.sampling_rate
+
+    def create_live_denoiser(self):
+        """
+        Build the streaming Wiener stage, with the noise PSD estimated over the first second (and tracked from there
+        on for long recordings) and the a priori SNR estimator of the offline denoiser.
+        """
+        noise_begin, noise_end = 0, 1  # Same noise region as noise_reduction
+        denoiser = StreamingWiener(self.sampling_rate, track_noise=self.tracks_noise(), estimator=self.wiener_estimator)
+        denoiser.estimate_noise(self.audio_data[int(noise_begin * self.sampling_rate):
+                                                int(noise_end * self.sampling_rate)])
+        return denoiser
+
+    def sync_playback_denoiser(self):
+        """Send the live Wiener stage state to the engine process, if it is running."""
+        if self.audio_engine.running:
+            if self.live_denoiser is None:
+                self.audio_engine.set_denoiser(None, None)
+            else:
+                self.audio_engine.set_denoiser(self.sampling_rate, self.live_denoiser.noise_psd,
+                                               self.live_denoiser.tracker is not None, self.live_denoiser.estimator)
+
+    def choose_noise_profile(self):
+        """
+        Pick the noise profile shared by the next denoised files: a named profile, the first profile estimated from
+        now on, or none (each recording uses its own noise region). The current profile can also be stored by name.
+        """
+        per_recording, share_next, save = "Estimate per recording", "Share the next estimated profile", "Save as..."
+        names = self.noise_profiles.names()
+        choice, ok = QInputDialog.getItem(self, "Noise Profile", "Noise profile:",
+                                          [per_recording, share_next, save] + names, 0, False)
+        if not ok:
+            return
+        if choice == per_recording:
+            self.share_noise_profile = False
+            self.noise_profiles.session_profile = None
+        elif choice == share_next:
+            self.share_noise_profile = True
+            self.noise_profiles.session_profile = None
+        elif choice == save:
+            self.save_noise_profile()
+        else:
+            self.share_noise_profile = True
+            self.noise_profiles.session_profile = self.noise_profiles.load_named(choice)
+
+    def save_noise_profile(self):
+        """Store the shared profile, or the profile of the current recording, under a name."""
+        profile = self.noise_profiles.session_profile
+        if profile is None and self.current_file and self.current_file.endswith('.wav'):
+            profile = self.noise_profiles.load(self.current_file, (0, 1))  # Same noise region as noise_reduction
+        if profile is None:
+            QMessageBox.warning(self, "No Noise Profile", "Denoise a recording before saving its noise profile.")
+            return
+        name, ok = QInputDialog.getText(self, "Save Noise Profile", "Name (e.g. recorder or microphone):")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if os.sep in name or (os.altsep and os.altsep in name) or name.startswith("."):
+            QMessageBox.warning(self, "Invalid Name", f"'{name}' cannot be used as a profile name.")
+            return
+        self.noise_profiles.store_named(name, profile)
+        self.statusBar().showMessage(f"Noise profile saved as {name}", 5000)
+
     def noise_reduction(self):
         # If a file is selected, set current_file and load it
         if self.current_file:
             # Apply Wiener filtering if the file is a WAV file
             if self.current_file.endswith('.wav'):
-                noise_begin, noise_end = 0, 1
-                wiener_filter = nr.Wiener(self.current_file, noise_begin, noise_end)  # Adjust noise time as needed
-
-                wiener_filter.wiener()  # Apply Wiener filtering
+                if self.tracks_noise():
+                    # Long recording: the noise PSD is tracked along the file, no noise region nor profile
+                    wiener_filter = nr.Wiener(self.current_file)
+                    noise_name = "tracked"
+                else:
+                    noise_begin, noise_end = 0, 1
+                    region = (noise_begin, noise_end)
+                    noise_name = f"{noise_begin:g}_{noise_end:g}"
+
+                    # Reuse the session profile or this recording's cached profile instead of re-estimating the noise
+                    profile = self.noise_profiles.session_profile if self.share_noise_profile else None
+                    profile = profile or self.noise_profiles.load(self.current_file, region)
+                    wiener_filter = nr.Wiener(self.current_file, *region, noise_profile=profile)
+                    if not wiener_filter.PROFILE_USED:
+                        profile = wiener_filter.noise_profile()
+                        self.noise_profiles.store(self.current_file, region, profile)
+                    if self.share_noise_profile and self.noise_profiles.session_profile is None:
+                        self.noise_profiles.session_profile = profile
+
+                # Filtered audio goes to the artifact cache, named after the recording and noise region
+                output_name = f"{file_hash(self.current_file)}_{noise_name}_{self.wiener_estimator}.wav"
+                output_path = self.artifacts.path("filtered", output_name)
+                wiener_filter.wiener(output_path, estimator=self.wiener_estimator)  # Apply Wiener filtering
+                self.artifacts.register(output_path)
                 # Load the filtered audio for playback
-                self.audio_data, self.sampling_rate = librosa.load('static/data/WAV/Filtered Guitar.wav', sr=None)
+                self.audio_data, self.sampling_rate = self.read_audio(output_path)
+                self.new_signal_loaded()
                 self.update_audio_equalizer()  # Update the equalizer with the new audio
 
+    def audiogram_levels(self, magnitudes, n_fft, fs):
+        """
+        Aggregate an rfft magnitude spectrum into ISO octave / third-octave levels (dB),
+        split into the "Left" (<= 500 Hz) and "Right" (> 500 Hz) audiogram curves as (centers, levels) pairs.
+        """
+        aggregator = rfft_band_aggregator(n_fft, fs, self.audiogram_fraction)
+        levels = aggregator.levels_db(magnitudes)
+        left = aggregator.centers <= 500
+        return {
+            "Left": (aggregator.centers[left], levels[left]),
+            "Right": (aggregator.centers[~left], levels[~left]),
+        }
+
     def plot_audiogram(self, audiogram, plot_widget=None, classification=False):
         if plot_widget is None:
             plot_widget = self.fourier_graph
@@ -947,10 +1728,12 @@ class MainApp(QMainWindow):
             self.plot_classification(plot_widget)
 
         if isinstance(audiogram, dict):
-            plot_widget.plot(x=list(audiogram['Left'].keys()), y=list(audiogram['Left'].values()),
+            left_freqs, left_levels = audiogram['Left']
+            right_freqs, right_levels = audiogram['Right']
+            plot_widget.plot(x=left_freqs, y=left_levels,
                              pen=mkPen('b', width=2),
                              symbol='x', name='Left')
-            plot_widget.plot(x=list(audiogram['Right'].keys()), y=list(audiogram['Right'].values()),
+            plot_widget.plot(x=right_freqs, y=right_levels,
                              pen=mkPen('r', width=2), symbol='o', symbolBrush='w', name='Right')
 
         plot_widget.plotItem.setLabel('bottom', 'Frequency (Hz)')
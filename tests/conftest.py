@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application modules are imported as app.*, from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
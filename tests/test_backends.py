@@ -0,0 +1,88 @@
+import time
+import wave
+
+import numpy as np
+
+from app.audio.backends import NullSink, WavFileSink, create_backend
+
+SAMPLERATE = 48000
+BLOCKSIZE = 512
+
+
+def sine_callback(frequency=440.0, amplitude=0.5):
+    """Audio callback writing a continuous sine, like the playback callback writes the equalized signal."""
+    position = [0]
+
+    def callback(outdata, frames, time_info, status):
+        t = (position[0] + np.arange(frames)) / SAMPLERATE
+        outdata[:] = (amplitude * np.sin(2 * np.pi * frequency * t))[:, np.newaxis]
+        position[0] += frames
+
+    return callback
+
+
+def run(backend, callback, channels=1):
+    stream = backend.open_stream(samplerate=SAMPLERATE, channels=channels, callback=callback, blocksize=BLOCKSIZE)
+    stream.start()
+    stream.wait(timeout=30)
+    stream.close()
+    return stream
+
+
+def test_null_sink_throughput():
+    stream = run(NullSink(realtime_factor=0, max_blocks=500), sine_callback())
+    stats = stream.stats()
+    assert stats["blocks"] == 500
+    assert stats["frames"] == 500 * BLOCKSIZE
+    assert stats["deadline"] == BLOCKSIZE / SAMPLERATE
+    assert stats["deadline_misses"] == 0
+    assert stats["realtime_ratio"] > 1
+    assert 0 < stats["mean_callback_time"] <= stats["max_callback_time"]
+
+
+def test_null_sink_counts_deadline_misses():
+    deadline = BLOCKSIZE / SAMPLERATE
+
+    def slow_callback(outdata, frames, time_info, status):
+        time.sleep(1.5 * deadline)
+        outdata.fill(0)
+
+    stats = run(NullSink(realtime_factor=0, max_blocks=5), slow_callback).stats()
+    assert stats["deadline_misses"] == 5
+    assert stats["max_callback_time"] > deadline
+    assert stats["realtime_ratio"] < 1
+
+
+def test_null_sink_paces_blocks():
+    blocks, factor = 50, 10.0
+    started = time.perf_counter()
+    run(NullSink(realtime_factor=factor, max_blocks=blocks), sine_callback())
+    elapsed = time.perf_counter() - started
+    assert elapsed >= 0.9 * (blocks - 1) * BLOCKSIZE / SAMPLERATE / factor
+
+
+def test_callback_history_is_bounded():
+    stream = run(NullSink(realtime_factor=0, max_blocks=3000), sine_callback())
+    assert len(stream.callback_times) == stream.callback_times.maxlen < 3000
+    assert stream.stats()["blocks"] == 3000
+
+
+def test_wav_file_sink_records_output(tmp_path):
+    path = str(tmp_path / "playback.wav")
+    stream = run(WavFileSink(path, realtime_factor=0, max_blocks=40), sine_callback(), channels=2)
+    assert stream.stats()["deadline_misses"] == 0
+
+    with wave.open(path, "rb") as file:
+        assert (file.getnchannels(), file.getsampwidth(), file.getframerate()) == (2, 2, SAMPLERATE)
+        recorded = np.frombuffer(file.readframes(file.getnframes()), dtype='<i2').reshape(-1, 2) / 32767
+    t = np.arange(40 * BLOCKSIZE) / SAMPLERATE
+    expected = 0.5 * np.sin(2 * np.pi * 440.0 * t)
+    assert len(recorded) == 40 * BLOCKSIZE
+    assert np.allclose(recorded, expected[:, np.newaxis], atol=1e-4)
+
+
+def test_create_backend(tmp_path):
+    assert isinstance(create_backend("null:0"), NullSink)
+    assert create_backend("null:0").realtime_factor == 0
+    backend = create_backend(f"wav:{tmp_path / 'out.wav'}")
+    assert isinstance(backend, WavFileSink) and backend.path.endswith("out.wav")
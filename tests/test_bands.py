@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from app.utils.bands import BandAggregator, fractional_octave_bands, rfft_band_aggregator
+from app.utils.fft_backend import rfftfreq
+
+
+def reference(magnitudes, freqs, edges, reduce):
+    """Band by band over the bins with low <= f < high, skipping the bands without any bin."""
+    values = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        inside = (freqs >= low) & (freqs < high)
+        if inside.any():
+            values.append(reduce(magnitudes[inside]))
+    return np.array(values)
+
+
+@pytest.mark.parametrize("fraction", [1, 3])
+@pytest.mark.parametrize("n_fft, fs", [(2048, 44100), (4096, 48000), (1000, 8000)])
+def test_aggregator_matches_reference_sums(fraction, n_fft, fs):
+    freqs = rfftfreq(n_fft, 1 / fs)
+    magnitudes = np.random.default_rng(0).random(freqs.size)
+    centers, edges = fractional_octave_bands(fraction, fmax=min(20000.0, fs / 2))
+    aggregator = rfft_band_aggregator(n_fft, fs, fraction)
+
+    expected_power = reference(magnitudes, freqs, edges, lambda band: np.sum(band ** 2))
+    expected_peak = reference(magnitudes, freqs, edges, np.max)
+    assert len(aggregator) == len(expected_power)
+    assert np.allclose(aggregator.power(magnitudes), expected_power)
+    assert np.allclose(aggregator.peak(magnitudes), expected_peak)
+    assert np.allclose(aggregator.levels_db(magnitudes), 10 * np.log10(expected_power + 1e-20))
+
+
+def test_empty_low_bands_are_dropped():
+    # 10 Hz bins are wider than the lowest third-octave bands, so some of them hold no bin
+    freqs = np.arange(0, 4001, 10.0)
+    centers, edges = fractional_octave_bands(3, fmax=4000.0)
+    aggregator = BandAggregator(freqs, centers, edges)
+    occupied = np.array([np.any((freqs >= low) & (freqs < high)) for low, high in zip(edges[:-1], edges[1:])])
+    assert not occupied.all()
+    assert np.array_equal(aggregator.centers, centers[occupied])
+
+
+def test_tone_lands_in_its_band():
+    n_fft, fs = 4096, 48000
+    t = np.arange(n_fft) / fs
+    magnitudes = np.abs(np.fft.rfft(np.sin(2 * np.pi * 1000 * t) * np.hanning(n_fft)))
+    aggregator = rfft_band_aggregator(n_fft, fs)
+    power = aggregator.power(magnitudes)
+    assert aggregator.centers[np.argmax(power)] == pytest.approx(1000.0, rel=0.01)
+    assert np.max(power) > 0.9 * np.sum(power)
+
+
+def test_iso_band_centers():
+    centers, edges = fractional_octave_bands(3)
+    assert np.any(np.isclose(centers, 1000.0))
+    assert np.allclose(edges[1:] / edges[:-1], 10 ** 0.1)
+    assert np.allclose(np.sqrt(edges[:-1] * edges[1:]), centers)
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.utils.corpus import BandEnergy, generate
+
+FS = 8000
+
+
+@pytest.mark.parametrize("chunk_size", [1, 777, 4096, 100000])
+def test_band_energies_are_exact(chunk_size):
+    rng = np.random.default_rng(1)
+    signal = rng.standard_normal((30000, 2)) * np.linspace(0, 3, 30000)[:, np.newaxis]
+    signal = signal[:5000] if chunk_size == 1 else signal
+    energy = BandEnergy(FS, [0, 500, 1500, FS / 2 + 1], channels=2)
+    for start in range(0, len(signal), chunk_size):
+        energy.add(signal[start:start + chunk_size])
+    bands = energy.energies()
+    assert bands.shape == (3, 2)
+    assert np.allclose(bands.sum(axis=0), np.sum(signal ** 2, axis=0), rtol=1e-9)
+
+
+def test_band_energy_of_a_tone():
+    t = np.arange(4 * FS) / FS
+    tone = np.sin(2 * np.pi * 1000 * t)[:, np.newaxis]
+    energy = BandEnergy(FS, [0, 900, 1100, FS / 2 + 1], channels=1)
+    energy.add(tone)
+    below, band, above = energy.energies()[:, 0]
+    assert band == pytest.approx(np.sum(tone ** 2), rel=1e-3)
+    assert below + above < 1e-3 * band
+
+
+@pytest.mark.parametrize("kind", ["speech", "multitone", "noise"])
+def test_seed_gives_same_file_for_any_chunk_size(kind, tmp_path):
+    sidecars, samples = [], []
+    for chunk_size in (1000, 7919, 2 ** 20):
+        path = str(tmp_path / f"{kind}_{chunk_size}.f32")
+        sidecars.append(generate(path, kind, duration=2.0, fs=FS, channels=2, noise_level=0.05, lead_in=0.25,
+                                 seed=3, chunk_size=chunk_size))
+        samples.append(np.fromfile(path, dtype='<f4'))
+    for other in samples[1:]:
+        assert np.array_equal(other, samples[0])
+    for other in sidecars[1:]:
+        assert np.allclose(other["signal_energy"], sidecars[0]["signal_energy"], rtol=1e-9)
+        assert np.allclose(other["noise_energy"], sidecars[0]["noise_energy"], rtol=1e-9)
+
+
+def test_sidecar_energies_match_the_file(tmp_path):
+    path = str(tmp_path / "multitone.f32")
+    sidecar = generate(path, "multitone", duration=2.0, fs=FS, noise_level=0.0, bands=[(0, 4001)], seed=0)
+    samples = np.fromfile(path, dtype='<f4').astype(float)
+    assert sidecar["signal_energy"][0][0] == pytest.approx(np.sum(samples ** 2), rel=1e-5)
+    with open(path + ".json") as file:
+        assert json.load(file)["samples"] == 2 * FS
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.equalizer.Equalizer import Equalizer
+from app.utils.bands import BandLayout, band_ranges
+
+FS = 44100
+
+
+@pytest.fixture(scope="module")
+def equalizer():
+    """31-band log layout over 20 s of noise (a length with a large prime factor, so the transform is padded)."""
+    signal = (0.1 * np.random.default_rng(0).standard_normal(20 * FS + 7)).astype(np.float32)
+    equalizer = Equalizer(BandLayout(band_ranges(31, FS, "log"), scale="log"))
+    equalizer.set_signal(signal, FS)
+    return equalizer
+
+
+def test_render_delta_matches_full_render(equalizer):
+    old_gains = np.ones(31)
+    new_gains = old_gains.copy()
+    new_gains[[3, 7, 12]] = (0.0, 1.8, 0.5)  # Narrow low and mid bands
+    output = np.array(equalizer.render(old_gains))
+    assert equalizer.render_delta(output, old_gains, new_gains)
+
+    expected = equalizer.render(new_gains)
+    change = np.max(np.abs(expected - equalizer.render(old_gains)))
+    assert np.max(np.abs(output - expected)) < 1e-4 * change
+
+
+def test_render_delta_refuses_wide_bands(equalizer):
+    old_gains = np.ones(31)
+    new_gains = old_gains.copy()
+    new_gains[-1] = 0.5  # The top band spans about half of the spectrum
+    output = np.array(equalizer.render(old_gains))
+    before = output.copy()
+    assert not equalizer.render_delta(output, old_gains, new_gains)
+    assert np.array_equal(output, before)
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096, 12345, 65536])
+def test_stitched_render_windows_equal_one_window(equalizer, block_size):
+    gains = np.linspace(0.2, 1.8, 31)
+    n = equalizer.n
+    whole = equalizer.render_window(gains, 0, n)
+    blocks = np.concatenate([equalizer.render_window(gains, start, min(start + block_size, n))
+                             for start in range(0, n, block_size)])
+    assert len(blocks) == n
+    assert np.array_equal(blocks, whole)
+
+
+def test_render_window_unity_gains_reconstruct_input(equalizer):
+    output = equalizer.render_window(np.ones(31), 12345, 12345 + 3 * FS)
+    assert np.allclose(output, equalizer.signal[12345:12345 + 3 * FS], atol=1e-5)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from app.utils.resample import BlockResampler, resample, resample_ratio
+
+RATES = [(48000, 44100), (44100, 48000), (96000, 48000), (22050, 48000), (48000, 48000)]
+
+
+@pytest.fixture(scope="module")
+def signal():
+    return np.random.default_rng(0).standard_normal(50021).astype(np.float64)
+
+
+@pytest.mark.parametrize("fs, target_fs", RATES)
+def test_chunked_resample_matches_one_shot(signal, fs, target_fs):
+    up, down = resample_ratio(fs, target_fs)
+    expected = resample_poly(signal, up, down)
+    output = resample(signal, fs, target_fs, chunk_size=4096, dtype=np.float64)
+    assert len(output) == -(-len(signal) * up // down)
+    assert np.allclose(output, expected[:len(output)], atol=1e-10)
+
+
+@pytest.mark.parametrize("fs, target_fs", RATES)
+@pytest.mark.parametrize("block_size", [1, 511, 8192])
+def test_block_resampler_matches_one_shot(signal, fs, target_fs, block_size):
+    signal = signal[:20000] if block_size == 1 else signal
+    expected = resample(signal, fs, target_fs, dtype=np.float64)
+    resampler = BlockResampler(fs, target_fs, dtype=np.float64)
+    blocks = [resampler.process(signal[start:start + block_size]) for start in range(0, len(signal), block_size)]
+    output = np.concatenate(blocks + [resampler.flush()])
+    assert len(output) == len(expected)
+    assert np.allclose(output, expected, atol=1e-10)
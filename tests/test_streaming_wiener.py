@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from app.wiener_filter.StreamingWiener import StreamingWiener
+from app.wiener_filter.Wiener import Wiener, ESTIMATORS
+
+FS = 16000
+
+
+@pytest.fixture(scope="module")
+def signals():
+    """Harmonic tones with a slow envelope after one second of noise only, in white noise."""
+    t = np.arange(8 * FS) / FS
+    clean = sum(amplitude * np.sin(2 * np.pi * frequency * t)
+                for frequency, amplitude in ((220, 0.2), (440, 0.15), (660, 0.1), (1320, 0.05)))
+    clean *= 0.5 + 0.5 * np.sin(2 * np.pi * 0.5 * t)
+    clean[:FS] = 0
+    noisy = (clean + 0.05 * np.random.default_rng(0).standard_normal(t.size)).astype(np.float32)
+    return clean, noisy
+
+
+def snr_db(estimate, clean):
+    clean = clean[:len(estimate)]
+    scale = np.dot(estimate, clean) / np.dot(estimate, estimate)
+    return 10 * np.log10(np.sum(clean ** 2) / np.sum((clean - scale * estimate) ** 2))
+
+
+def stream(noisy, estimator, blocksize):
+    denoiser = StreamingWiener(FS, estimator=estimator)
+    denoiser.estimate_noise(noisy[:FS])
+    output = noisy.copy()
+    for start in range(0, len(output), blocksize):
+        denoiser.process(output[start:start + blocksize])
+    return output[denoiser.latency:].astype(float)
+
+
+@pytest.mark.parametrize("estimator", ESTIMATORS)
+def test_live_stage_matches_offline_filter(signals, estimator, tmp_path):
+    clean, noisy = signals
+    path = str(tmp_path / "noisy.wav")
+    wav.write(path, FS, noisy)
+    offline = Wiener(path, 0, 1).wiener(str(tmp_path / "filtered.wav"), estimator=estimator).astype(float)
+    live = stream(noisy, estimator, 512)
+    assert abs(snr_db(live, clean) - snr_db(offline, clean)) < 1
+
+
+@pytest.mark.parametrize("estimator", ESTIMATORS)
+def test_output_does_not_depend_on_block_size(signals, estimator):
+    _, noisy = signals
+    assert np.allclose(stream(noisy, estimator, 100), stream(noisy, estimator, 1024), atol=1e-6)
+
+
+def test_unknown_estimator():
+    with pytest.raises(ValueError):
+        StreamingWiener(FS, estimator="spectral")
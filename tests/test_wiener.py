@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from app.wiener_filter.Wiener import Wiener, ESTIMATORS
+
+FS = 16000
+
+
+@pytest.fixture(scope="module")
+def noisy_tones(tmp_path_factory):
+    """Harmonic tones with a slow envelope after one second of noise only, in white noise (about 7 dB SNR)."""
+    t = np.arange(8 * FS) / FS
+    clean = sum(amplitude * np.sin(2 * np.pi * frequency * t)
+                for frequency, amplitude in ((220, 0.2), (440, 0.15), (660, 0.1), (1320, 0.05)))
+    clean *= 0.5 + 0.5 * np.sin(2 * np.pi * 0.5 * t)
+    clean[:FS] = 0
+    noisy = clean + 0.05 * np.random.default_rng(0).standard_normal(t.size)
+    path = str(tmp_path_factory.mktemp("wiener") / "noisy.wav")
+    wav.write(path, FS, noisy.astype(np.float32))
+    return path, clean, noisy
+
+
+def snr_db(estimate, clean):
+    """SNR of an estimate against the clean signal, after the best scaling (wiener() normalises its output)."""
+    clean = clean[:len(estimate)]
+    scale = np.dot(estimate, clean) / np.dot(estimate, estimate)
+    return 10 * np.log10(np.sum(clean ** 2) / np.sum((clean - scale * estimate) ** 2)), scale
+
+
+@pytest.fixture(scope="module")
+def results(noisy_tones, tmp_path_factory):
+    """(SNR in dB, residual noise power in dB relative to the input over the noise-only lead-in) per estimator."""
+    path, clean, noisy = noisy_tones
+    output = str(tmp_path_factory.mktemp("wiener") / "filtered.wav")
+    lead_in = slice(FS // 4, 3 * FS // 4)
+    measured = {}
+    for estimator in ESTIMATORS:
+        estimate = Wiener(path, 0, 1).wiener(output, estimator=estimator).astype(float)
+        snr, scale = snr_db(estimate, clean)
+        residual = 10 * np.log10(np.mean((scale * estimate[lead_in]) ** 2) / np.mean(noisy[lead_in] ** 2))
+        measured[estimator] = snr, residual
+    return measured
+
+
+def test_every_estimator_improves_snr(noisy_tones, results):
+    _, clean, noisy = noisy_tones
+    input_snr, _ = snr_db(noisy, clean)
+    for estimator, (snr, _) in results.items():
+        assert snr > input_snr + 3, estimator
+
+
+def test_a_priori_estimators_beat_posterior(results):
+    for estimator in ("dd", "tsnr", "hrnr"):
+        assert results[estimator][0] > results["posterior"][0] + 5, estimator
+
+
+def test_residual_noise_ordering(results):
+    # Musical noise left in the noise-only region: each step of the Plapous et al. chain removes more of it
+    residuals = [results[estimator][1] for estimator in ("posterior", "dd", "tsnr", "hrnr")]
+    assert residuals == sorted(residuals, reverse=True)
+    assert residuals[1] < residuals[0] - 15
+
+
+def test_unknown_estimator(noisy_tones, tmp_path):
+    with pytest.raises(ValueError):
+        Wiener(noisy_tones[0], 0, 1).wiener(str(tmp_path / "filtered.wav"), estimator="spectral")
+
+
+def test_mono_and_stereo_outputs(noisy_tones, tmp_path):
+    path, _, noisy = noisy_tones
+    stereo_path = str(tmp_path / "stereo.wav")
+    wav.write(stereo_path, FS, np.column_stack([noisy, noisy]).astype(np.float32))
+    mono = Wiener(path, 0, 1).wiener(str(tmp_path / "mono_out.wav"), estimator="tsnr")
+    stereo = Wiener(stereo_path, 0, 1).wiener(str(tmp_path / "stereo_out.wav"), estimator="tsnr")
+    assert mono.ndim == 1 and stereo.shape == (len(noisy), 2)
+    assert np.allclose(stereo[:, 0], mono, atol=1e-5)
+    assert np.allclose(stereo[:, 1], mono, atol=1e-5)